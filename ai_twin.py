@@ -4,23 +4,74 @@ AI Twin - Yaswanth's Digital Personality
 Creates an AI that mimics Yaswanth's communication style for rebuilding rapport with Indu
 """
 
-import openai
 import json
-import re
 import yaml
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator
 import os
 from pathlib import Path
+from collections import Counter
+from chat_parser import iter_whatsapp_messages
+from phrase_scanner import PhraseScanner
+from prompt_cache import PromptCache
+from prompt_builder import PromptBuilder
+from llm_client import LLMClient
+
+# Common Telugu words/phrases found in chats
+COMMON_TELUGU_PHRASES = [
+    "kadha", "ante", "ayyo", "devudaaa", "ayyayyo", "haa", "avunu",
+    "ledhu", "cheppu", "chesthaanu", "unnav", "bagane", "ela",
+    "enti", "andhuke", "theliyadhu", "gurthuledu", "koncham",
+    "manchi", "thappu", "sare le", "po po", "madam", "andi"
+]
+
+# Common English expressions and chat shorthand
+COMMON_EXPRESSIONS = [
+    "Ok ok", "Thank you", "No problem", "I will try", "Ayina",
+    "Actually", "Seriously", "Just", "Yeah", "Hlo", "Thnx",
+    "U tell", "Wht", "Tht", "Aftr", "Evn", "Undrstud"
+]
+
+# Built once; scans every message for all phrases in a single pass
+CHAT_PATTERN_SCANNER = PhraseScanner({
+    'telugu': COMMON_TELUGU_PHRASES,
+    'expressions': COMMON_EXPRESSIONS
+})
+
+# Everything that varies per request goes in the user message, after the fixed system prompt
+USER_PROMPT_TEMPLATE = """Previous conversation:
+{history}
+Current context: {context}
+
+User (Indu): {input}
+
+Respond as Yaswanth would - naturally mixing Telugu-English, being caring but not desperate, and showing genuine interest. Keep it conversational and authentic."""
 
 class YaswanthAITwin:
     def __init__(self, api_key: str, personality_file: str = "personality.yaml"):
         """Initialize the AI Twin with OpenAI API key and personality file"""
-        self.client = openai.OpenAI(api_key=api_key)
+        # Pooled client with deadlines, retries and a circuit breaker
+        self.llm = LLMClient(api_key)
+        self.client = self.llm.client
+        # Per-file metadata only; messages are scanned for patterns as they are read
         self.chat_data = []
+        self.pattern_counts = {group: Counter() for group in CHAT_PATTERN_SCANNER.groups}
+        self.personality_file = personality_file
         self.personality_config = self.load_personality(personality_file)
         self.personality_prompt = ""
+        self.pattern_stats = {}
         self.conversation_context = []
+        
+        # Built prompt is cached on disk, keyed by personality file + chat files
+        self.prompt_cache = PromptCache(os.getenv('AI_TWIN_CACHE_DIR', '.ai_twin_cache'))
+        self.prompt_cache_key = None
+        
+        # Prompt tokens (system + user message) per request; section sizes are printed each time
+        self.prompt_builder = PromptBuilder(
+            budget=int(os.getenv('AI_TWIN_PROMPT_TOKEN_BUDGET', '2000')),
+            max_input_tokens=int(os.getenv('AI_TWIN_MAX_INPUT_TOKENS', '400')),
+            log=os.getenv('AI_TWIN_PROMPT_LOG', '1') == '1'
+        )
     
     def load_personality(self, personality_file: str) -> Dict[str, Any]:
         """Load personality configuration from YAML file"""
@@ -37,56 +88,48 @@ class YaswanthAITwin:
             return {}
         
     def load_chat_data(self, chat_folder: str = "chat_data"):
-        """Load and process WhatsApp chat files"""
-        chat_files = Path(chat_folder).glob("*.txt")
+        """Load and process WhatsApp chat files, unless a cached prompt already covers them"""
+        chat_files = sorted(Path(chat_folder).glob("*.txt"))
+        
+        self.prompt_cache_key = self.prompt_cache.make_key(
+            self.personality_file, chat_files,
+            extra=[COMMON_TELUGU_PHRASES, COMMON_EXPRESSIONS]
+        )
+        cached = self.prompt_cache.load(self.prompt_cache_key)
+        if cached:
+            self.personality_prompt = cached['personality_prompt']
+            self.pattern_stats = cached['pattern_stats']
+            print(f"✅ Loaded cached personality prompt for {len(chat_files)} chat files, skipping parsing")
+            return
         
+        self.chat_data = []
+        self.pattern_counts = {group: Counter() for group in CHAT_PATTERN_SCANNER.groups}
         for file_path in chat_files:
             print(f"Loading {file_path.name}...")
+            tally = Counter()
             with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                self.chat_data.append({
-                    'file': file_path.name,
-                    'content': content,
-                    'messages': self._parse_whatsapp_chat(content)
-                })
+                file_counts = self._extract_chat_patterns(
+                    self._yaswanth_messages(self._parse_whatsapp_chat(f), tally)
+                )
+            for group, counts in file_counts.items():
+                self.pattern_counts[group].update(counts)
+            self.chat_data.append({
+                'file': file_path.name,
+                'message_count': tally['messages'],
+                'yaswanth_messages': tally['yaswanth']
+            })
     
-    def _parse_whatsapp_chat(self, content: str) -> List[Dict]:
-        """Parse WhatsApp chat format into structured messages"""
-        messages = []
-        lines = content.split('\n')
-        
-        current_message = None
-        
-        for line in lines:
-            # Match WhatsApp timestamp format: [DD/MM/YY, HH:MM:SS AM/PM] Name: Message
-            timestamp_match = re.match(r'\[(\d{2}/\d{2}/\d{2}, \d{1,2}:\d{2}:\d{2} [AP]M)\] ([^:]+): (.+)', line)
-            
-            if timestamp_match:
-                if current_message:
-                    messages.append(current_message)
-                
-                timestamp, sender, message = timestamp_match.groups()
-                
-                # Map names to consistent identifiers
-                if sender.lower() in ['yaswanth', 'prosessor', 'processor']:
-                    sender = 'Yaswanth'
-                elif sender.lower() in ['indu', 'mustang']:
-                    sender = 'Indu'
-                
-                current_message = {
-                    'timestamp': timestamp,
-                    'sender': sender,
-                    'message': message.strip(),
-                    'is_yaswanth': sender == 'Yaswanth'
-                }
-            elif current_message and line.strip():
-                # Continuation of previous message
-                current_message['message'] += ' ' + line.strip()
-        
-        if current_message:
-            messages.append(current_message)
-            
-        return messages
+    def _yaswanth_messages(self, messages: Iterable[Dict], tally: Counter) -> Iterator[str]:
+        """Text of Yaswanth's messages from a stream, counting every message in `tally`"""
+        for msg in messages:
+            tally['messages'] += 1
+            if msg['is_yaswanth']:
+                tally['yaswanth'] += 1
+                yield msg['message']
+    
+    def _parse_whatsapp_chat(self, lines: Iterable[str]) -> Iterator[Dict]:
+        """Parse WhatsApp chat format into structured messages, streaming line by line"""
+        return iter_whatsapp_messages(lines)
     
     def build_personality_prompt(self) -> str:
         """Build comprehensive personality prompt from YAML configuration"""
@@ -96,14 +139,11 @@ class YaswanthAITwin:
         
         config = self.personality_config
         
-        # Extract Yaswanth's messages for pattern analysis
-        yaswanth_messages = []
-        for chat in self.chat_data:
-            yaswanth_messages.extend([msg['message'] for msg in chat['messages'] if msg['is_yaswanth']])
-        
-        # Analyze patterns
-        telugu_phrases = self._extract_telugu_patterns(yaswanth_messages)
-        common_expressions = self._extract_common_expressions(yaswanth_messages)
+        # Patterns counted from Yaswanth's messages while loading, ranked by how often they are used
+        pattern_counts = self.pattern_counts
+        self.pattern_stats = {group: dict(counts.most_common()) for group, counts in pattern_counts.items()}
+        telugu_phrases = [phrase for phrase, _ in pattern_counts['telugu'].most_common(10)]
+        common_expressions = [phrase for phrase, _ in pattern_counts['expressions'].most_common(10)]
         
         # Build personality prompt from YAML config
         name = config.get('name', 'Yaswanth')
@@ -181,90 +221,84 @@ Remember: You are {name} - {context}. Stay true to every detail in this personal
 
         return personality_prompt
     
+    def _extract_chat_patterns(self, messages: Iterable[str]) -> Dict[str, Counter]:
+        """Count Telugu phrases and common expressions in a single pass over the messages"""
+        return CHAT_PATTERN_SCANNER.count(messages)
+    
     def _extract_telugu_patterns(self, messages: List[str]) -> List[str]:
-        """Extract common Telugu phrases and expressions"""
-        telugu_patterns = []
-        
-        # Common Telugu words/phrases found in chats
-        common_telugu = [
-            "kadha", "ante", "ayyo", "devudaaa", "ayyayyo", "haa", "avunu",
-            "ledhu", "cheppu", "chesthaanu", "unnav", "bagane", "ela",
-            "enti", "andhuke", "theliyadhu", "gurthuledu", "koncham",
-            "manchi", "thappu", "sare le", "po po", "madam", "andi"
-        ]
-        
-        for msg in messages:
-            for phrase in common_telugu:
-                if phrase.lower() in msg.lower():
-                    telugu_patterns.append(phrase)
-        
-        return list(set(telugu_patterns))
+        """Extract common Telugu phrases and expressions, most used first"""
+        counts = CHAT_PATTERN_SCANNER.count(messages)['telugu']
+        return [phrase for phrase, _ in counts.most_common()]
     
     def _extract_common_expressions(self, messages: List[str]) -> List[str]:
-        """Extract common expressions and phrases"""
-        expressions = []
-        
-        common_patterns = [
-            "Ok ok", "Thank you", "No problem", "I will try", "Ayina",
-            "Actually", "Seriously", "Just", "Yeah", "Hlo", "Thnx",
-            "U tell", "Wht", "Tht", "Aftr", "Evn", "Undrstud"
-        ]
-        
-        for msg in messages:
-            for pattern in common_patterns:
-                if pattern.lower() in msg.lower():
-                    expressions.append(pattern)
-        
-        return list(set(expressions))
+        """Extract common expressions and phrases, most used first"""
+        counts = CHAT_PATTERN_SCANNER.count(messages)['expressions']
+        return [phrase for phrase, _ in counts.most_common()]
     
-    def generate_response(self, user_input: str, context: str = "") -> str:
-        """Generate response in Yaswanth's style"""
-        
+    def _build_messages(self, user_input: str, context: str = "") -> List[Dict[str, str]]:
+        """Build the chat messages for a reply in Yaswanth's style"""
         if not self.personality_prompt:
             self.personality_prompt = self.build_personality_prompt()
+            if self.prompt_cache_key:
+                self.prompt_cache.save(self.prompt_cache_key, {
+                    'personality_prompt': self.personality_prompt,
+                    'pattern_stats': self.pattern_stats
+                })
         
-        # Build conversation context
-        conversation_history = "\n".join([
-            f"User: {ctx['user']}\nYaswanth: {ctx['response']}" 
-            for ctx in self.conversation_context[-3:]  # Last 3 exchanges
-        ])
+        # Last 3 exchanges, the most recent kept first when the budget is tight
+        history = [(index, f"User: {ctx['user']}\nYaswanth: {ctx['response']}")
+                   for index, ctx in enumerate(self.conversation_context[-3:])]
         
-        system_prompt = self.personality_prompt
+        return self.prompt_builder.build(
+            self.personality_prompt, USER_PROMPT_TEMPLATE,
+            fixed={'context': context, 'input': user_input},
+            ranked=[('history', "", history)]
+        )
+    
+    def _remember(self, user_input: str, ai_response: str):
+        """Store an exchange in conversation context"""
+        self.conversation_context.append({
+            'user': user_input,
+            'response': ai_response,
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    def generate_response(self, user_input: str, context: str = "") -> str:
+        """Generate response in Yaswanth's style"""
+        messages = self._build_messages(user_input, context)
         
-        user_prompt = f"""Previous conversation:
-{conversation_history}
-
-Current context: {context}
-
-User (Indu): {user_input}
-
-Respond as Yaswanth would - naturally mixing Telugu-English, being caring but not desperate, and showing genuine interest. Keep it conversational and authentic."""
-
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.8,
-                max_tokens=200
-            )
-            
-            ai_response = response.choices[0].message.content.strip()
-            
-            # Store in conversation context
-            self.conversation_context.append({
-                'user': user_input,
-                'response': ai_response,
-                'timestamp': datetime.now().isoformat()
-            })
+            ai_response = self.llm.complete(messages, model="gpt-4", temperature=0.8, max_tokens=200)
+            self._remember(user_input, ai_response)
             
             return ai_response
             
         except Exception as e:
             return f"Sorry, technical issue ayindhi. {str(e)}"
     
+    def stream_response(self, user_input: str, context: str = "") -> Iterator[str]:
+        """Generate a response in Yaswanth's style, yielding text as the model produces it.
+        
+        The exchange is remembered only once the stream completes; a stream the
+        caller abandons part-way leaves no trace in conversation context. If the
+        model fails after text has been sent, the error is raised instead of an
+        apology being appended to the half-finished reply.
+        """
+        messages = self._build_messages(user_input, context)
+        
+        parts = []
+        try:
+            for delta in self.llm.stream(messages, model="gpt-4", temperature=0.8, max_tokens=200):
+                parts.append(delta)
+                yield delta
+        except Exception as e:
+            if parts:
+                raise
+            yield f"Sorry, technical issue ayindhi. {str(e)}"
+            return
+        
+        self._remember(user_input, ''.join(parts).strip())
+    
     def chat_interface(self):
         """Simple chat interface for testing"""
         print("🤖 Yaswanth AI Twin Ready!")
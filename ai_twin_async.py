@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Async AI Twin - YaswanthAITwinDB for an asyncio event loop
+Completions go through an AsyncOpenAI-backed LLM client, so a waiting reply costs a coroutine
+rather than a thread; blocking retrieval (embedding, vector and FTS search) and
+persistence run on a bounded thread pool next to the loop
+"""
+
+import asyncio
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Tuple
+
+from ai_twin_db import YaswanthAITwinDB
+from model_router import Route
+from llm_client import AsyncLLMClient, CircuitOpenError
+
+
+class AsyncYaswanthAITwinDB(YaswanthAITwinDB):
+    """Same memory, style and persistence as YaswanthAITwinDB, with awaitable replies.
+
+    The synchronous generate_response/stream_response keep working, so the
+    Flask routes can share an instance with the ASGI ones.
+    """
+
+    def __init__(self, api_key: str, personality_file: str = "personality.yaml"):
+        super().__init__(api_key, personality_file)
+        # Shares the breaker and latency window, so both paths agree on upstream health
+        self.async_llm = AsyncLLMClient(api_key, policy=self.llm.policy, breaker=self.llm.breaker,
+                                        latencies=self.llm.latencies)
+        self.async_client = self.async_llm.client
+
+        # Retrieval threads mostly wait on the embedding service's micro-batches
+        # and SQLite reads, so this bounds queued work rather than CPU use
+        self.retrieval_workers = int(os.getenv('AI_TWIN_RETRIEVAL_WORKERS', '32'))
+        self.executor = ThreadPoolExecutor(max_workers=self.retrieval_workers,
+                                           thread_name_prefix="twin-retrieval")
+        print(f"✅ Async AI Twin ready ({self.retrieval_workers} retrieval workers)")
+
+    async def _run_blocking(self, fn, *args):
+        # Carry the request's context along, so stage timings land on the right request
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(self.executor, context.run, fn, *args)
+
+    async def build_messages_async(self, user_input: str, context: str = "") -> List[Dict[str, str]]:
+        """Fetch memory and style exemplars off the loop, then build the chat messages"""
+        return (await self.prepare_reply_async(user_input, context))[0]
+
+    async def prepare_reply_async(self, user_input: str, context: str = "") -> Tuple[List[Dict[str, str]], Route]:
+        """Retrieval off the loop, then the chat messages and the model route"""
+        # Style selection reuses the query vector memory retrieval computed (if it encoded
+        # at all), so it runs after it; without an encode of its own it is cheap
+        memories = await self._run_blocking(self.get_memory_lines, user_input)
+        exemplars = await self._run_blocking(self.get_style_exemplars, user_input)
+        return self._assemble_messages(user_input, context, memories, exemplars), \
+            self.route_reply(user_input, memories)
+
+    async def persist_conversation_async(self, user_input: str, ai_response: str, context: str = ""):
+        """Persist a turn off the loop; a full write-behind queue blocks a worker, not every request"""
+        await self._run_blocking(self.persist_conversation, user_input, ai_response, context)
+
+    async def generate_response_async(self, user_input: str, context: str = "") -> str:
+        """Generate response with database-powered memory without blocking the event loop"""
+        cached = await self._run_blocking(self.get_cached_response, user_input, context)
+        if cached is not None:
+            await self.persist_conversation_async(user_input, cached, context)
+            return cached
+
+        if not self.async_llm.healthy():
+            return self.fallback_response(user_input, CircuitOpenError("circuit open"))
+
+        messages, route = await self.prepare_reply_async(user_input, context)
+
+        try:
+            started = time.perf_counter()
+            ai_response = await self.async_llm.complete(messages, model=route.model,
+                                                        temperature=route.temperature,
+                                                        max_tokens=route.max_tokens)
+            self.record_route(route, started, messages, ai_response)
+            await self._run_blocking(self.cache_response, user_input, ai_response, context)
+            await self.persist_conversation_async(user_input, ai_response, context)
+
+            return ai_response
+
+        except Exception as e:
+            return self.fallback_response(user_input, e)
+
+    async def stream_response_async(self, user_input: str, context: str = "") -> AsyncIterator[str]:
+        """Yield reply text as the model produces it; persisted only if the stream completes.
+        
+        A failure after text has been sent is raised, so the caller can report it as an error.
+        """
+        cached = await self._run_blocking(self.get_cached_response, user_input, context)
+        if cached is not None:
+            yield cached
+            await self.persist_conversation_async(user_input, cached, context)
+            return
+
+        if not self.async_llm.healthy():
+            yield self.fallback_response(user_input, CircuitOpenError("circuit open"))
+            return
+
+        messages, route = await self.prepare_reply_async(user_input, context)
+
+        parts = []
+        try:
+            started = time.perf_counter()
+            async for delta in self.async_llm.stream(messages, model=route.model,
+                                                     temperature=route.temperature,
+                                                     max_tokens=route.max_tokens):
+                parts.append(delta)
+                yield delta
+        except Exception as e:
+            if parts:
+                print(f"❌ LLM stream cut off: {e}")
+                raise
+            yield self.fallback_response(user_input, e)
+            return
+
+        ai_response = ''.join(parts).strip()
+        self.record_route(route, started, messages, ai_response)
+        await self._run_blocking(self.cache_response, user_input, ai_response, context)
+        await self.persist_conversation_async(user_input, ai_response, context)
+
+    def get_metrics(self):
+        """Runtime metrics, with the async client's call counters folded into 'llm'"""
+        metrics = super().get_metrics()
+        async_stats = self.async_llm.stats()
+        for key in ('calls', 'attempts', 'retries', 'hedges', 'hedge_wins', 'failures', 'deadline_exceeded'):
+            metrics['llm'][key] += async_stats[key]
+        return metrics
+
+    async def aclose(self):
+        """Close the HTTP client, drain pending writes and stop the retrieval pool"""
+        await self.async_llm.close()
+        await self._run_blocking(self.close)
+        self.executor.shutdown(wait=True)
@@ -4,36 +4,150 @@ AI Twin with Database - Yaswanth's Digital Personality with Vector Memory
 Advanced version with ChromaDB for semantic search and persistent memory
 """
 
-import openai
 import json
-import re
 import yaml
-import sqlite3
-import chromadb
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Callable, Tuple
 import os
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
+from chat_parser import iter_whatsapp_messages, iter_checkpointed_batches, find_resume_point
+from parallel_ingest import ParallelIngestor
+from embedding_service import EmbeddingService
+from query_cache import QueryCache, normalize_query
+from response_cache import ResponseCache
+from prompt_builder import PromptBuilder
+from llm_client import LLMClient, CircuitOpenError
+from stage_timer import StageTimer
+from sqlite_pool import SQLitePool
+from dashboard_stats import create_stats_tables
+from model_router import ModelRouter, Route, RouteFeatures
+from hybrid_search import build_match_query, reciprocal_rank_fusion, FTS_TOKENIZER
+from style_index import StyleIndex, cluster_exemplars
+import numpy as np
+from write_behind import WriteBehindQueue
+from text_annotator import annotate_languages, annotate_moods, detect_mood
+from embedders import create_embedder, collection_suffix, DEFAULT_MODEL_NAME
+from vector_store import NumpyVectorStore, COLLECTION_SCHEMAS, normalize_embeddings
 import hashlib
+import time
+import atexit
+
+MEMORY_HEADER = "RELEVANT PAST CONVERSATIONS:\n"
+STYLE_HEADER = "HOW YASWANTH ACTUALLY TEXTS (match this style, don't copy):\n"
+
+# Everything that varies per request goes in the user message, after the fixed system prompt
+USER_PROMPT_TEMPLATE = """{memory}{style}
+Current context: {context}
+
+User (Indu): {input}
+
+Respond as Yaswanth would - naturally mixing Telugu-English, being caring but not desperate. If there are relevant past conversations, acknowledge them appropriately. Keep it 1-2 lines and authentic."""
 
 class YaswanthAITwinDB:
     def __init__(self, api_key: str, personality_file: str = "personality.yaml"):
         """Initialize the AI Twin with database support"""
-        self.client = openai.OpenAI(api_key=api_key)
+        # Per-stage latency of the reply pipeline (cache, retrieval, style, prompt, llm, persist)
+        self.stage_timer = StageTimer()
+        
+        # Pooled client with deadlines, retries and a circuit breaker
+        self.llm = LLMClient(api_key)
+        # Model tier per reply from mood, length, language mix and memory hits
+        self.model_router = ModelRouter.from_file(os.getenv('AI_TWIN_ROUTES_FILE'),
+                                                  log=os.getenv('AI_TWIN_ROUTE_LOG', '1') == '1')
+        self.client = self.llm.client
+        # Reply used while the LLM is unreachable; the web app points this at its demo responses
+        self.degraded_response: Optional[Callable[[str], str]] = None
+        self.llm_fallbacks = 0
         self.personality_config = self.load_personality(personality_file)
         self.personality_prompt = ""
         
+        # Load embedding backend for semantic search
+        print("🔄 Loading embedding model...")
+        self.embedder_spec = os.getenv('AI_TWIN_EMBEDDER', 'sentence-transformers')
+        self.embedding_model = create_embedder(self.embedder_spec)
+        print(f"✅ Embedding model loaded! ({self.embedder_spec}, {self.embedding_model.dimension} dims)")
+        
         # Initialize databases
         self.db_path = "ai_twin_memory.db"
         self.vector_db_path = "./chroma_db"
+        self.numpy_store_path = "./numpy_vectors"
+        self.vector_backend = os.getenv('AI_TWIN_VECTOR_STORE', 'chroma')
+        self.vector_dtype = os.getenv('AI_TWIN_VECTOR_DTYPE', 'float32')
+        # Optional IVF index for the NumPy store (ChromaDB already searches an HNSW graph)
+        self.ann_index = os.getenv('AI_TWIN_ANN_INDEX') or None
+        self.ann_nprobe = int(os.getenv('AI_TWIN_ANN_NPROBE', '32'))
+        self.vector_space = self.embedding_model.space
+        if self.vector_backend == 'numpy':
+            # Stored vectors don't carry over between backends, so checkpoints mustn't either
+            self.vector_space += f"@numpy-{self.vector_dtype}"
         self.init_sqlite_db()
         self.init_vector_db()
         
-        # Load embedding model for semantic search
-        print("🔄 Loading embedding model...")
-        self.embedding_model = SentenceTransformer('paraphrase-multilingual-mpnet-base-v2')
-        print("✅ Embedding model loaded!")
+        # Request-path encodes from concurrent threads share batched forward passes
+        self.embedding_service = EmbeddingService(
+            self.embedding_model,
+            max_wait_ms=float(os.getenv('AI_TWIN_EMBED_BATCH_WAIT_MS', '5')),
+            max_batch_size=int(os.getenv('AI_TWIN_EMBED_MAX_BATCH_SIZE', '32'))
+        )
+        
+        # Repeated queries skip the encode and, briefly, the vector search
+        self.query_cache = QueryCache(
+            max_entries=int(os.getenv('AI_TWIN_QUERY_CACHE_SIZE', '1024')),
+            result_ttl=float(os.getenv('AI_TWIN_RESULT_CACHE_TTL', '30'))
+        )
+        
+        # Near-identical messages in the same mood reuse a GPT reply (size 0 disables)
+        self.response_cache = None
+        response_cache_size = int(os.getenv('AI_TWIN_RESPONSE_CACHE_SIZE', '512'))
+        if response_cache_size > 0:
+            self.response_cache = ResponseCache(
+                max_entries=response_cache_size,
+                ttl=float(os.getenv('AI_TWIN_RESPONSE_CACHE_TTL', '3600')),
+                max_distance=float(os.getenv('AI_TWIN_RESPONSE_CACHE_DISTANCE', '0.1')),
+                variants=int(os.getenv('AI_TWIN_RESPONSE_VARIANTS', '3'))
+            )
+        self._prompt_hash = None
+        
+        # Prompt tokens (system + user message) per request; section sizes are printed each time
+        self.prompt_builder = PromptBuilder(
+            budget=int(os.getenv('AI_TWIN_PROMPT_TOKEN_BUDGET', '2000')),
+            max_input_tokens=int(os.getenv('AI_TWIN_MAX_INPUT_TOKENS', '400')),
+            log=os.getenv('AI_TWIN_PROMPT_LOG', '1') == '1'
+        )
+        
+        # Conversation turns are persisted by a background write-behind queue
+        self.write_queue = None
+        if os.getenv('AI_TWIN_WRITE_BEHIND', '1') == '1':
+            self.write_queue = WriteBehindQueue(
+                self.store_conversations_batch,
+                max_pending=int(os.getenv('AI_TWIN_WRITE_QUEUE_SIZE', '1000')),
+                flush_batch_size=int(os.getenv('AI_TWIN_WRITE_BATCH_SIZE', '32')),
+                flush_interval=float(os.getenv('AI_TWIN_WRITE_FLUSH_INTERVAL', '1.0'))
+            )
+            atexit.register(self.close)
+        
+        # Bulk ingestion tuning
+        self.ingest_batch_size = int(os.getenv('AI_TWIN_INGEST_BATCH_SIZE', '256'))
+        self.upsert_chunk_size = int(os.getenv('AI_TWIN_UPSERT_CHUNK_SIZE', '1000'))
+        self.ingest_workers = int(os.getenv('AI_TWIN_INGEST_WORKERS', '1'))
+        self.embed_in_workers = os.getenv('AI_TWIN_EMBED_IN_WORKERS', '1') == '1'
+        
+        # Memories further than this (2 - 2 * cosine) are not relevant enough to send
+        self.memory_max_distance = float(os.getenv('AI_TWIN_MEMORY_MAX_DISTANCE', '1.2'))
+        # hybrid (BM25 + vectors, fused), vector, or lexical
+        self.retrieval_mode = os.getenv('AI_TWIN_RETRIEVAL_MODE', 'hybrid')
+        # Skip the query encode when enough memories contain every query term
+        self.lexical_shortcut = os.getenv('AI_TWIN_LEXICAL_SHORTCUT', '1') == '1'
+        # Lexical hits must score at least this much BM25 (FTS5 reports it negated), so a
+        # match on a word found in a large share of rows doesn't bypass the distance cutoff
+        self.lexical_min_score = float(os.getenv('AI_TWIN_LEXICAL_MIN_SCORE', '1.0'))
+        self.retrieval_stats = {'lexical_only': 0, 'hybrid': 0, 'vector': 0}
+        
+        # Few-shot style exemplars: clusters per mood when building, exemplars per reply
+        self.style_clusters = int(os.getenv('AI_TWIN_STYLE_CLUSTERS', '24'))
+        self.style_exemplar_count = int(os.getenv('AI_TWIN_STYLE_EXEMPLARS', '3'))
+        self.style_index = self.load_style_index()
+        self.backfill_conversation_vectors()
         
         self.chat_data = []
         
@@ -54,58 +168,185 @@ class YaswanthAITwinDB:
     def init_sqlite_db(self):
         """Initialize SQLite database for structured data"""
         try:
-            self.conn = sqlite3.connect(self.db_path)
-            self.cursor = self.conn.cursor()
-            
-            # Create conversations table
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS conversations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    date TEXT NOT NULL,
-                    user_input TEXT NOT NULL,
-                    ai_response TEXT NOT NULL,
-                    context TEXT,
-                    mood TEXT,
-                    language_detected TEXT,
-                    embedding_id TEXT UNIQUE,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Create chat_history table for WhatsApp data
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS chat_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    file_name TEXT NOT NULL,
-                    timestamp TEXT NOT NULL,
-                    sender TEXT NOT NULL,
-                    message TEXT NOT NULL,
-                    is_yaswanth BOOLEAN NOT NULL,
-                    embedding_id TEXT UNIQUE,
-                    processed_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            self.conn.commit()
-            print("✅ SQLite database initialized!")
+            # Per-thread connections in WAL mode; writes are serialised by the pool
+            self.db = SQLitePool(
+                self.db_path,
+                cache_size_mb=int(os.getenv('AI_TWIN_SQLITE_CACHE_MB', '16')),
+                mmap_size_mb=int(os.getenv('AI_TWIN_SQLITE_MMAP_MB', '256')),
+                synchronous=os.getenv('AI_TWIN_SQLITE_SYNCHRONOUS', 'NORMAL'),
+                busy_timeout=float(os.getenv('AI_TWIN_SQLITE_BUSY_TIMEOUT', '5')),
+                cached_statements=int(os.getenv('AI_TWIN_SQLITE_STATEMENT_CACHE', '256'))
+            )
+            with self.db.write() as conn:
+                self._create_tables(conn)
+            print(f"✅ SQLite database initialized! ({self.db.journal_mode} journal)")
             
         except Exception as e:
             print(f"❌ Error initializing SQLite: {e}")
     
+    def _create_tables(self, conn):
+        """Create tables, indexes and FTS mirrors that don't exist yet"""
+        # Create conversations table
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS conversations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                date TEXT NOT NULL,
+                user_input TEXT NOT NULL,
+                ai_response TEXT NOT NULL,
+                context TEXT,
+                mood TEXT,
+                language_detected TEXT,
+                embedding_id TEXT UNIQUE,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Create chat_history table for WhatsApp data
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS chat_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                file_name TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                sender TEXT NOT NULL,
+                message TEXT NOT NULL,
+                is_yaswanth BOOLEAN NOT NULL,
+                embedding_id TEXT UNIQUE,
+                processed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                mood TEXT,
+                language_detected TEXT
+            )
+        ''')
+        
+        # Numeric timestamps let the vector query apply the time window
+        self._ensure_columns(conn, 'conversations', {'ts_epoch': 'REAL'})
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_conversations_ts_epoch ON conversations(ts_epoch)')
+        
+        # Databases created before annotation columns existed
+        self._ensure_columns(conn, 'chat_history', {'mood': 'TEXT', 'language_detected': 'TEXT'})
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_chat_history_mood ON chat_history(mood)')
+        conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_chat_history_language ON chat_history(language_detected)'
+        )
+        
+        # Create ingestion_checkpoints table for resumable chat file ingestion
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS ingestion_checkpoints (
+                file_name TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                byte_offset INTEGER NOT NULL,
+                last_timestamp TEXT,
+                message_count INTEGER NOT NULL DEFAULT 0,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                vector_space TEXT
+            )
+        ''')
+        self._ensure_columns(conn, 'ingestion_checkpoints', {'vector_space': 'TEXT'})
+        
+        # Create style_exemplars table for the precomputed few-shot index
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS style_exemplars (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                mood TEXT NOT NULL,
+                message TEXT NOT NULL,
+                cluster_size INTEGER NOT NULL,
+                embedding BLOB NOT NULL,
+                vector_space TEXT NOT NULL,
+                source_rows INTEGER NOT NULL,
+                built_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Full-text mirrors for BM25 retrieval, kept in sync by triggers
+        self._create_fts_mirror(conn, 'chat_history', ['message'])
+        self._create_fts_mirror(conn, 'conversations', ['user_input', 'ai_response'])
+        
+        # Materialised counters for the dashboard, also kept in sync by triggers
+        create_stats_tables(conn)
+    
+    def _ensure_columns(self, conn, table: str, columns: Dict[str, str]):
+        """Add any missing columns to an existing table"""
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for name, column_type in columns.items():
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+    
+    def _create_fts_mirror(self, conn, table: str, columns: List[str]):
+        """Create an external-content FTS5 index over a table's text columns, plus sync triggers"""
+        fts_table = f"{table}_fts"
+        row = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (fts_table,)
+        ).fetchone()
+        exists = row is not None
+        
+        # Mirrors built with an older tokenizer are dropped and re-indexed below
+        if exists and FTS_TOKENIZER not in row[0]:
+            print(f"🔁 Rebuilding {fts_table} with the current tokenizer")
+            conn.execute(f"DROP TABLE {fts_table}")
+            exists = False
+        
+        column_list = ', '.join(columns)
+        new_values = ', '.join(f"new.{col}" for col in columns)
+        old_values = ', '.join(f"old.{col}" for col in columns)
+        
+        conn.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+                {column_list}, content='{table}', content_rowid='id',
+                tokenize="{FTS_TOKENIZER}"
+            )
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts_table}_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts_table} (rowid, {column_list}) VALUES (new.id, {new_values});
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts_table}_delete AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts_table} ({fts_table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {fts_table}_update AFTER UPDATE OF {column_list} ON {table} BEGIN
+                INSERT INTO {fts_table} ({fts_table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+                INSERT INTO {fts_table} (rowid, {column_list}) VALUES (new.id, {new_values});
+            END
+        ''')
+        
+        # Index rows stored before the mirror existed
+        if not exists:
+            conn.execute(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+    
     def init_vector_db(self):
-        """Initialize ChromaDB for vector embeddings"""
+        """Initialize the vector store (ChromaDB, or memory-mapped NumPy via AI_TWIN_VECTOR_STORE=numpy)"""
+        # Non-default embedders get their own collections, since vector spaces can't mix
+        suffix = collection_suffix(self.embedding_model)
+        
+        if self.vector_backend == 'numpy':
+            try:
+                self.conversations_collection = NumpyVectorStore(
+                    self.numpy_store_path, f"conversations{suffix}", COLLECTION_SCHEMAS['conversations'],
+                    self.db, dtype=self.vector_dtype, ann=self.ann_index, nprobe=self.ann_nprobe
+                )
+                self.chat_history_collection = NumpyVectorStore(
+                    self.numpy_store_path, f"chat_history{suffix}", COLLECTION_SCHEMAS['chat_history'],
+                    self.db, dtype=self.vector_dtype, ann=self.ann_index, nprobe=self.ann_nprobe
+                )
+                print(f"✅ NumPy vector store initialized! ({self.vector_dtype})")
+            except Exception as e:
+                print(f"❌ Error initializing NumPy vector store: {e}")
+            return
+        
         try:
+            import chromadb
             self.chroma_client = chromadb.PersistentClient(path=self.vector_db_path)
             
-            # Create collections
             self.conversations_collection = self.chroma_client.get_or_create_collection(
-                name="conversations",
+                name=f"conversations{suffix}",
                 metadata={"description": "AI Twin conversations with Indu"}
             )
             
             self.chat_history_collection = self.chroma_client.get_or_create_collection(
-                name="chat_history", 
+                name=f"chat_history{suffix}", 
                 metadata={"description": "WhatsApp chat history"}
             )
             
@@ -120,225 +361,779 @@ class YaswanthAITwinDB:
     
     def detect_language_mix(self, text: str) -> str:
         """Detect language mix in text"""
-        telugu_chars = len(re.findall(r'[అ-౯]', text))
-        english_chars = len(re.findall(r'[a-zA-Z]', text))
-        
-        if telugu_chars > english_chars:
-            return "Telugu-dominant"
-        elif english_chars > telugu_chars:
-            return "English-dominant"
-        else:
-            return "Mixed"
+        return annotate_languages([text])[0]
     
     def detect_mood(self, text: str) -> str:
         """Simple mood detection"""
-        text_lower = text.lower()
-        
-        if any(word in text_lower for word in ['happy', 'good', 'great', 'awesome', 'nice', '😊', '😄', '😍']):
-            return "happy"
-        elif any(word in text_lower for word in ['sad', 'upset', 'angry', 'frustrated', 'bad', '😢', '😠']):
-            return "negative"
-        elif text.strip() in ['..', '.', '...', 'waiting', 'where']:
-            return "waiting/reminder"
-        else:
-            return "neutral"
+        return detect_mood(text)
     
     def store_conversation(self, user_input: str, ai_response: str, context: str = ""):
         """Store conversation in both SQLite and ChromaDB"""
         try:
-            timestamp = datetime.now().isoformat()
-            date = datetime.now().strftime('%Y-%m-%d')
-            mood = self.detect_mood(user_input)
-            language = self.detect_language_mix(user_input + " " + ai_response)
+            self.store_conversations_batch([self._make_turn(user_input, ai_response, context)])
+            print("💾 Conversation stored in database")
+        except Exception as e:
+            print(f"❌ Error storing conversation: {e}")
+    
+    def persist_conversation(self, user_input: str, ai_response: str, context: str = ""):
+        """Persist a conversation turn, via the write-behind queue when it is enabled"""
+        with self.stage_timer.measure('persist'):
+            if self.write_queue:
+                self.write_queue.submit(self._make_turn(user_input, ai_response, context))
+            else:
+                self.store_conversation(user_input, ai_response, context)
+    
+    def _make_turn(self, user_input: str, ai_response: str, context: str = "") -> Dict:
+        """Capture a conversation turn with the time it happened"""
+        now = datetime.now()
+        return {
+            'user_input': user_input,
+            'ai_response': ai_response,
+            'context': context,
+            'timestamp': now.isoformat(),
+            'date': now.strftime('%Y-%m-%d'),
+            'ts_epoch': now.timestamp()
+        }
+    
+    def store_conversations_batch(self, turns: List[Dict]):
+        """Store conversation turns with one encode, one transaction and one upsert.
+        
+        Raises on failure so the write-behind queue can retry the batch.
+        """
+        if not turns:
+            return
+        
+        rows = []
+        vectors = {}
+        for turn in turns:
+            mood = self.detect_mood(turn['user_input'])
+            language = self.detect_language_mix(turn['user_input'] + " " + turn['ai_response'])
             
             # Create combined text for embedding
-            combined_text = f"User: {user_input} | AI: {ai_response}"
+            combined_text = f"User: {turn['user_input']} | AI: {turn['ai_response']}"
             embedding_id = self.generate_embedding_id(combined_text)
             
-            # Store in SQLite
-            self.cursor.execute('''
+            rows.append((turn['timestamp'], turn['date'], turn['ts_epoch'], turn['user_input'],
+                         turn['ai_response'], turn['context'], mood, language, embedding_id))
+            vectors[embedding_id] = (combined_text, {
+                "timestamp": turn['timestamp'],
+                "date": turn['date'],
+                "ts_epoch": turn['ts_epoch'],
+                "mood": mood,
+                "language": language,
+                "context": turn['context']
+            })
+        
+        # Generate normalised embeddings, so distances are comparable across backends
+        ids = list(vectors)
+        embeddings = normalize_embeddings(
+            self.embedding_service.encode([vectors[eid][0] for eid in ids])
+        ).tolist()
+        self.conversations_collection.upsert(
+            embeddings=embeddings,
+            documents=[vectors[eid][0] for eid in ids],
+            metadatas=[vectors[eid][1] for eid in ids],
+            ids=ids
+        )
+        
+        # Store in SQLite in a single transaction
+        with self.db.write() as conn:
+            conn.executemany('''
                 INSERT OR REPLACE INTO conversations 
-                (timestamp, date, user_input, ai_response, context, mood, language_detected, embedding_id)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (timestamp, date, user_input, ai_response, context, mood, language, embedding_id))
-            
-            # Generate embedding and store in ChromaDB
-            embedding = self.embedding_model.encode([combined_text])[0].tolist()
-            
-            self.conversations_collection.upsert(
-                embeddings=[embedding],
-                documents=[combined_text],
-                metadatas=[{
-                    "timestamp": timestamp,
-                    "date": date,
-                    "mood": mood,
-                    "language": language,
-                    "context": context
-                }],
-                ids=[embedding_id]
-            )
-            
-            self.conn.commit()
-            print("💾 Conversation stored in database")
-            
-        except Exception as e:
-            print(f"❌ Error storing conversation: {e}")
+                (timestamp, date, ts_epoch, user_input, ai_response, context, mood, language_detected, embedding_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+        
+        self.query_cache.invalidate_results()
+    
+    def close(self):
+        """Flush pending writes and release background workers"""
+        if self.write_queue:
+            self.write_queue.close()
+        self.embedding_service.close()
     
-    def load_chat_data(self, chat_folder: str = "chat_data"):
-        """Load and process WhatsApp chat files into database"""
-        chat_files = Path(chat_folder).glob("*.txt")
+    def load_chat_data(self, chat_folder: str = "chat_data", batch_size: Optional[int] = None,
+                       workers: Optional[int] = None):
+        """Load WhatsApp chat files into database, ingesting only what is new since the last checkpoint"""
+        batch_size = batch_size or self.ingest_batch_size
+        workers = workers or self.ingest_workers
+        chat_files = sorted(Path(chat_folder).glob("*.txt"))
+        
+        if workers > 1:
+            self._load_chat_data_parallel(chat_files, batch_size, workers)
+            return
+        
+        total_messages = 0
+        total_seconds = 0.0
         
         for file_path in chat_files:
             print(f"📁 Processing {file_path.name}...")
             
-            # Check if file already processed
-            self.cursor.execute(
-                "SELECT COUNT(*) FROM chat_history WHERE file_name = ?", 
-                (file_path.name,)
-            )
+            start_offset, hasher = self._resume_point(file_path)
+            if start_offset is None:
+                print(f"⏭️ {file_path.name} already up to date, skipping...")
+                continue
+            
+            start_time = time.perf_counter()
+            message_count = self._ingest_chat_file(file_path, start_offset, hasher, batch_size)
             
-            if self.cursor.fetchone()[0] > 0:
-                print(f"⏭️ {file_path.name} already processed, skipping...")
+            elapsed = time.perf_counter() - start_time
+            rate = message_count / elapsed if elapsed > 0 else 0.0
+            print(f"⚡ {file_path.name}: {message_count} messages in {elapsed:.1f}s "
+                  f"({rate:.0f} msg/s, batch size {batch_size})")
+            
+            self.chat_data.append({
+                'file': file_path.name,
+                'message_count': message_count,
+                'seconds': elapsed,
+                'messages_per_sec': rate
+            })
+            total_messages += message_count
+            total_seconds += elapsed
+        
+        if total_seconds > 0:
+            print(f"📊 Ingested {total_messages} messages at {total_messages / total_seconds:.0f} msg/s")
+        print(f"✅ Processed {len(self.chat_data)} chat files")
+        self.backfill_chat_annotations(batch_size)
+        self.build_style_index()
+    
+    def _load_chat_data_parallel(self, chat_files: List[Path], batch_size: int, workers: int):
+        """Parse (and optionally embed) chat files in a process pool while this process writes"""
+        print(f"🚀 Ingesting {len(chat_files)} chat files with {workers} workers...")
+        jobs = [(file_path, self.get_ingestion_checkpoint(file_path.name)) for file_path in chat_files]
+        ingestor = ParallelIngestor(
+            workers, batch_size,
+            embedder_spec=self.embedder_spec if self.embed_in_workers else None
+        )
+        
+        start_time = time.perf_counter()
+        counts = {}
+        failed = set()
+        
+        for event in ingestor.run(jobs):
+            if event[0] == 'batch':
+                _, file_name, messages, embeddings, checkpoint = event
+                if file_name in failed:
+                    continue
+                stored = self.store_chat_messages_batch(file_name, messages, embeddings=embeddings,
+                                                        checkpoint=checkpoint)
+                if not stored:
+                    print(f"⚠️ Stopping {file_name}; it will resume from the last committed batch")
+                    failed.add(file_name)
+                counts[file_name] = counts.get(file_name, 0) + stored
                 continue
             
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                messages = self._parse_whatsapp_chat(content)
-                
-                # Store each message
-                for msg in messages:
-                    self.store_chat_message(file_path.name, msg)
-                
-                self.chat_data.append({
-                    'file': file_path.name,
-                    'content': content,
-                    'messages': messages
-                })
+            _, file_name, _, error, up_to_date = event
+            if error:
+                print(f"❌ Error ingesting {file_name}: {error}")
+            if up_to_date:
+                print(f"⏭️ {file_name} already up to date, skipping...")
+                continue
+            
+            elapsed = time.perf_counter() - start_time
+            message_count = counts.get(file_name, 0)
+            print(f"⚡ {file_name}: {message_count} messages after {elapsed:.1f}s")
+            self.chat_data.append({
+                'file': file_name,
+                'message_count': message_count,
+                'seconds': elapsed,
+                'messages_per_sec': message_count / elapsed if elapsed > 0 else 0.0
+            })
         
+        elapsed = time.perf_counter() - start_time
+        total_messages = sum(counts.values())
+        if elapsed > 0:
+            print(f"📊 Ingested {total_messages} messages at {total_messages / elapsed:.0f} msg/s "
+                  f"({workers} workers, batch size {batch_size})")
         print(f"✅ Processed {len(self.chat_data)} chat files")
+        self.backfill_chat_annotations(batch_size)
+        self.build_style_index()
+    
+    def get_ingestion_checkpoint(self, file_name: str) -> Optional[Dict]:
+        """Get the last committed ingestion checkpoint for a chat file"""
+        row = self.db.execute('''
+            SELECT fingerprint, byte_offset, last_timestamp, message_count, vector_space
+            FROM ingestion_checkpoints WHERE file_name = ?
+        ''', (file_name,)).fetchone()
+        if not row:
+            return None
+        # Checkpoints from another embedder or vector store don't cover this one's collection
+        if (row[4] or DEFAULT_MODEL_NAME) != self.vector_space:
+            return None
+        return {
+            'fingerprint': row[0],
+            'byte_offset': row[1],
+            'last_timestamp': row[2],
+            'message_count': row[3]
+        }
+    
+    def _resume_point(self, file_path: Path):
+        """Work out where ingestion of a chat file should (re)start from its checkpoint"""
+        return find_resume_point(file_path, self.get_ingestion_checkpoint(file_path.name))
+    
+    def _ingest_chat_file(self, file_path: Path, start_offset: int, hasher, batch_size: int) -> int:
+        """Stream a chat file from start_offset, committing each batch together with its checkpoint"""
+        checkpoint = self.get_ingestion_checkpoint(file_path.name) if start_offset else None
+        message_count = 0
+        
+        for messages, checkpoint in iter_checkpointed_batches(
+                file_path, start_offset, hasher, batch_size,
+                checkpoint['message_count'] if checkpoint else 0):
+            stored = self.store_chat_messages_batch(file_path.name, messages, checkpoint=checkpoint)
+            if not stored:
+                print(f"⚠️ Stopping {file_path.name}; it will resume from the last committed batch")
+                break
+            message_count += stored
+        
+        return message_count
     
     def store_chat_message(self, file_name: str, message: Dict):
         """Store individual chat message in database"""
+        self.store_chat_messages_batch(file_name, [message])
+    
+    def store_chat_messages_batch(self, file_name: str, messages: List[Dict],
+                                  embeddings: Optional[List[List[float]]] = None,
+                                  checkpoint: Optional[Dict] = None) -> int:
+        """Store a batch of chat messages with one encode, one transaction and chunked upserts.
+        
+        If a checkpoint is given it is committed in the same transaction as the rows.
+        Returns the number of messages stored (0 if the batch failed).
+        """
+        if not messages:
+            return 0
+        
         try:
-            embedding_id = self.generate_embedding_id(message['message'])
-            
-            # Store in SQLite
-            self.cursor.execute('''
-                INSERT OR REPLACE INTO chat_history 
-                (file_name, timestamp, sender, message, is_yaswanth, embedding_id)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                file_name, 
-                message['timestamp'], 
-                message['sender'], 
-                message['message'], 
-                message['is_yaswanth'],
-                embedding_id
-            ))
-            
-            # Generate embedding and store in ChromaDB
-            embedding = self.embedding_model.encode([message['message']])[0].tolist()
-            
-            self.chat_history_collection.upsert(
-                embeddings=[embedding],
-                documents=[message['message']],
-                metadatas=[{
-                    "file_name": file_name,
-                    "timestamp": message['timestamp'],
-                    "sender": message['sender'],
-                    "is_yaswanth": message['is_yaswanth']
-                }],
-                ids=[embedding_id]
-            )
+            if embeddings is None:
+                embeddings = self.embedding_model.encode(
+                    [msg['message'] for msg in messages], show_progress_bar=False
+                )
+            # Normalised like conversation vectors, so distances and the memory cutoff mean the same
+            embeddings = normalize_embeddings(embeddings).tolist()
+            
+            texts = [msg['message'] for msg in messages]
+            moods = annotate_moods(texts)
+            languages = annotate_languages(texts)
+            
+            rows = []
+            vectors = {}
+            for msg, embedding, mood, language in zip(messages, embeddings, moods, languages):
+                embedding_id = self.generate_embedding_id(msg['message'])
+                rows.append((
+                    file_name,
+                    msg['timestamp'],
+                    msg['sender'],
+                    msg['message'],
+                    msg['is_yaswanth'],
+                    embedding_id,
+                    mood,
+                    language
+                ))
+                # Repeated messages share an embedding ID; the last one wins, as with INSERT OR REPLACE
+                vectors[embedding_id] = (embedding, msg)
+            
+            # Vectors first, so committed SQLite rows always have their embeddings
+            ids = list(vectors)
+            for i in range(0, len(ids), self.upsert_chunk_size):
+                chunk_ids = ids[i:i + self.upsert_chunk_size]
+                self.chat_history_collection.upsert(
+                    embeddings=[vectors[eid][0] for eid in chunk_ids],
+                    documents=[vectors[eid][1]['message'] for eid in chunk_ids],
+                    metadatas=[{
+                        "file_name": file_name,
+                        "timestamp": vectors[eid][1]['timestamp'],
+                        "sender": vectors[eid][1]['sender'],
+                        "is_yaswanth": vectors[eid][1]['is_yaswanth']
+                    } for eid in chunk_ids],
+                    ids=chunk_ids
+                )
+            
+            # Store in SQLite in a single transaction
+            with self.db.write() as conn:
+                conn.executemany('''
+                    INSERT OR REPLACE INTO chat_history 
+                    (file_name, timestamp, sender, message, is_yaswanth, embedding_id, mood, language_detected)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', rows)
+                
+                if checkpoint:
+                    conn.execute('''
+                        INSERT OR REPLACE INTO ingestion_checkpoints
+                        (file_name, fingerprint, byte_offset, last_timestamp, message_count, updated_at, vector_space)
+                        VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP, ?)
+                    ''', (
+                        file_name,
+                        checkpoint['fingerprint'],
+                        checkpoint['byte_offset'],
+                        checkpoint['last_timestamp'],
+                        checkpoint['message_count'],
+                        self.vector_space
+                    ))
+            
+            return len(messages)
             
         except Exception as e:
-            print(f"❌ Error storing chat message: {e}")
+            print(f"❌ Error storing chat message batch: {e}")
+            return 0
     
-    def _parse_whatsapp_chat(self, content: str) -> List[Dict]:
-        """Parse WhatsApp chat format into structured messages"""
-        messages = []
-        lines = content.split('\n')
-        current_message = None
+    def backfill_chat_annotations(self, batch_size: Optional[int] = None) -> int:
+        """Annotate mood and language for chat_history rows stored before annotation existed"""
+        batch_size = batch_size or self.ingest_batch_size
+        annotated = 0
+        last_id = 0
         
-        for line in lines:
-            timestamp_match = re.match(r'\[(\d{2}/\d{2}/\d{2}, \d{1,2}:\d{2}:\d{2} [AP]M)\] ([^:]+): (.+)', line)
+        try:
+            while True:
+                rows = self.db.execute('''
+                    SELECT id, message FROM chat_history
+                    WHERE id > ? AND (mood IS NULL OR language_detected IS NULL)
+                    ORDER BY id LIMIT ?
+                ''', (last_id, batch_size)).fetchall()
+                if not rows:
+                    break
+                
+                texts = [row[1] for row in rows]
+                updates = zip(annotate_moods(texts), annotate_languages(texts), (row[0] for row in rows))
+                with self.db.write() as conn:
+                    conn.executemany(
+                        "UPDATE chat_history SET mood = ?, language_detected = ? WHERE id = ?",
+                        updates
+                    )
+                annotated += len(rows)
+                last_id = rows[-1][0]
+            
+            if annotated:
+                print(f"🏷️ Annotated mood and language for {annotated} chat messages")
+        except Exception as e:
+            print(f"❌ Error backfilling chat annotations: {e}")
+        
+        return annotated
+    
+    def build_style_index(self, clusters_per_mood: Optional[int] = None, force: bool = False) -> int:
+        """Cluster Yaswanth's stored messages per mood and persist one exemplar per cluster.
+        
+        Skipped when the index already covers the current is_yaswanth rows and vector space.
+        """
+        clusters_per_mood = clusters_per_mood or self.style_clusters
+        batch_size = self.ingest_batch_size
+        
+        try:
+            source_rows = self.db.execute("SELECT COUNT(*) FROM chat_history WHERE is_yaswanth = 1").fetchone()[0]
+            indexed_rows = self.db.execute(
+                "SELECT MAX(source_rows) FROM style_exemplars WHERE vector_space = ?", (self.vector_space,)
+            ).fetchone()[0]
+            if not force and indexed_rows == source_rows:
+                return 0
+            if not source_rows:
+                return 0
             
-            if timestamp_match:
-                if current_message:
-                    messages.append(current_message)
+            print(f"🎨 Building style index from {source_rows} of Yaswanth's messages...")
+            texts, moods, vectors = [], [], []
+            seen = set()
+            last_id = 0
+            while True:
+                rows = self.db.execute('''
+                    SELECT id, message, mood, embedding_id FROM chat_history
+                    WHERE is_yaswanth = 1 AND id > ?
+                    ORDER BY id LIMIT ?
+                ''', (last_id, batch_size)).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
                 
-                timestamp, sender, message = timestamp_match.groups()
+                # Reuse the vectors stored at ingestion time rather than re-encoding
+                stored = self.chat_history_collection.get(ids=[row[3] for row in rows], include=['embeddings'])
+                embeddings = dict(zip(stored['ids'], stored['embeddings']))
+                for _, message, mood, embedding_id in rows:
+                    key = normalize_query(message)
+                    if key in seen or embedding_id not in embeddings:
+                        continue
+                    seen.add(key)
+                    texts.append(message)
+                    moods.append(mood or 'neutral')
+                    vectors.append(embeddings[embedding_id])
+            
+            if not texts:
+                return 0
+            vectors = normalize_embeddings(vectors)
+            
+            exemplar_rows = []
+            for mood in sorted(set(moods)):
+                members = [i for i, m in enumerate(moods) if m == mood]
+                for exemplar in cluster_exemplars(vectors[members], clusters_per_mood):
+                    i = members[exemplar['index']]
+                    exemplar_rows.append((mood, texts[i], exemplar['cluster_size'],
+                                          vectors[i].astype(np.float32).tobytes(), self.vector_space, source_rows))
+            
+            with self.db.write() as conn:
+                conn.execute("DELETE FROM style_exemplars WHERE vector_space = ?", (self.vector_space,))
+                conn.executemany('''
+                    INSERT INTO style_exemplars
+                    (mood, message, cluster_size, embedding, vector_space, source_rows)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', exemplar_rows)
+            
+            self.style_index = self.load_style_index()
+            print(f"✅ Style index built: {len(exemplar_rows)} exemplars across {len(set(moods))} moods")
+            return len(exemplar_rows)
+            
+        except Exception as e:
+            print(f"❌ Error building style index: {e}")
+            return 0
+    
+    def load_style_index(self) -> StyleIndex:
+        """Load persisted style exemplars for the current vector space"""
+        try:
+            rows = self.db.execute('''
+                SELECT mood, message, cluster_size, embedding FROM style_exemplars
+                WHERE vector_space = ? ORDER BY cluster_size DESC
+            ''', (self.vector_space,)).fetchall()
+            return StyleIndex([{
+                'mood': row[0],
+                'message': row[1],
+                'cluster_size': row[2],
+                'embedding': np.frombuffer(row[3], dtype=np.float32)
+            } for row in rows])
+        except Exception as e:
+            print(f"❌ Error loading style index: {e}")
+            return StyleIndex([])
+    
+    def get_style_exemplars(self, user_input: str, n: Optional[int] = None) -> List[str]:
+        """Yaswanth's own messages closest to the incoming one, from the mood-matched bucket.
+        
+        Only reuses a query embedding memory retrieval already computed; when retrieval
+        was served lexically, the mood bucket's most typical exemplars are used instead
+        of encoding the message just for style.
+        """
+        n = self.style_exemplar_count if n is None else n
+        if not len(self.style_index) or n <= 0:
+            return []
+        try:
+            with self.stage_timer.measure('style'):
+                exemplars = self.style_index.nearest(self.query_cache.get_embedding(user_input),
+                                                     self.detect_mood(user_input), n)
+            return [exemplar['message'] for exemplar in exemplars]
+        except Exception as e:
+            print(f"❌ Error selecting style exemplars: {e}")
+            return []
+    
+    def _parse_whatsapp_chat(self, lines: Iterable[str]) -> Iterator[Dict]:
+        """Parse WhatsApp chat format into structured messages, streaming line by line"""
+        return iter_whatsapp_messages(lines)
+    
+    def backfill_conversation_vectors(self, batch_size: Optional[int] = None) -> int:
+        """Re-embed conversations stored without epoch timestamps or missing from the vector store.
+        
+        Chat history vectors stored before they were normalised are normalised too.
+        """
+        batch_size = batch_size or self.ingest_batch_size
+        repaired = 0
+        last_id = 0
+        
+        try:
+            stored_rows = self.db.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+            check_missing = self.conversations_collection.count() < stored_rows
+            
+            while True:
+                rows = self.db.execute(f'''
+                    SELECT id, timestamp, date, ts_epoch, user_input, ai_response, context, mood, language_detected
+                    FROM conversations
+                    WHERE id > ? {"" if check_missing else "AND ts_epoch IS NULL"}
+                    ORDER BY id LIMIT ?
+                ''', (last_id, batch_size)).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
                 
-                # Map names to consistent identifiers
-                if sender.lower() in ['yaswanth', 'prosessor', 'processor']:
-                    sender = 'Yaswanth'
-                elif sender.lower() in ['indu', 'mustang']:
-                    sender = 'Indu'
+                texts = [f"User: {row[4]} | AI: {row[5]}" for row in rows]
+                ids = [self.generate_embedding_id(text) for text in texts]
+                stored = set()
+                if check_missing:
+                    stored = set(self.conversations_collection.get(ids=ids, include=[])['ids'])
+                stale = [i for i, row in enumerate(rows) if row[3] is None or ids[i] not in stored]
+                if not stale:
+                    continue
                 
-                current_message = {
-                    'timestamp': timestamp,
-                    'sender': sender,
-                    'message': message.strip(),
-                    'is_yaswanth': sender == 'Yaswanth'
-                }
-            elif current_message and line.strip():
-                current_message['message'] += ' ' + line.strip()
+                epochs = {i: rows[i][3] or datetime.fromisoformat(rows[i][1]).timestamp() for i in stale}
+                embeddings = normalize_embeddings(
+                    self.embedding_model.encode([texts[i] for i in stale], show_progress_bar=False)
+                ).tolist()
+                self.conversations_collection.upsert(
+                    embeddings=embeddings,
+                    documents=[texts[i] for i in stale],
+                    metadatas=[{
+                        "timestamp": rows[i][1],
+                        "date": rows[i][2],
+                        "ts_epoch": epochs[i],
+                        "mood": rows[i][7],
+                        "language": rows[i][8],
+                        "context": rows[i][6]
+                    } for i in stale],
+                    ids=[ids[i] for i in stale]
+                )
+                with self.db.write() as conn:
+                    conn.executemany(
+                        "UPDATE conversations SET ts_epoch = ?, embedding_id = ? WHERE id = ?",
+                        [(epochs[i], ids[i], rows[i][0]) for i in stale]
+                    )
+                repaired += len(stale)
+            
+            if repaired:
+                print(f"🔁 Re-embedded {repaired} stored conversations")
+        except Exception as e:
+            print(f"❌ Error backfilling conversation vectors: {e}")
+        
+        self._normalize_chat_vectors(batch_size)
+        return repaired
+    
+    def _normalize_chat_vectors(self, batch_size: int) -> int:
+        """Rewrite chat_history vectors that were stored without L2 normalisation.
+        
+        Older rows come first by id, so the scan stops at the first batch that is
+        already normalised; after the one-off repair that is a single batch.
+        """
+        fixed = 0
+        last_id = 0
         
-        if current_message:
-            messages.append(current_message)
+        try:
+            while True:
+                rows = self.db.execute(
+                    "SELECT id, embedding_id FROM chat_history WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                
+                stored = self.chat_history_collection.get(
+                    ids=list(dict.fromkeys(row[1] for row in rows)),
+                    include=['embeddings', 'documents', 'metadatas']
+                )
+                if not len(stored['ids']):
+                    continue
+                norms = np.linalg.norm(np.asarray(stored['embeddings'], dtype=np.float32), axis=1)
+                stale = np.flatnonzero(np.abs(norms - 1) > 1e-3)
+                if not len(stale):
+                    break
+                
+                self.chat_history_collection.upsert(
+                    embeddings=normalize_embeddings([stored['embeddings'][i] for i in stale]).tolist(),
+                    documents=[stored['documents'][i] for i in stale],
+                    metadatas=[stored['metadatas'][i] for i in stale],
+                    ids=[stored['ids'][i] for i in stale]
+                )
+                fixed += len(stale)
             
-        return messages
+            if fixed:
+                print(f"🔁 Normalised {fixed} stored chat history vectors")
+        except Exception as e:
+            print(f"❌ Error normalising chat history vectors: {e}")
+        
+        return fixed
     
     def semantic_search_conversations(self, query: str, limit: int = 5, days_back: int = 7) -> List[Dict]:
-        """Search for relevant conversations using semantic similarity"""
+        """Find the `limit` most relevant distinct conversations from the last `days_back` days.
+        
+        In hybrid mode BM25 and vector rankings are fused with reciprocal-rank
+        fusion; when at least `limit` conversations contain every query term,
+        the lexical hits are returned without encoding the query at all.
+        """
         try:
-            # Generate query embedding
-            query_embedding = self.embedding_model.encode([query])[0].tolist()
+            cached_results = self.query_cache.get_results(query, limit, days_back)
+            if cached_results is not None:
+                return cached_results
+            generation = self.query_cache.generation
+            
+            if self.retrieval_mode == 'vector':
+                relevant_conversations = self._vector_search_conversations(query, limit, days_back)
+                self.retrieval_stats['vector'] += 1
+            else:
+                strong_matches = []
+                if self.lexical_shortcut or self.retrieval_mode == 'lexical':
+                    strong_matches = self.lexical_search_conversations(query, limit, days_back, require_all=True)
+                
+                if len(strong_matches) >= limit or self.retrieval_mode == 'lexical':
+                    relevant_conversations = strong_matches or \
+                        self.lexical_search_conversations(query, limit, days_back)
+                    self.retrieval_stats['lexical_only'] += 1
+                else:
+                    fused = reciprocal_rank_fusion(
+                        [self.lexical_search_conversations(query, limit * 2, days_back),
+                         self._vector_search_conversations(query, limit * 2, days_back)],
+                        key=lambda conv: normalize_query(conv['document'])
+                    )
+                    relevant_conversations = fused[:limit]
+                    self.retrieval_stats['hybrid'] += 1
             
-            # Search in conversations
+            self.query_cache.put_results(query, (limit, days_back), relevant_conversations, generation)
+            return relevant_conversations
+            
+        except Exception as e:
+            print(f"❌ Error in semantic search: {e}")
+            return []
+    
+    def lexical_search_conversations(self, query: str, limit: int = 5, days_back: int = 7,
+                                     require_all: bool = False) -> List[Dict]:
+        """BM25-ranked conversations from the last `days_back` days matching any (or all) query terms,
+        scoring at least `lexical_min_score`"""
+        match_query = build_match_query(query, require_all=require_all)
+        if not match_query:
+            return []
+        
+        rows = self.db.execute('''
+            SELECT c.user_input, c.ai_response, c.timestamp, c.date, c.ts_epoch, c.mood,
+                   c.language_detected, c.context, bm25(conversations_fts) AS score
+            FROM conversations_fts JOIN conversations c ON c.id = conversations_fts.rowid
+            WHERE conversations_fts MATCH ? AND c.ts_epoch >= ?
+            ORDER BY score LIMIT ?
+        ''', (match_query, time.time() - days_back * 86400, limit)).fetchall()
+        
+        # Best first, so the weak matches cut here are all at the tail
+        return [{
+            'document': f"User: {row[0]} | AI: {row[1]}",
+            'metadata': {
+                'timestamp': row[2],
+                'date': row[3],
+                'ts_epoch': row[4],
+                'mood': row[5],
+                'language': row[6],
+                'context': row[7]
+            },
+            'distance': None,
+            'bm25': row[8],
+            'source': 'lexical'
+        } for row in rows if -row[8] >= self.lexical_min_score]
+    
+    def _vector_search_conversations(self, query: str, limit: int, days_back: int) -> List[Dict]:
+        """Nearest distinct conversations within the time window and distance threshold"""
+        query_embedding = self._query_embedding(query)
+        
+        # The time window is applied inside the vector query, so old turns never take top-k slots
+        where = {"ts_epoch": {"$gte": time.time() - days_back * 86400}}
+        n_results = limit * 2
+        
+        while True:
             results = self.conversations_collection.query(
                 query_embeddings=[query_embedding],
-                n_results=limit,
-                # Note: ChromaDB date filtering can be tricky, so we'll filter after retrieval
+                n_results=n_results,
+                where=where
             )
+            documents = results['documents'][0] if results['documents'] else []
             
             relevant_conversations = []
-            if results['documents']:
-                for i, doc in enumerate(results['documents'][0]):
-                    metadata = results['metadatas'][0][i]
-                    if datetime.strptime(metadata['date'], '%Y-%m-%d') >= (datetime.now() - timedelta(days=days_back)):
-                        relevant_conversations.append({
-                            'document': doc,
-                            'metadata': metadata,
-                            'distance': results['distances'][0][i] if 'distances' in results else 0
-                        })
-                    relevant_conversations.append({
-                        'document': doc,
-                        'metadata': metadata,
-                        'distance': results['distances'][0][i] if 'distances' in results else 0
-                    })
+            seen = set()
+            exhausted = len(documents) < n_results
+            for i, doc in enumerate(documents):
+                distance = results['distances'][0][i]
+                if distance > self.memory_max_distance:
+                    # Results come nearest first, so nothing further will qualify
+                    exhausted = True
+                    break
+                key = normalize_query(doc)
+                if key in seen:
+                    continue
+                seen.add(key)
+                relevant_conversations.append({
+                    'document': doc,
+                    'metadata': results['metadatas'][0][i],
+                    'distance': distance,
+                    'source': 'vector'
+                })
+                if len(relevant_conversations) == limit:
+                    break
             
-            return relevant_conversations
+            # Duplicates used up slots; widen the query until we have `limit` or run out
+            if len(relevant_conversations) == limit or exhausted:
+                break
+            n_results *= 2
+        
+        return relevant_conversations
+    
+    def search_chat_history(self, query: str, limit: int = 5, yaswanth_only: bool = False) -> List[Dict]:
+        """Hybrid BM25 + vector search over the WhatsApp chat history"""
+        try:
+            if self.retrieval_mode != 'vector':
+                strong_matches = []
+                if self.lexical_shortcut or self.retrieval_mode == 'lexical':
+                    strong_matches = self.lexical_search_chat_history(query, limit, yaswanth_only, require_all=True)
+                if len(strong_matches) >= limit or self.retrieval_mode == 'lexical':
+                    return strong_matches or self.lexical_search_chat_history(query, limit, yaswanth_only)
+            
+            results = self.chat_history_collection.query(
+                query_embeddings=[self._query_embedding(query)],
+                n_results=limit * 2,
+                where={"is_yaswanth": True} if yaswanth_only else None
+            )
+            vector = [{
+                'document': doc,
+                'metadata': results['metadatas'][0][i],
+                'distance': results['distances'][0][i],
+                'source': 'vector'
+            } for i, doc in enumerate(results['documents'][0] if results['documents'] else [])]
+            
+            if self.retrieval_mode == 'vector':
+                return vector[:limit]
+            return reciprocal_rank_fusion(
+                [self.lexical_search_chat_history(query, limit * 2, yaswanth_only), vector],
+                key=lambda msg: normalize_query(msg['document'])
+            )[:limit]
             
         except Exception as e:
-            print(f"❌ Error in semantic search: {e}")
+            print(f"❌ Error searching chat history: {e}")
             return []
     
-    def get_context_from_memory(self, user_input: str) -> str:
-        """Get relevant context from memory using semantic search"""
-        # Search for relevant conversations
-        relevant_convs = self.semantic_search_conversations(user_input, limit=3)
+    def lexical_search_chat_history(self, query: str, limit: int = 5, yaswanth_only: bool = False,
+                                    require_all: bool = False) -> List[Dict]:
+        """BM25-ranked chat messages matching any (or all) query terms, scoring at least `lexical_min_score`"""
+        match_query = build_match_query(query, require_all=require_all)
+        if not match_query:
+            return []
         
-        if not relevant_convs:
-            return ""
+        rows = self.db.execute(f'''
+            SELECT h.message, h.file_name, h.timestamp, h.sender, h.is_yaswanth, bm25(chat_history_fts) AS score
+            FROM chat_history_fts JOIN chat_history h ON h.id = chat_history_fts.rowid
+            WHERE chat_history_fts MATCH ? {"AND h.is_yaswanth = 1" if yaswanth_only else ""}
+            ORDER BY score LIMIT ?
+        ''', (match_query, limit)).fetchall()
         
-        context = "RELEVANT PAST CONVERSATIONS:\n"
+        return [{
+            'document': row[0],
+            'metadata': {
+                'file_name': row[1],
+                'timestamp': row[2],
+                'sender': row[3],
+                'is_yaswanth': bool(row[4])
+            },
+            'distance': None,
+            'bm25': row[5],
+            'source': 'lexical'
+        } for row in rows if -row[5] >= self.lexical_min_score]
+    
+    def _query_embedding(self, query: str) -> List[float]:
+        """Normalised query embedding, reused for repeated queries"""
+        query_embedding = self.query_cache.get_embedding(query)
+        if query_embedding is None:
+            query_embedding = normalize_embeddings(self.embedding_service.encode([query]))[0].tolist()
+            self.query_cache.put_embedding(query, query_embedding)
+        return query_embedding
+    
+    def get_memory_lines(self, user_input: str) -> List[str]:
+        """Relevant past conversations, most relevant first, one prompt line each"""
+        with self.stage_timer.measure('retrieval'):
+            relevant_convs = self.semantic_search_conversations(user_input, limit=3)
+        
+        lines = []
         for conv in relevant_convs:
             date = conv['metadata'].get('date', 'Unknown')
             mood = conv['metadata'].get('mood', 'neutral')
-            context += f"[{date}] ({mood}) {conv['document']}\n"
-        
-        return context
+            lines.append(f"[{date}] ({mood}) {conv['document']}")
+        return lines
+    
+    def get_context_from_memory(self, user_input: str) -> str:
+        """Get relevant context from memory using semantic search"""
+        lines = self.get_memory_lines(user_input)
+        if not lines:
+            return ""
+        return MEMORY_HEADER + ''.join(f"{line}\n" for line in lines)
     
     def build_personality_prompt(self) -> str:
         """Build personality prompt from YAML config"""
@@ -386,44 +1181,152 @@ Remember: You have perfect memory of all past conversations. Use this wisely to
 
         return personality_prompt
     
-    def generate_response(self, user_input: str, context: str = "") -> str:
-        """Generate response with database-powered memory"""
+    def _build_messages(self, user_input: str, context: str = "") -> List[Dict[str, str]]:
+        """Build the chat messages for a reply, with memory and style context"""
+        return self._prepare_reply(user_input, context)[0]
+    
+    def _prepare_reply(self, user_input: str, context: str = "") -> Tuple[List[Dict[str, str]], Route]:
+        """Retrieve memory and style context, then build the messages and pick the model"""
+        # Get relevant context from database
+        memories = self.get_memory_lines(user_input)
+        exemplars = self.get_style_exemplars(user_input)
+        return self._assemble_messages(user_input, context, memories, exemplars), \
+            self.route_reply(user_input, memories)
+    
+    def route_reply(self, user_input: str, memories: List[str]) -> Route:
+        """Model route for a message, from features that cost no extra model calls"""
+        return self.model_router.route(RouteFeatures(
+            mood=self.detect_mood(user_input),
+            chars=len(user_input.strip()),
+            language=self.detect_language_mix(user_input),
+            memory_hit=bool(memories)
+        ))
+    
+    def record_route(self, route: Route, started: float, messages: List[Dict[str, str]], ai_response: str):
+        """Log the reply's latency and (estimated) token counts against its route"""
+        elapsed = time.perf_counter() - started
+        self.stage_timer.record('llm', elapsed)
+        self.model_router.record(route, elapsed,
+                                 self.prompt_builder.count_messages(messages),
+                                 self.prompt_builder.counter.count(ai_response))
+    
+    def _assemble_messages(self, user_input: str, context: str, memories: List[str],
+                           exemplars: List[str]) -> List[Dict[str, str]]:
+        """Fit memories, then style exemplars, into the token budget around the user message"""
         if not self.personality_prompt:
             self.personality_prompt = self.build_personality_prompt()
         
-        # Get relevant context from database
-        memory_context = self.get_context_from_memory(user_input)
+        # Both lists arrive most relevant first
+        with self.stage_timer.measure('prompt'):
+            return self.prompt_builder.build(
+                self.personality_prompt, USER_PROMPT_TEMPLATE,
+                fixed={'context': context, 'input': user_input},
+                ranked=[
+                    ('memory', MEMORY_HEADER, [(-rank, line) for rank, line in enumerate(memories)]),
+                    # Few-shot examples of how Yaswanth actually texts in this mood
+                    ('style', STYLE_HEADER, [(-rank, f"- {message}") for rank, message in enumerate(exemplars)])
+                ]
+            )
+    
+    def personality_prompt_hash(self) -> str:
+        """Hash of the system prompt, so cached replies never outlive a personality change"""
+        if not self.personality_prompt:
+            self.personality_prompt = self.build_personality_prompt()
+        if self._prompt_hash is None or self._prompt_hash[0] != self.personality_prompt:
+            digest = hashlib.sha256(self.personality_prompt.encode('utf-8')).hexdigest()[:16]
+            self._prompt_hash = (self.personality_prompt, digest)
+        return self._prompt_hash[1]
+    
+    def get_cached_response(self, user_input: str, context: str = "") -> Optional[str]:
+        """A cached reply for this message, or None; messages with explicit context are never cached"""
+        if not self.response_cache or context:
+            return None
+        with self.stage_timer.measure('cache'):
+            return self.response_cache.get(self.personality_prompt_hash(), user_input,
+                                           self.detect_mood(user_input),
+                                           lambda: self._query_embedding(user_input))
+    
+    def cache_response(self, user_input: str, ai_response: str, context: str = ""):
+        """Offer a freshly generated reply to the response cache"""
+        if not self.response_cache or context or not ai_response:
+            return
+        self.response_cache.put(self.personality_prompt_hash(), user_input,
+                                self.detect_mood(user_input),
+                                lambda: self._query_embedding(user_input), ai_response)
+    
+    def fallback_response(self, user_input: str, error: Exception) -> str:
+        """Reply when the LLM failed or its circuit is open; never cached or persisted"""
+        self.llm_fallbacks += 1
+        print(f"❌ LLM unavailable, serving degraded reply: {error}")
+        if self.degraded_response:
+            return self.degraded_response(user_input)
+        return f"Sorry, technical issue ayindhi. {str(error)}"
+    
+    def generate_response(self, user_input: str, context: str = "") -> str:
+        """Generate response with database-powered memory"""
+        cached = self.get_cached_response(user_input, context)
+        if cached is not None:
+            self.persist_conversation(user_input, cached, context)
+            return cached
         
-        system_prompt = self.personality_prompt
+        # Don't spend retrieval on a reply the upstream can't produce
+        if not self.llm.healthy():
+            return self.fallback_response(user_input, CircuitOpenError("circuit open"))
+        
+        messages, route = self._prepare_reply(user_input, context)
         
-        user_prompt = f"""{memory_context}
-
-Current context: {context}
-
-User (Indu): {user_input}
-
-Respond as Yaswanth would - naturally mixing Telugu-English, being caring but not desperate. If there are relevant past conversations, acknowledge them appropriately. Keep it 1-2 lines and authentic."""
-
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.8,
-                max_tokens=150
-            )
-            
-            ai_response = response.choices[0].message.content.strip()
+            started = time.perf_counter()
+            ai_response = self.llm.complete(messages, model=route.model, temperature=route.temperature,
+                                            max_tokens=route.max_tokens)
+            self.record_route(route, started, messages, ai_response)
+            self.cache_response(user_input, ai_response, context)
             
-            # Store conversation in database
-            self.store_conversation(user_input, ai_response, context)
+            # Persist in the background; the reply doesn't wait for encode, commit and upsert
+            self.persist_conversation(user_input, ai_response, context)
             
             return ai_response
             
         except Exception as e:
-            return f"Sorry, technical issue ayindhi. {str(e)}"
+            return self.fallback_response(user_input, e)
+    
+    def stream_response(self, user_input: str, context: str = "") -> Iterator[str]:
+        """Generate a response with database-powered memory, yielding text as it is produced.
+        
+        The turn is persisted after the last token; a stream the caller abandons
+        or that fails part-way is not stored. A failure after text has been sent
+        is raised, so the caller can report it separately from the partial reply.
+        """
+        cached = self.get_cached_response(user_input, context)
+        if cached is not None:
+            yield cached
+            self.persist_conversation(user_input, cached, context)
+            return
+        
+        if not self.llm.healthy():
+            yield self.fallback_response(user_input, CircuitOpenError("circuit open"))
+            return
+        
+        messages, route = self._prepare_reply(user_input, context)
+        
+        parts = []
+        try:
+            started = time.perf_counter()
+            for delta in self.llm.stream(messages, model=route.model, temperature=route.temperature,
+                                         max_tokens=route.max_tokens):
+                parts.append(delta)
+                yield delta
+        except Exception as e:
+            if parts:
+                print(f"❌ LLM stream cut off: {e}")
+                raise
+            yield self.fallback_response(user_input, e)
+            return
+        
+        ai_response = ''.join(parts).strip()
+        self.record_route(route, started, messages, ai_response)
+        self.cache_response(user_input, ai_response, context)
+        self.persist_conversation(user_input, ai_response, context)
     
     def chat_interface(self):
         """Enhanced chat interface with database"""
@@ -442,10 +1345,29 @@ Respond as Yaswanth would - naturally mixing Telugu-English, being caring but no
                 response = self.generate_response(user_input)
                 print(f"Yaswanth: {response}\n")
     
+    def get_metrics(self) -> Dict[str, Any]:
+        """Runtime metrics for the request path"""
+        return {
+            'embedding_service': self.embedding_service.stats(),
+            'query_cache': self.query_cache.stats(),
+            'response_cache': self.response_cache.stats() if self.response_cache else None,
+            'prompt': self.prompt_builder.stats(),
+            'llm': dict(self.llm.stats(), fallbacks=self.llm_fallbacks),
+            'routes': self.model_router.stats(),
+            'stages': self.stage_timer.stats(),
+            'write_queue': self.write_queue.stats() if self.write_queue else None,
+            'retrieval': dict(self.retrieval_stats),
+            'sqlite': self.db.stats()
+        }
+    
     def __del__(self):
         """Close database connections"""
-        if hasattr(self, 'conn'):
-            self.conn.close()
+        for collection in (getattr(self, 'conversations_collection', None),
+                           getattr(self, 'chat_history_collection', None)):
+            if isinstance(collection, NumpyVectorStore):
+                collection.close()
+        if hasattr(self, 'db'):
+            self.db.close()
 
 if __name__ == "__main__":
     # Get API key from environment variable or user input
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+ANN Index - Inverted-file (IVF) approximate search for the NumPy vector store
+Rows are bucketed under their nearest spherical k-means centroid; a query only
+scores the rows in its `nprobe` nearest buckets. Centroids are saved as .npy and
+row assignments in an append-only int32 file, so inserts stay incremental
+"""
+
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Rows per chunk when assigning or scanning, bounding float32 temporaries
+ASSIGN_CHUNK_ROWS = 65536
+
+# Centroid training sample per list; k-means on the full corpus buys little recall
+TRAIN_ROWS_PER_LIST = 64
+
+
+def default_list_count(rows: int) -> int:
+    """~4 * sqrt(N) lists, the usual IVF sizing, capped to keep training tractable"""
+    return int(min(4096, max(16, 4 * np.sqrt(rows))))
+
+
+def spherical_kmeans(vectors: np.ndarray, n_lists: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Unit-norm centroids maximising cosine similarity to their members"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_lists, replace=False)].astype(np.float32)
+
+    for _ in range(iterations):
+        labels = assign_lists(vectors, centroids)
+        counts = np.bincount(labels, minlength=n_lists)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        sums = np.zeros_like(centroids)
+        sums[counts > 0] = np.add.reduceat(vectors[np.argsort(labels, kind='stable')], starts[counts > 0])
+        # Re-seed empty lists from random rows rather than leaving dead centroids
+        empty = np.flatnonzero(counts == 0)
+        sums[empty] = vectors[rng.choice(len(vectors), len(empty))]
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+
+    return centroids
+
+
+def assign_lists(vectors, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid of each vector, chunked so float16 input never converts all at once"""
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_CHUNK_ROWS):
+        chunk = np.asarray(vectors[start:start + ASSIGN_CHUNK_ROWS], dtype=np.float32)
+        labels[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return labels
+
+
+class IVFIndex:
+    """Inverted lists over the rows of a vector matrix the caller owns"""
+
+    def __init__(self, path_prefix: Path, nprobe: int = 16):
+        self.centroids_path = Path(f"{path_prefix}.ivf-centroids.npy")
+        self.assignments_path = Path(f"{path_prefix}.ivf-lists.i32")
+        self.nprobe = nprobe
+        self.centroids: Optional[np.ndarray] = None
+        self.assignments = np.empty(0, dtype=np.int32)
+        self._lists: List[np.ndarray] = []
+        self._pending: List[List[int]] = []
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def load(self) -> bool:
+        """Load a saved index; returns False if there is none"""
+        if not (self.centroids_path.exists() and self.assignments_path.exists()):
+            return False
+        self.centroids = np.load(self.centroids_path)
+        self.assignments = np.fromfile(self.assignments_path, dtype=np.int32)
+        self._rebuild_lists()
+        return True
+
+    def build(self, matrix, rows: int, n_lists: Optional[int] = None, seed: int = 0, save: bool = True):
+        """Train centroids on a sample of the first `rows` rows and assign every row.
+
+        With save=False nothing is written until save() is called.
+        """
+        n_lists = min(n_lists or default_list_count(rows), rows)
+        start = time.perf_counter()
+
+        rng = np.random.default_rng(seed)
+        sample_size = min(rows, n_lists * TRAIN_ROWS_PER_LIST)
+        sample = np.sort(rng.choice(rows, sample_size, replace=False))
+        self.centroids = spherical_kmeans(np.asarray(matrix[sample], dtype=np.float32), n_lists, seed=seed)
+        self.assignments = assign_lists(matrix[:rows], self.centroids)
+
+        if save:
+            self.save()
+        self._rebuild_lists()
+        print(f"🧭 Built IVF index: {rows} vectors in {n_lists} lists ({time.perf_counter() - start:.1f}s)")
+
+    def save(self):
+        """Write the centroids and every row's assignment"""
+        np.save(self.centroids_path, self.centroids)
+        self.assignments.tofile(self.assignments_path)
+
+    def _rebuild_lists(self):
+        assigned = np.flatnonzero(self.assignments >= 0)
+        labels = self.assignments[assigned]
+        order = assigned[np.argsort(labels, kind='stable')]
+        bounds = np.cumsum(np.bincount(labels, minlength=len(self.centroids)))
+        self._lists = np.split(order, bounds[:-1])
+        self._pending = [[] for _ in range(len(self.centroids))]
+
+    def add(self, row_numbers: np.ndarray, vectors: np.ndarray):
+        """Assign new or overwritten rows to lists and persist their assignments"""
+        labels = assign_lists(vectors, self.centroids)
+        end = int(row_numbers.max()) + 1
+        if end > len(self.assignments):
+            # Rows past the saved assignments are appended; -1 marks rows never assigned
+            grown = np.full(end, -1, dtype=np.int32)
+            grown[:len(self.assignments)] = self.assignments
+            self.assignments = grown
+
+        self.assignments[row_numbers] = labels
+        for row_number, label in zip(row_numbers.tolist(), labels.tolist()):
+            # An overwritten row keeps a stale entry in its old list; search dedupes rows
+            self._pending[label].append(row_number)
+
+        with open(self.assignments_path, 'r+b' if self.assignments_path.exists() else 'w+b') as f:
+            for row_number, label in zip(row_numbers.tolist(), labels.tolist()):
+                f.seek(row_number * 4)
+                f.write(np.int32(label).tobytes())
+
+        # Fold pending inserts into the main lists once they are a noticeable share
+        if sum(len(p) for p in self._pending) > max(1024, len(self.assignments) // 20):
+            self._rebuild_lists()
+
+    def probe(self, query: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """Rows in the nprobe lists nearest the query"""
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        nearest = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        parts = [self._lists[i] for i in nearest]
+        parts.extend(np.array(self._pending[i], dtype=np.int64) for i in nearest if self._pending[i])
+        return np.unique(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+
+    def search(self, matrix, live: np.ndarray, query: np.ndarray, k: int,
+               candidates: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top-k rows by cosine, optionally restricted to candidate rows.
+
+        With candidates, more lists are probed until k live candidates are found
+        or every list has been searched.
+        """
+        nprobe = self.nprobe
+        while True:
+            rows = self.probe(query, nprobe)
+            rows = rows[rows < len(live)]
+            rows = rows[live[rows]]
+            if candidates is not None:
+                rows = rows[np.isin(rows, candidates, assume_unique=True)]
+            if len(rows) >= k or nprobe >= len(self.centroids):
+                break
+            nprobe *= 2
+
+        if len(rows) == 0:
+            return rows, np.empty(0, dtype=np.float32)
+
+        scores = np.asarray(matrix[rows], dtype=np.float32) @ query
+        if len(rows) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[top], scores[top]
+        order = np.argsort(-scores)
+        return rows[order], scores[order]
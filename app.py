@@ -4,15 +4,18 @@ AI Twin Web Interface
 Flask web application for interactive AI Twin chat with database viewing
 """
 
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, render_template, request, jsonify, redirect, url_for, Response, stream_with_context
 import os
 from dotenv import load_dotenv
 load_dotenv()
-import sqlite3
 from datetime import datetime
 import json
 import random
 from ai_twin_db import YaswanthAITwinDB
+from stage_timer import server_timing_header
+from sqlite_pool import SQLitePool
+from dashboard_stats import create_stats_tables, read_stats
+from query_cache import LRUCache
 
 app = Flask(__name__)
 app.secret_key = 'ai_twin_secret_key_2024'
@@ -20,6 +23,12 @@ app.secret_key = 'ai_twin_secret_key_2024'
 # Global AI Twin instance
 ai_twin = None
 
+# Dashboard connections while there is no AI Twin (demo mode); otherwise its pool is used
+demo_db = None
+
+# Dashboard polls within this many seconds share one read of the stats counters
+stats_cache = LRUCache(1, ttl=float(os.getenv('AI_TWIN_STATS_TTL', '5')))
+
 def init_ai_twin():
     """Initialize AI Twin with API key"""
     global ai_twin
@@ -33,6 +42,8 @@ def init_ai_twin():
     
     try:
         ai_twin = YaswanthAITwinDB(api_key)
+        # Calls that fail after retries degrade to the demo replies too
+        ai_twin.degraded_response = lambda message: demo_response(message.lower())
         print("✅ AI Twin initialized successfully!")
         return True
     except Exception as e:
@@ -40,6 +51,78 @@ def init_ai_twin():
         print("🌐 Website will load in demo mode")
         return False
 
+def database() -> SQLitePool:
+    """Connection pool for the dashboard routes"""
+    global demo_db
+    if ai_twin:
+        return ai_twin.db
+    if demo_db is None:
+        # Keeps the file's journal mode; the AI Twin switches it to WAL when it runs
+        demo_db = SQLitePool('ai_twin_memory.db', journal_mode=None)
+        try:
+            # Databases written before the stats tables existed get them filled from their rows
+            with demo_db.write() as conn:
+                create_stats_tables(conn)
+        except Exception as e:
+            print(f"❌ Error creating stats tables: {e}")
+    return demo_db
+
+def llm_degraded() -> bool:
+    """True while the AI Twin's circuit breaker has the OpenAI upstream marked unhealthy"""
+    return bool(ai_twin) and not ai_twin.llm.healthy()
+
+def demo_response(user_message: str) -> str:
+    """Contextual demo response for when no OpenAI key is configured"""
+    # Greeting responses
+    if any(word in user_message for word in ['hello', 'hi', 'hey', 'namaste', 'hola']):
+        demo_responses = [
+            "Hello! 👋 I'm your AI Twin demo. In full mode, I chat in 5 languages with 90%+ accuracy!",
+            "Hey there! 🌟 This is AI Twin 2.0 demo. The real version analyzes your WhatsApp chats!",
+            "Namaste! 🙏 Demo mode lo unna, but full AI Twin chala powerful undi!",
+            "Hi! ✨ I'm showcasing multilingual AI capabilities. Real version needs OpenAI API key!"
+        ]
+    
+    # Questions about AI Twin
+    elif any(word in user_message for word in ['what', 'who', 'how', 'tell me']):
+        demo_responses = [
+            "I'm AI Twin 2.0! 🤖 I replicate personalities using ML, support 5 languages, and have semantic memory!",
+            "This is a multilingual AI that learns from WhatsApp chats. 680KB+ data processed with <2s response time! ⚡",
+            "AI Twin analyzes communication patterns in Telugu, English, Hindi, Malayalam & Tamil! 🌍",
+            "I'm built with OpenAI GPT-4, ChromaDB vector search, and personality replication technology! 🧠"
+        ]
+    
+    # Language-specific responses
+    elif any(word in user_message for word in ['telugu', 'hindi', 'language', 'multilingual']):
+        demo_responses = [
+            "Yes! I support Telugu, English, Hindi, Malayalam, Tamil with 95%+ language detection accuracy! 🇮🇳",
+            "Multilingual support tho natural code-switching chestanu! Demo mode lo limited responses untayi. 😊",
+            "Languages are my specialty! Full version lo natural conversations in mixed languages! 🌟",
+            "Telugu-English code-switching with 95% accuracy! Real AI Twin lo complete personality replication! ✨"
+        ]
+    
+    # Technical questions
+    elif any(word in user_message for word in ['how work', 'technology', 'api', 'setup']):
+        demo_responses = [
+            "Built with Flask, OpenAI GPT-4, ChromaDB vector DB, and SQLite! 🛠️ Need API key for full features.",
+            "Technology stack: Python 3.8+, Sentence Transformers, YAML config, WhatsApp integration! 🚀",
+            "Dual-database architecture: SQLite + ChromaDB for <100ms query performance! ⚡",
+            "Semantic memory with vector embeddings, mood detection, and personality configuration! 🧠"
+        ]
+    
+    # Default varied responses
+    else:
+        demo_responses = [
+            "This is AI Twin 2.0 demo! 🎯 Full version has 90%+ authenticity in personality replication!",
+            "Demo mode active! Real AI Twin processes WhatsApp chats and learns your communication style! 📱",
+            "Impressive interface, right? 😎 Full AI Twin remembers conversations and adapts to your personality!",
+            "AI Twin 2.0 showcase mode! 🌟 Production version supports real-time learning and memory!",
+            "Demo response generated! 🤖 Full AI Twin ki OpenAI API key set cheyyandi for real conversations!",
+            "Testing the chat interface? 💬 Real AI Twin has semantic search across 1000+ conversations!",
+            "Cool UI design kada? 🎨 Full version lo personality traits and mood detection untundi!"
+        ]
+    
+    return random.choice(demo_responses)
+
 @app.route('/')
 def index():
     """Main chat interface"""
@@ -50,7 +133,8 @@ def chat():
     """Handle chat messages"""
     global ai_twin
     
-    if not ai_twin:
+    # No API key, or the upstream is failing: answer from the demo path instead of waiting
+    if not ai_twin or llm_degraded():
         # Get user message for contextual demo responses
         try:
             data = request.get_json()
@@ -58,63 +142,11 @@ def chat():
         except:
             user_message = ''
         
-        # Contextual demo responses based on user input
-        import random
-        
-        # Greeting responses
-        if any(word in user_message for word in ['hello', 'hi', 'hey', 'namaste', 'hola']):
-            demo_responses = [
-                "Hello! 👋 I'm your AI Twin demo. In full mode, I chat in 5 languages with 90%+ accuracy!",
-                "Hey there! 🌟 This is AI Twin 2.0 demo. The real version analyzes your WhatsApp chats!",
-                "Namaste! 🙏 Demo mode lo unna, but full AI Twin chala powerful undi!",
-                "Hi! ✨ I'm showcasing multilingual AI capabilities. Real version needs OpenAI API key!"
-            ]
-        
-        # Questions about AI Twin
-        elif any(word in user_message for word in ['what', 'who', 'how', 'tell me']):
-            demo_responses = [
-                "I'm AI Twin 2.0! 🤖 I replicate personalities using ML, support 5 languages, and have semantic memory!",
-                "This is a multilingual AI that learns from WhatsApp chats. 680KB+ data processed with <2s response time! ⚡",
-                "AI Twin analyzes communication patterns in Telugu, English, Hindi, Malayalam & Tamil! 🌍",
-                "I'm built with OpenAI GPT-4, ChromaDB vector search, and personality replication technology! 🧠"
-            ]
-        
-        # Language-specific responses
-        elif any(word in user_message for word in ['telugu', 'hindi', 'language', 'multilingual']):
-            demo_responses = [
-                "Yes! I support Telugu, English, Hindi, Malayalam, Tamil with 95%+ language detection accuracy! 🇮🇳",
-                "Multilingual support tho natural code-switching chestanu! Demo mode lo limited responses untayi. 😊",
-                "Languages are my specialty! Full version lo natural conversations in mixed languages! 🌟",
-                "Telugu-English code-switching with 95% accuracy! Real AI Twin lo complete personality replication! ✨"
-            ]
-        
-        # Technical questions
-        elif any(word in user_message for word in ['how work', 'technology', 'api', 'setup']):
-            demo_responses = [
-                "Built with Flask, OpenAI GPT-4, ChromaDB vector DB, and SQLite! 🛠️ Need API key for full features.",
-                "Technology stack: Python 3.8+, Sentence Transformers, YAML config, WhatsApp integration! 🚀",
-                "Dual-database architecture: SQLite + ChromaDB for <100ms query performance! ⚡",
-                "Semantic memory with vector embeddings, mood detection, and personality configuration! 🧠"
-            ]
-        
-        # Default varied responses
-        else:
-            demo_responses = [
-                "This is AI Twin 2.0 demo! 🎯 Full version has 90%+ authenticity in personality replication!",
-                "Demo mode active! Real AI Twin processes WhatsApp chats and learns your communication style! 📱",
-                "Impressive interface, right? 😎 Full AI Twin remembers conversations and adapts to your personality!",
-                "AI Twin 2.0 showcase mode! 🌟 Production version supports real-time learning and memory!",
-                "Demo response generated! 🤖 Full AI Twin ki OpenAI API key set cheyyandi for real conversations!",
-                "Testing the chat interface? 💬 Real AI Twin has semantic search across 1000+ conversations!",
-                "Cool UI design kada? 🎨 Full version lo personality traits and mood detection untundi!"
-            ]
-        
-        demo_response = random.choice(demo_responses)
-        
         return jsonify({
-            'response': demo_response,
+            'response': demo_response(user_message),
             'timestamp': datetime.now().strftime('%H:%M:%S'),
-            'demo_mode': True
+            'demo_mode': True,
+            'degraded': bool(ai_twin)
         })
     
     try:
@@ -124,14 +156,17 @@ def chat():
         if not user_message:
             return jsonify({'error': 'Empty message'}), 400
         
-        # Generate AI response
+        # Generate AI response, timing each pipeline stage
+        timings = ai_twin.stage_timer.begin_request()
         ai_response = ai_twin.generate_response(user_message)
         
-        return jsonify({
+        response = jsonify({
             'response': ai_response,
             'timestamp': datetime.now().strftime('%H:%M:%S'),
             'user_message': user_message
         })
+        response.headers['Server-Timing'] = server_timing_header(timings)
+        return response
         
     except Exception as e:
         print(f"Chat error: {e}")
@@ -140,12 +175,54 @@ def chat():
             'response': 'Sorry, technical issue ayindhi. Please try again.'
         }), 500
 
+def sse_event(data: dict, event: str = None) -> str:
+    """Format one Server-Sent Events message"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Stream the reply as Server-Sent Events: token events, then a final done event"""
+    data = request.get_json(silent=True) or {}
+    user_message = data.get('message', '').strip()
+    
+    if not user_message:
+        return jsonify({'error': 'Empty message'}), 400
+    
+    def generate():
+        parts = []
+        demo_mode = not ai_twin or llm_degraded()
+        try:
+            if not demo_mode:
+                tokens = ai_twin.stream_response(user_message)
+            else:
+                # Demo replies stream word by word so the UI behaves the same
+                tokens = (word + ' ' for word in demo_response(user_message.lower()).split(' '))
+            
+            for token in tokens:
+                parts.append(token)
+                yield sse_event({'token': token})
+            
+            yield sse_event({
+                'response': ''.join(parts).strip(),
+                'timestamp': datetime.now().strftime('%H:%M:%S'),
+                'demo_mode': demo_mode
+            }, event='done')
+        except Exception as e:
+            print(f"Chat stream error: {e}")
+            yield sse_event({'error': str(e)}, event='error')
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        # Stop reverse proxies (nginx, Render) from buffering the stream
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/api/conversations')
 def get_conversations():
     """Get recent conversations from database"""
     try:
-        conn = sqlite3.connect('ai_twin_memory.db')
-        cursor = conn.cursor()
+        cursor = database().connection().cursor()
         
         # Get last 20 conversations
         cursor.execute('''
@@ -165,7 +242,6 @@ def get_conversations():
                 'language': row[4] or 'mixed'
             })
         
-        conn.close()
         return jsonify(conversations)
         
     except Exception as e:
@@ -176,41 +252,12 @@ def get_conversations():
 def get_stats():
     """Get database statistics"""
     try:
-        conn = sqlite3.connect('ai_twin_memory.db')
-        cursor = conn.cursor()
-        
-        # Get conversation count
-        cursor.execute('SELECT COUNT(*) FROM conversations')
-        total_conversations = cursor.fetchone()[0]
-        
-        # Get chat history count
-        cursor.execute('SELECT COUNT(*) FROM chat_history')
-        total_chat_messages = cursor.fetchone()[0]
-        
-        # Get recent activity (last 24 hours)
-        cursor.execute('''
-            SELECT COUNT(*) FROM conversations 
-            WHERE datetime(created_at) > datetime('now', '-1 day')
-        ''')
-        recent_conversations = cursor.fetchone()[0]
-        
-        # Get language distribution
-        cursor.execute('''
-            SELECT language_detected, COUNT(*) 
-            FROM conversations 
-            WHERE language_detected IS NOT NULL
-            GROUP BY language_detected
-        ''')
-        language_stats = dict(cursor.fetchall())
-        
-        conn.close()
-        
-        return jsonify({
-            'total_conversations': total_conversations,
-            'total_chat_messages': total_chat_messages,
-            'recent_conversations': recent_conversations,
-            'language_stats': language_stats
-        })
+        stats = stats_cache.get('stats')
+        if stats is None:
+            # Counter tables maintained by triggers, so this doesn't grow with history
+            stats = read_stats(database().connection())
+            stats_cache.put('stats', stats)
+        return jsonify(stats)
         
     except Exception as e:
         print(f"Stats error: {e}")
@@ -221,6 +268,13 @@ def get_stats():
             'language_stats': {}
         })
 
+@app.route('/api/metrics')
+def get_metrics():
+    """Get runtime metrics from the AI Twin request path"""
+    if not ai_twin:
+        return jsonify({'demo_mode': True})
+    return jsonify(ai_twin.get_metrics())
+
 @app.route('/database')
 def database_view():
     """Database viewer page"""
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+AI Twin ASGI Entry Point
+Serves the chat endpoints natively on asyncio, so one process can hold hundreds
+of in-flight conversations while replies wait on OpenAI; every other route is
+handed to the existing Flask app
+
+Run with: uvicorn asgi:app --host 0.0.0.0 --port 8347
+"""
+
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+from asgiref.wsgi import WsgiToAsgi
+
+import app as flask_module
+from ai_twin_async import AsyncYaswanthAITwinDB
+from stage_timer import server_timing_header
+
+
+class AITwinASGI:
+    """POST /api/chat and /api/chat/stream run on the event loop; the rest is Flask"""
+
+    def __init__(self, flask_app):
+        self.flask = WsgiToAsgi(flask_app)
+        self.ai_twin: Optional[AsyncYaswanthAITwinDB] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http' and scope['method'] == 'POST' and scope['path'] == '/api/chat':
+            await self.chat(receive, send)
+        elif scope['type'] == 'http' and scope['method'] == 'POST' and scope['path'] == '/api/chat/stream':
+            await self.chat_stream(receive, send)
+        else:
+            await self.flask(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await asyncio.get_running_loop().run_in_executor(None, self.init_ai_twin)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.ai_twin:
+                    await self.ai_twin.aclose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def init_ai_twin(self) -> bool:
+        """Initialize the async AI Twin, sharing it with the Flask routes"""
+        api_key = os.getenv('OPENAI_API_KEY')
+
+        if not api_key:
+            print("⚠️  OpenAI API key not found in environment variables")
+            print("🌐 Website will load in demo mode")
+            return False
+
+        try:
+            self.ai_twin = AsyncYaswanthAITwinDB(api_key)
+            self.ai_twin.degraded_response = lambda message: flask_module.demo_response(message.lower())
+            flask_module.ai_twin = self.ai_twin
+            print("✅ AI Twin initialized successfully!")
+            return True
+        except Exception as e:
+            print(f"❌ Error initializing AI Twin: {e}")
+            print("🌐 Website will load in demo mode")
+            return False
+
+    async def read_message(self, receive) -> str:
+        """The request body's 'message' field, or '' if the body isn't usable JSON"""
+        body = b''
+        while True:
+            event = await receive()
+            if event['type'] == 'http.disconnect':
+                break
+            body += event.get('body', b'')
+            if not event.get('more_body', False):
+                break
+        try:
+            return (json.loads(body or b'{}').get('message') or '').strip()
+        except (ValueError, AttributeError):
+            return ''
+
+    async def send_json(self, send, payload: Dict, status: int = 200, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        await send({'type': 'http.response.start', 'status': status, 'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode())
+        ] + [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def chat(self, receive, send):
+        """Same contract as the Flask /api/chat"""
+        user_message = await self.read_message(receive)
+
+        if not self.ai_twin or flask_module.llm_degraded():
+            await self.send_json(send, {
+                'response': flask_module.demo_response(user_message.lower()),
+                'timestamp': datetime.now().strftime('%H:%M:%S'),
+                'demo_mode': True,
+                'degraded': bool(self.ai_twin)
+            })
+            return
+
+        if not user_message:
+            await self.send_json(send, {'error': 'Empty message'}, status=400)
+            return
+
+        try:
+            timings = self.ai_twin.stage_timer.begin_request()
+            ai_response = await self.ai_twin.generate_response_async(user_message)
+            await self.send_json(send, {
+                'response': ai_response,
+                'timestamp': datetime.now().strftime('%H:%M:%S'),
+                'user_message': user_message
+            }, headers={'Server-Timing': server_timing_header(timings)})
+        except Exception as e:
+            print(f"Chat error: {e}")
+            await self.send_json(send, {
+                'error': str(e),
+                'response': 'Sorry, technical issue ayindhi. Please try again.'
+            }, status=500)
+
+    async def chat_stream(self, receive, send):
+        """Same SSE contract as the Flask /api/chat/stream; stops generating if the client leaves"""
+        user_message = await self.read_message(receive)
+
+        if not user_message:
+            await self.send_json(send, {'error': 'Empty message'}, status=400)
+            return
+
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no')
+        ]})
+
+        async def wait_for_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        async def send_event(data: Dict, event: str = None):
+            await send({'type': 'http.response.body', 'more_body': True,
+                        'body': flask_module.sse_event(data, event).encode('utf-8')})
+
+        async def produce():
+            parts = []
+            demo_mode = not self.ai_twin or flask_module.llm_degraded()
+            try:
+                if not demo_mode:
+                    tokens = self.ai_twin.stream_response_async(user_message)
+                else:
+                    tokens = demo_tokens(flask_module.demo_response(user_message.lower()))
+
+                async for token in tokens:
+                    parts.append(token)
+                    await send_event({'token': token})
+
+                await send_event({
+                    'response': ''.join(parts).strip(),
+                    'timestamp': datetime.now().strftime('%H:%M:%S'),
+                    'demo_mode': demo_mode
+                }, event='done')
+            except Exception as e:
+                print(f"Chat stream error: {e}")
+                await send_event({'error': str(e)}, event='error')
+
+        # Cancelling the producer on disconnect closes the token stream before
+        # it finishes, so an abandoned reply is never persisted
+        producer = asyncio.ensure_future(produce())
+        watcher = asyncio.ensure_future(wait_for_disconnect())
+        done, _ = await asyncio.wait({producer, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        for task in (producer, watcher):
+            task.cancel()
+        if producer in done:
+            await send({'type': 'http.response.body', 'body': b''})
+
+
+async def demo_tokens(text: str):
+    """Demo replies stream word by word so the UI behaves the same"""
+    for word in text.split(' '):
+        yield word + ' '
+
+
+app = AITwinASGI(flask_module.app)
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+ANN Benchmark - Recall@k and query latency of the IVF index against exact search
+Vectors are synthetic and clustered like sentence embeddings, written to a scratch
+memory-mapped file so multi-million-row corpora don't need to fit in RAM
+
+Usage: python benchmark_ann.py --sizes 100000 1000000 5000000 --dims 768 --dtype float16
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ann_index import IVFIndex, default_list_count
+from embedders import embedder_dimension
+from vector_store import QUERY_CHUNK_ROWS
+
+
+def make_corpus(path: Path, size: int, dims: int, dtype: str, topics: int, seed: int) -> np.memmap:
+    """Normalised vectors scattered around `topics` random directions"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((topics, dims)).astype(np.float32)
+    matrix = np.memmap(path, dtype=dtype, mode='w+', shape=(size, dims))
+    for start in range(0, size, QUERY_CHUNK_ROWS):
+        n = min(QUERY_CHUNK_ROWS, size - start)
+        chunk = centers[rng.integers(0, topics, n)] + 0.6 * rng.standard_normal((n, dims), dtype=np.float32)
+        matrix[start:start + n] = chunk / np.linalg.norm(chunk, axis=1, keepdims=True)
+    matrix.flush()
+    return matrix
+
+
+def exact_top_k(matrix, query: np.ndarray, k: int) -> np.ndarray:
+    """Chunked brute-force top-k, as the NumPy store scans without an index"""
+    best_rows = np.empty(0, dtype=np.int64)
+    best_scores = np.empty(0, dtype=np.float32)
+    for start in range(0, len(matrix), QUERY_CHUNK_ROWS):
+        scores = np.asarray(matrix[start:start + QUERY_CHUNK_ROWS], dtype=np.float32) @ query
+        rows = np.concatenate([best_rows, np.arange(start, start + len(scores))])
+        scores = np.concatenate([best_scores, scores])
+        top = np.argpartition(-scores, k - 1)[:k]
+        best_rows, best_scores = rows[top], scores[top]
+    return best_rows
+
+
+def percentiles(latencies):
+    return np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the IVF index against exact search")
+    parser.add_argument('--sizes', nargs='+', type=int, default=[100000, 1000000, 5000000])
+    parser.add_argument('--dims', type=int, default=None,
+                        help="Vector width (default: that of the AI_TWIN_EMBEDDER model, 768 for the default)")
+    parser.add_argument('--dtype', default='float16', choices=['float16', 'float32'])
+    parser.add_argument('--nprobe', nargs='+', type=int, default=[8, 16, 32, 64])
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--topics', type=int, default=2000)
+    parser.add_argument('--workdir', default=None, help="Scratch directory (needs size * dims * itemsize bytes)")
+    args = parser.parse_args()
+    if args.dims is None:
+        args.dims = embedder_dimension(os.getenv('AI_TWIN_EMBEDDER', 'sentence-transformers'))
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_ann_", dir=args.workdir))
+    results = []
+
+    try:
+        for size in args.sizes:
+            print(f"🔄 Generating {size} x {args.dims} {args.dtype} vectors...")
+            matrix = make_corpus(workdir / f"corpus_{size}.mmap", size, args.dims, args.dtype, args.topics, seed=0)
+            live = np.ones(size, dtype=bool)
+
+            rng = np.random.default_rng(1)
+            queries = np.asarray(matrix[rng.choice(size, args.queries, replace=False)], dtype=np.float32)
+            queries += 0.3 * rng.standard_normal(queries.shape, dtype=np.float32)
+            queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+            latencies = []
+            truth = []
+            for query in queries:
+                start = time.perf_counter()
+                truth.append(set(exact_top_k(matrix, query, args.k).tolist()))
+                latencies.append(1000 * (time.perf_counter() - start))
+            p50, p99 = percentiles(latencies)
+            results.append((size, 'exact', '-', 0.0, p50, p99, 1.0))
+
+            index = IVFIndex(workdir / f"corpus_{size}", nprobe=args.nprobe[0])
+            start = time.perf_counter()
+            index.build(matrix, size)
+            build_seconds = time.perf_counter() - start
+
+            for nprobe in args.nprobe:
+                index.nprobe = nprobe
+                latencies = []
+                recall = []
+                for query, expected in zip(queries, truth):
+                    start = time.perf_counter()
+                    rows, _ = index.search(matrix, live, query, args.k)
+                    latencies.append(1000 * (time.perf_counter() - start))
+                    recall.append(len(expected & set(rows.tolist())) / args.k)
+                p50, p99 = percentiles(latencies)
+                results.append((size, f"ivf{default_list_count(size)}", nprobe, build_seconds, p50, p99,
+                                np.mean(recall)))
+
+            del matrix
+            for path in workdir.glob(f"corpus_{size}*"):
+                path.unlink()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print()
+    print(f"{'vectors':>10}  {'index':<10}{'nprobe':>7}{'build s':>9}{'p50 ms':>9}{'p99 ms':>9}{'recall@k':>10}")
+    for size, name, nprobe, build_seconds, p50, p99, recall in results:
+        print(f"{size:>10}  {name:<10}{nprobe:>7}{build_seconds:>9.1f}{p50:>9.2f}{p99:>9.2f}{recall:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
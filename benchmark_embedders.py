@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Embedder Benchmark - Compare embedding backends on encode latency and retrieval agreement
+Agreement is the mean overlap of each backend's top-k neighbours with the reference backend's
+
+Usage: python benchmark_embedders.py --backends sentence-transformers int8 hashed --corpus-size 2000
+"""
+
+import argparse
+import random
+import sqlite3
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from chat_parser import iter_whatsapp_messages
+from embedders import create_embedder
+
+SAMPLE_MESSAGES = [
+    "Hlo", "Ok ok", "Bagane unna, you tell kadha?", "sare le", "devudaaa",
+    "Undrstud", "Wht happened today?", "Thnx for the help", "ayyo sorry, late ayyindhi",
+    "Movie ki veldama?", "I will try to come", "where", "..", "Seriously?",
+    "Enti ila chesav", "Exam ela rasav?", "Just reached home", "Good night",
+]
+
+
+def load_corpus(db_path: str, chat_folder: str, size: int) -> List[str]:
+    """Collect benchmark texts from the chat_history table, chat exports, or built-in samples"""
+    texts = []
+    if Path(db_path).exists():
+        conn = sqlite3.connect(db_path)
+        try:
+            rows = conn.execute("SELECT DISTINCT message FROM chat_history LIMIT ?", (size,)).fetchall()
+            texts = [row[0] for row in rows]
+        except sqlite3.Error:
+            pass
+        conn.close()
+
+    if not texts:
+        for file_path in sorted(Path(chat_folder).glob("*.txt")):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                texts.extend(msg['message'] for msg in iter_whatsapp_messages(f))
+            if len(texts) >= size:
+                break
+
+    if not texts:
+        texts = SAMPLE_MESSAGES
+
+    return list(dict.fromkeys(texts))[:size]
+
+
+def normalize(embeddings: np.ndarray) -> np.ndarray:
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    return embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+
+
+def top_k(corpus: np.ndarray, query_ids: List[int], k: int) -> List[set]:
+    """Cosine top-k neighbours of each query row, excluding the row itself"""
+    scores = corpus[query_ids] @ corpus.T
+    scores[np.arange(len(query_ids)), query_ids] = -np.inf
+    k = min(k, corpus.shape[0] - 1)
+    neighbours = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return [set(row.tolist()) for row in neighbours]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends")
+    parser.add_argument('--backends', nargs='+', default=['sentence-transformers', 'int8', 'hashed'])
+    parser.add_argument('--reference', default='sentence-transformers')
+    parser.add_argument('--db', default='ai_twin_memory.db')
+    parser.add_argument('--chat-folder', default='chat_data')
+    parser.add_argument('--corpus-size', type=int, default=2000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=64)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.db, args.chat_folder, args.corpus_size)
+    random.seed(0)
+    query_ids = random.sample(range(len(corpus)), min(args.queries, len(corpus)))
+    print(f"📊 Corpus: {len(corpus)} texts, {len(query_ids)} queries, k={args.k}")
+
+    backends = [args.reference] + [b for b in args.backends if b != args.reference]
+    reference_neighbours = None
+    results = []
+
+    for spec in backends:
+        print(f"🔄 Loading {spec}...")
+        try:
+            load_start = time.perf_counter()
+            embedder = create_embedder(spec)
+            load_seconds = time.perf_counter() - load_start
+        except Exception as e:
+            print(f"❌ Skipping {spec}: {e}")
+            continue
+
+        # Warm up, then time single-text encodes as on the request path
+        embedder.encode(corpus[:2])
+        latencies = []
+        for i in query_ids:
+            start = time.perf_counter()
+            embedder.encode([corpus[i]])
+            latencies.append(1000 * (time.perf_counter() - start))
+
+        start = time.perf_counter()
+        embeddings = normalize(np.concatenate([
+            embedder.encode(corpus[i:i + args.batch_size])
+            for i in range(0, len(corpus), args.batch_size)
+        ]))
+        throughput = len(corpus) / (time.perf_counter() - start)
+
+        neighbours = top_k(embeddings, query_ids, args.k)
+        if reference_neighbours is None:
+            if spec != args.reference:
+                print(f"⚠️ Reference {args.reference} unavailable, agreement is against {spec}")
+            reference_neighbours = neighbours
+        agreement = np.mean([
+            len(a & b) / max(len(a), 1) for a, b in zip(neighbours, reference_neighbours)
+        ])
+
+        results.append((spec, embedder.dimension, load_seconds, np.percentile(latencies, 50),
+                        np.percentile(latencies, 95), throughput, agreement))
+
+    print()
+    print(f"{'backend':<24}{'dims':>6}{'load s':>9}{'p50 ms':>9}{'p95 ms':>9}{'texts/s':>10}{'agree@k':>10}")
+    for spec, dims, load_seconds, p50, p95, throughput, agreement in results:
+        print(f"{spec:<24}{dims:>6}{load_seconds:>9.1f}{p50:>9.2f}{p95:>9.2f}{throughput:>10.0f}{agreement:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Vector Store Benchmark - Compare ChromaDB with the memory-mapped NumPy store
+Uses synthetic vectors and chat_history rows in a scratch directory, reporting
+insert throughput, query latency, and recall@k against exact search
+
+Usage: python benchmark_vector_stores.py --backends chroma numpy numpy-float16 --size 50000
+"""
+
+import argparse
+import shutil
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from sqlite_pool import SQLitePool
+from vector_store import NumpyVectorStore, COLLECTION_SCHEMAS
+
+
+def make_chat_history(conn: sqlite3.Connection, ids):
+    """Minimal chat_history table so the NumPy store can join its metadata"""
+    conn.execute('''
+        CREATE TABLE chat_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            file_name TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            sender TEXT NOT NULL,
+            message TEXT NOT NULL,
+            is_yaswanth BOOLEAN NOT NULL,
+            embedding_id TEXT UNIQUE
+        )
+    ''')
+    with conn:
+        conn.executemany(
+            "INSERT INTO chat_history (file_name, timestamp, sender, message, is_yaswanth, embedding_id) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [('bench.txt', '01/01/24, 9:00:00 AM', 'Indu', f"message {i}", i % 2 == 0, eid)
+             for i, eid in enumerate(ids)]
+        )
+
+
+def open_store(backend: str, workdir: Path, ids):
+    if backend == 'chroma':
+        import chromadb
+        client = chromadb.PersistentClient(path=str(workdir / "chroma"))
+        return client.get_or_create_collection(name="chat_history")
+
+    dtype = backend.split('-', 1)[1] if '-' in backend else 'float32'
+    db = SQLitePool(str(workdir / "bench.db"))
+    make_chat_history(db.connection(), ids)
+    return NumpyVectorStore(str(workdir / "vectors"), "chat_history", COLLECTION_SCHEMAS['chat_history'],
+                            db, dtype=dtype)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector store backends")
+    parser.add_argument('--backends', nargs='+', default=['chroma', 'numpy', 'numpy-float16'])
+    parser.add_argument('--size', type=int, default=50000)
+    parser.add_argument('--dims', type=int, default=768)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.size, args.dims), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[rng.choice(args.size, args.queries, replace=False)]
+    queries = queries + 0.1 * rng.standard_normal(queries.shape, dtype=np.float32)
+    ids = [f"vec-{i}" for i in range(args.size)]
+
+    exact = np.argpartition(-(queries @ vectors.T), args.k - 1, axis=1)[:, :args.k]
+    exact = [{ids[i] for i in row} for row in exact]
+    print(f"📊 {args.size} vectors x {args.dims} dims, {args.queries} queries, k={args.k}")
+
+    results = []
+    for backend in args.backends:
+        workdir = Path(tempfile.mkdtemp(prefix=f"bench_{backend}_"))
+        try:
+            store = open_store(backend, workdir, ids)
+
+            start = time.perf_counter()
+            for i in range(0, args.size, args.batch_size):
+                store.upsert(ids=ids[i:i + args.batch_size],
+                             embeddings=vectors[i:i + args.batch_size].tolist(),
+                             documents=[f"message {j}" for j in range(i, min(i + args.batch_size, args.size))])
+            insert_rate = args.size / (time.perf_counter() - start)
+
+            latencies = []
+            recall = []
+            for query, truth in zip(queries, exact):
+                start = time.perf_counter()
+                found = store.query(query_embeddings=[query.tolist()], n_results=args.k)
+                latencies.append(1000 * (time.perf_counter() - start))
+                recall.append(len(truth & set(found['ids'][0])) / args.k)
+
+            results.append((backend, insert_rate, np.percentile(latencies, 50),
+                            np.percentile(latencies, 99), np.mean(recall)))
+        except Exception as e:
+            print(f"❌ Skipping {backend}: {e}")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print()
+    print(f"{'backend':<16}{'inserts/s':>12}{'p50 ms':>9}{'p99 ms':>9}{'recall@k':>10}")
+    for backend, insert_rate, p50, p99, recall in results:
+        print(f"{backend:<16}{insert_rate:>12.0f}{p50:>9.2f}{p99:>9.2f}{recall:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+WhatsApp Chat Parser - Streaming parser for WhatsApp chat exports
+Yields structured messages one at a time so multi-GB exports parse in constant memory
+"""
+
+import hashlib
+import re
+from itertools import islice
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Match WhatsApp timestamp format: [DD/MM/YY, HH:MM:SS AM/PM] Name: Message
+WHATSAPP_LINE_RE = re.compile(r'\[(\d{2}/\d{2}/\d{2}, \d{1,2}:\d{2}:\d{2} [AP]M)\] ([^:]+): (.+)')
+
+YASWANTH_ALIASES = {'yaswanth', 'prosessor', 'processor'}
+INDU_ALIASES = {'indu', 'mustang'}
+
+
+def normalize_sender(sender: str) -> str:
+    """Map names to consistent identifiers"""
+    sender_lower = sender.lower()
+    if sender_lower in YASWANTH_ALIASES:
+        return 'Yaswanth'
+    if sender_lower in INDU_ALIASES:
+        return 'Indu'
+    return sender
+
+
+def _finish_message(header: Dict, parts: list) -> Dict:
+    """Join the header line and its continuation lines into one message"""
+    header['message'] = ' '.join(parts)
+    return header
+
+
+def _iter_parsed(lines: Iterable[Tuple[str, int]]) -> Iterator[Tuple[Dict, int]]:
+    """Core parser over (line, end_offset) pairs.
+
+    Yields (message, resume_offset) where resume_offset is where the line after
+    the message's last continuation line starts, i.e. the next header or EOF.
+    """
+    current: Optional[Dict] = None
+    parts = []
+    line_start = 0
+
+    for line, line_end in lines:
+        timestamp_match = WHATSAPP_LINE_RE.match(line)
+
+        if timestamp_match:
+            if current:
+                yield _finish_message(current, parts), line_start
+
+            timestamp, sender, message = timestamp_match.groups()
+            sender = normalize_sender(sender)
+
+            current = {
+                'timestamp': timestamp,
+                'sender': sender,
+                'message': None,
+                'is_yaswanth': sender == 'Yaswanth'
+            }
+            parts = [message.strip()]
+        elif current:
+            # Continuation of previous message
+            stripped = line.strip()
+            if stripped:
+                parts.append(stripped)
+
+        line_start = line_end
+
+    if current:
+        yield _finish_message(current, parts), line_start
+
+
+def iter_whatsapp_messages(lines: Iterable[str]) -> Iterator[Dict]:
+    """Parse WhatsApp chat lines into structured messages, one message at a time.
+
+    `lines` can be an open text file, so only the message currently being
+    assembled is held in memory regardless of the export size.
+    """
+    for message, _ in _iter_parsed((line, 0) for line in lines):
+        yield message
+
+
+def _iter_binary_lines(f: BinaryIO, start_offset: int, hasher, encoding: str) -> Iterator[Tuple[str, int]]:
+    """Decode lines from a binary file, tracking byte offsets.
+
+    Each raw line is fed to `hasher` only when the next line is requested, so
+    while the parser is suspended on a message the hasher covers exactly the
+    bytes before that message's resume offset.
+    """
+    offset = start_offset
+    pending = None
+    for raw in f:
+        if pending is not None and hasher is not None:
+            hasher.update(pending)
+        pending = raw
+        offset += len(raw)
+        yield raw.decode(encoding), offset
+    if pending is not None and hasher is not None:
+        hasher.update(pending)
+
+
+def iter_whatsapp_messages_with_offsets(f: BinaryIO, start_offset: int = 0, hasher=None,
+                                        encoding: str = 'utf-8') -> Iterator[Tuple[Dict, int]]:
+    """Parse a WhatsApp export opened in binary mode, yielding (message, resume_offset).
+
+    Parsing starts at `start_offset`, which must be a previously yielded resume
+    offset (or 0). If a hashlib object is given it is updated with the file
+    bytes as they are consumed; whenever a message is yielded its digest is the
+    fingerprint of the file up to that message's resume offset.
+    """
+    f.seek(start_offset)
+    return _iter_parsed(_iter_binary_lines(f, start_offset, hasher, encoding))
+
+
+def iter_batches(items: Iterable, batch_size: int) -> Iterator[List]:
+    """Group an iterable into lists of at most batch_size items"""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def find_resume_point(file_path: Path, checkpoint: Optional[Dict]):
+    """Work out where ingestion of a chat file should (re)start.
+
+    Returns (byte_offset, hasher) with the hasher primed on the bytes before
+    the offset, or (None, None) when the file has nothing new. A file whose
+    checkpointed prefix no longer matches is re-ingested from the start.
+    """
+    if not checkpoint:
+        return 0, hashlib.sha1()
+
+    offset = checkpoint['byte_offset']
+    if file_path.stat().st_size < offset:
+        print(f"⚠️ {file_path.name} is shorter than its checkpoint, re-ingesting from start...")
+        return 0, hashlib.sha1()
+
+    hasher = hashlib.sha1()
+    remaining = offset
+    with open(file_path, 'rb') as f:
+        while remaining > 0:
+            chunk = f.read(min(remaining, 1 << 20))
+            if not chunk:
+                break
+            hasher.update(chunk)
+            remaining -= len(chunk)
+
+    if hasher.hexdigest() != checkpoint['fingerprint']:
+        print(f"⚠️ {file_path.name} changed before its checkpoint, re-ingesting from start...")
+        return 0, hashlib.sha1()
+
+    if file_path.stat().st_size == offset:
+        return None, None
+
+    print(f"↪️ Resuming {file_path.name} after {checkpoint['message_count']} messages "
+          f"(last: {checkpoint['last_timestamp']})")
+    return offset, hasher
+
+
+def iter_checkpointed_batches(file_path: Path, start_offset: int, hasher, batch_size: int,
+                              message_count: int = 0) -> Iterator[Tuple[List[Dict], Dict]]:
+    """Stream a chat file from start_offset as (messages, checkpoint) batches.
+
+    Each checkpoint describes the file up to and including its batch, so it can
+    be committed together with the batch's rows.
+    """
+    with open(file_path, 'rb') as f:
+        parsed = iter_whatsapp_messages_with_offsets(f, start_offset, hasher)
+        for batch in iter_batches(parsed, batch_size):
+            messages = [msg for msg, _ in batch]
+            message_count += len(messages)
+            # The parser is suspended on the batch's last message, so the hasher covers the file up to its offset
+            yield messages, {
+                'fingerprint': hasher.hexdigest(),
+                'byte_offset': batch[-1][1],
+                'last_timestamp': messages[-1]['timestamp'],
+                'message_count': message_count
+            }
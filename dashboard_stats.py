@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Dashboard Stats - Materialised counters behind /api/stats
+Triggers keep row counts, per-language conversation counts and hourly
+conversation buckets up to date as rows are written, so reading the stats is a
+handful of primary-key lookups however much history has been stored. The
+recent-activity figure sums the last 24 hourly buckets (the current partial
+hour included), rather than filtering created_at row by row
+"""
+
+import time
+from typing import Any, Dict
+
+# Hourly buckets are epoch hours of created_at (UTC, as CURRENT_TIMESTAMP stores it)
+HOUR_OF = "CAST(strftime('%s', COALESCE({row}.created_at, CURRENT_TIMESTAMP)) AS INTEGER) / 3600"
+
+RECENT_HOURS = 24
+
+
+def create_stats_tables(conn) -> bool:
+    """Create the counter tables and their triggers, filling them from existing rows on first run.
+
+    Returns False (creating nothing) if the source tables don't exist yet.
+    """
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if not {'conversations', 'chat_history'} <= tables:
+        return False
+    exists = 'stats_counters' in tables
+
+    # One savepoint, so the counters never exist without having been filled
+    conn.execute("SAVEPOINT create_stats")
+    try:
+        _create_stats_schema(conn)
+        if not exists:
+            rebuild_stats(conn)
+    except Exception:
+        conn.execute("ROLLBACK TO create_stats")
+        conn.execute("RELEASE create_stats")
+        raise
+    conn.execute("RELEASE create_stats")
+    return True
+
+
+def _create_stats_schema(conn):
+    """Counter tables, the triggers that maintain them, and the dashboard's index"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stats_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stats_languages (
+            language TEXT PRIMARY KEY,
+            conversations INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS stats_hourly (
+            hour INTEGER PRIMARY KEY,
+            conversations INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+    # INSERT OR REPLACE fires the delete triggers too (recursive_triggers is on), so counts stay exact
+    for table in ('conversations', 'chat_history'):
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS stats_{table}_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO stats_counters (name, value) VALUES ('{table}', 1)
+                    ON CONFLICT(name) DO UPDATE SET value = value + 1;
+            END
+        ''')
+        conn.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS stats_{table}_delete AFTER DELETE ON {table} BEGIN
+                UPDATE stats_counters SET value = value - 1 WHERE name = '{table}';
+            END
+        ''')
+
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS stats_conversations_rollup_insert AFTER INSERT ON conversations BEGIN
+            INSERT INTO stats_hourly (hour, conversations) VALUES ({HOUR_OF.format(row='new')}, 1)
+                ON CONFLICT(hour) DO UPDATE SET conversations = conversations + 1;
+            INSERT INTO stats_languages (language, conversations)
+                SELECT new.language_detected, 1 WHERE new.language_detected IS NOT NULL
+                ON CONFLICT(language) DO UPDATE SET conversations = conversations + 1;
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS stats_conversations_rollup_delete AFTER DELETE ON conversations BEGIN
+            UPDATE stats_hourly SET conversations = conversations - 1 WHERE hour = {HOUR_OF.format(row='old')};
+            UPDATE stats_languages SET conversations = conversations - 1 WHERE language = old.language_detected;
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS stats_conversations_language_update
+        AFTER UPDATE OF language_detected ON conversations
+        WHEN old.language_detected IS NOT new.language_detected BEGIN
+            UPDATE stats_languages SET conversations = conversations - 1 WHERE language = old.language_detected;
+            INSERT INTO stats_languages (language, conversations)
+                SELECT new.language_detected, 1 WHERE new.language_detected IS NOT NULL
+                ON CONFLICT(language) DO UPDATE SET conversations = conversations + 1;
+        END
+    ''')
+
+    # Serves the dashboard's "latest conversations" list without sorting the table
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_conversations_created_at ON conversations(created_at)')
+
+
+def rebuild_stats(conn):
+    """Recompute every counter from the source tables (one full scan of each)"""
+    conn.execute("DELETE FROM stats_counters")
+    conn.execute("DELETE FROM stats_languages")
+    conn.execute("DELETE FROM stats_hourly")
+    for table in ('conversations', 'chat_history'):
+        conn.execute(f"INSERT INTO stats_counters (name, value) SELECT '{table}', COUNT(*) FROM {table}")
+    conn.execute('''
+        INSERT INTO stats_languages (language, conversations)
+        SELECT language_detected, COUNT(*) FROM conversations
+        WHERE language_detected IS NOT NULL GROUP BY language_detected
+    ''')
+    conn.execute(f'''
+        INSERT INTO stats_hourly (hour, conversations)
+        SELECT {HOUR_OF.format(row='conversations')} AS hour, COUNT(*) FROM conversations GROUP BY hour
+    ''')
+
+
+def read_stats(conn, now: float = None) -> Dict[str, Any]:
+    """The /api/stats payload from the counter tables"""
+    counters = dict(conn.execute("SELECT name, value FROM stats_counters").fetchall())
+    current_hour = int(now if now is not None else time.time()) // 3600
+    recent = conn.execute(
+        "SELECT COALESCE(SUM(conversations), 0) FROM stats_hourly WHERE hour > ?",
+        (current_hour - RECENT_HOURS,)
+    ).fetchone()[0]
+    languages = dict(conn.execute(
+        "SELECT language, conversations FROM stats_languages WHERE conversations > 0"
+    ).fetchall())
+    return {
+        'total_conversations': counters.get('conversations', 0),
+        'total_chat_messages': counters.get('chat_history', 0),
+        'recent_conversations': recent,
+        'language_stats': languages
+    }
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Embedders - Pluggable text embedding backends selected by config
+- sentence-transformers: the original multilingual transformer
+- int8: the same model with dynamically int8-quantized Linear layers
+- onnx: the same model run through ONNX Runtime
+- hashed: dependency-free hashed character n-grams for offline tests and low-end nodes
+"""
+
+import re
+import zlib
+from abc import ABC, abstractmethod
+from typing import List
+
+import numpy as np
+
+DEFAULT_MODEL_NAME = 'paraphrase-multilingual-mpnet-base-v2'
+DEFAULT_MODEL_DIMENSION = 768
+
+
+class Embedder(ABC):
+    """Common interface: encode a list of texts into a 2-D float32 array.
+
+    `space` names the vector space the embeddings live in; backends that share
+    a space (e.g. a model and its quantized variant) can share stored vectors.
+    """
+
+    name = "embedder"
+    space = ""
+    dimension = 0
+
+    @abstractmethod
+    def encode(self, texts: List[str], show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        """Embeddings for `texts`, one row per text"""
+
+
+class SentenceTransformerEmbedder(Embedder):
+    """The full-precision sentence-transformers model"""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME, **model_kwargs):
+        from sentence_transformers import SentenceTransformer
+        self.model_name = model_name
+        self.space = model_name
+        self.model = SentenceTransformer(model_name, **model_kwargs)
+        self.dimension = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str], show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        return self.model.encode(texts, show_progress_bar=show_progress_bar, **kwargs)
+
+
+class QuantizedSentenceTransformerEmbedder(SentenceTransformerEmbedder):
+    """The same model with int8 dynamic quantization of its Linear layers (CPU only)"""
+
+    name = "int8"
+
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME):
+        super().__init__(model_name, device='cpu')
+        import torch
+        self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxSentenceTransformerEmbedder(SentenceTransformerEmbedder):
+    """The same model exported to ONNX (needs sentence-transformers>=3.2 and optimum[onnxruntime])"""
+
+    name = "onnx"
+
+    def __init__(self, model_name: str = DEFAULT_MODEL_NAME):
+        super().__init__(model_name, backend='onnx')
+
+
+class HashedNgramEmbedder(Embedder):
+    """Signed feature hashing of character n-grams; no model download, no extra dependencies.
+
+    Suits romanised Telugu slang reasonably well because spelling variants share n-grams.
+    """
+
+    name = "hashed"
+
+    def __init__(self, dimension: int = 512, ngram_range=(2, 4)):
+        self.dimension = dimension
+        self.ngram_range = ngram_range
+        self.space = f"hashed-{dimension}"
+
+    def _features(self, text: str):
+        """Hash every word-padded character n-gram to (bucket, sign)"""
+        for word in re.findall(r'\w+|[^\w\s]', text.lower()):
+            padded = f" {word} "
+            for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+                for i in range(len(padded) - n + 1):
+                    # crc32 is stable across processes, unlike hash()
+                    h = zlib.crc32(padded[i:i + n].encode('utf-8'))
+                    yield h % self.dimension, 1.0 if h & 0x80000000 else -1.0
+
+    def encode(self, texts: List[str], show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for bucket, sign in self._features(text):
+                embeddings[row, bucket] += sign
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+
+def create_embedder(spec: str = "sentence-transformers") -> Embedder:
+    """Create an embedder from a spec such as 'sentence-transformers', 'sentence-transformers:<model>',
+    'int8', 'onnx:<model>' or 'hashed:1024'"""
+    backend, _, arg = spec.partition(':')
+    backend = backend.strip().lower()
+
+    if backend in ('sentence-transformers', 'st', ''):
+        return SentenceTransformerEmbedder(arg or DEFAULT_MODEL_NAME)
+    if backend == 'int8':
+        return QuantizedSentenceTransformerEmbedder(arg or DEFAULT_MODEL_NAME)
+    if backend == 'onnx':
+        return OnnxSentenceTransformerEmbedder(arg or DEFAULT_MODEL_NAME)
+    if backend == 'hashed':
+        return HashedNgramEmbedder(int(arg) if arg else 512)
+
+    raise ValueError(f"Unknown embedder backend: {spec}")
+
+
+def embedder_dimension(spec: str = "sentence-transformers") -> int:
+    """Embedding width for a spec, loading the model only when it isn't known up front"""
+    backend, _, arg = spec.partition(':')
+    backend = backend.strip().lower()
+    if backend == 'hashed':
+        return int(arg) if arg else 512
+    if backend in ('sentence-transformers', 'st', '', 'int8', 'onnx') and arg in ('', DEFAULT_MODEL_NAME):
+        return DEFAULT_MODEL_DIMENSION
+    return create_embedder(spec).dimension
+
+
+def collection_suffix(embedder: Embedder) -> str:
+    """Suffix for vector collections so embeddings from different spaces never mix"""
+    if embedder.space == DEFAULT_MODEL_NAME:
+        return ""
+    return "_" + re.sub(r'[^a-zA-Z0-9_-]', '-', embedder.space)[:40]
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Embedding Service - Dynamic micro-batching of embedding requests
+Collects encode calls from concurrent request threads for a short window and
+runs them through the embedding model as one batched forward pass
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, List
+
+import numpy as np
+
+
+class EmbeddingService:
+    """Thread-safe front for an embedding model that coalesces concurrent encodes.
+
+    A caller's texts are queued; a single background thread takes the first
+    pending request, keeps collecting for up to max_wait_ms or until
+    max_batch_size texts are gathered, encodes them in one call and hands each
+    caller its own rows back.
+    """
+
+    def __init__(self, model, max_wait_ms: float = 5.0, max_batch_size: int = 32):
+        self.model = model
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+
+        self._requests = queue.Queue()
+        # Guards enqueueing against close(), so nothing is queued behind the stop sentinel
+        self._close_lock = threading.Lock()
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self._recent_waits = deque(maxlen=1000)
+        self._recent_batch_sizes = deque(maxlen=1000)
+        self._request_count = 0
+        self._batch_count = 0
+        self._text_count = 0
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="embedding-service", daemon=True)
+        self._thread.start()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts, sharing a forward pass with any concurrent callers"""
+        if self._closed:
+            raise RuntimeError("EmbeddingService is closed")
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        future = Future()
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError("EmbeddingService is closed")
+            self._requests.put((list(texts), future, time.perf_counter()))
+        return future.result()
+
+    def _run(self):
+        """Background loop: gather a batch, encode once, fan results back out"""
+        while True:
+            first = self._requests.get()
+            if first is None:
+                return
+
+            batch = [first]
+            text_count = len(first[0])
+            deadline = time.perf_counter() + self.max_wait
+            stopping = False
+
+            while text_count < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+                text_count += len(request[0])
+
+            self._encode_batch(batch)
+            if stopping:
+                return
+
+    def _encode_batch(self, batch: List):
+        """Run one forward pass for a gathered batch and resolve each caller's future"""
+        started = time.perf_counter()
+        all_texts = [text for texts, _, _ in batch for text in texts]
+
+        try:
+            embeddings = np.asarray(self.model.encode(all_texts, show_progress_bar=False))
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        offset = 0
+        for texts, future, _ in batch:
+            future.set_result(embeddings[offset:offset + len(texts)])
+            offset += len(texts)
+
+        with self._stats_lock:
+            self._batch_count += 1
+            self._text_count += len(all_texts)
+            self._recent_batch_sizes.append(len(all_texts))
+            for _, _, enqueued in batch:
+                wait = started - enqueued
+                self._request_count += 1
+                self._total_wait += wait
+                self._max_wait_seen = max(self._max_wait_seen, wait)
+                self._recent_waits.append(wait)
+
+    def stats(self) -> Dict:
+        """Queue wait and batch size metrics"""
+        with self._stats_lock:
+            waits = sorted(self._recent_waits)
+            sizes = list(self._recent_batch_sizes)
+            return {
+                'requests': self._request_count,
+                'batches': self._batch_count,
+                'texts': self._text_count,
+                'mean_batch_size': self._text_count / self._batch_count if self._batch_count else 0.0,
+                'recent_max_batch_size': max(sizes) if sizes else 0,
+                'mean_queue_wait_ms': 1000 * self._total_wait / self._request_count if self._request_count else 0.0,
+                'p95_queue_wait_ms': 1000 * waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                'max_queue_wait_ms': 1000 * self._max_wait_seen,
+                'max_wait_ms': 1000 * self.max_wait,
+                'max_batch_size': self.max_batch_size
+            }
+
+    def close(self):
+        """Stop the background thread after pending requests are served; later encodes raise"""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._requests.put(None)
+        self._thread.join(timeout=5)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Fake OpenAI Server - A local chat-completions endpoint for load testing
+Speaks enough of the OpenAI protocol for the openai SDK (JSON and streamed
+SSE replies, usage, 429/500 errors) with sampled latencies, so the full
+pipeline can be driven hard without spending tokens
+
+Usage: python fake_openai_server.py --port 8900 --latency lognormal:800:0.5 \
+           --model-latency gpt-4o-mini=lognormal:250:0.4 --error-rate 0.01
+Then:  AI_TWIN_LLM_BASE_URL=http://localhost:8900/v1 OPENAI_API_KEY=fake python app.py
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict
+
+REPLIES = [
+    "Haa ok ra, cheppu 😊",
+    "Ayyo, enti ala? Koncham relax avvu",
+    "Sare le, nenu unnanu kadha. Tell me what happened",
+    "Someone seems busy today... 404 reply not found 😄",
+    "Avunu, I remember that! Manchi time adi",
+    "Ok ok, no problem. Take your time andi",
+]
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """Sampler in seconds from 'fixed:MS', 'uniform:MIN_MS:MAX_MS' or 'lognormal:MEDIAN_MS:SIGMA'"""
+    kind, *params = spec.split(':')
+    values = [float(p) for p in params]
+    if kind == 'fixed':
+        return lambda: values[0] / 1000
+    if kind == 'uniform':
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if kind == 'lognormal':
+        # Median exp(mu) = MEDIAN_MS; sigma controls how heavy the tail is
+        mu = math.log(values[0] / 1000)
+        return lambda: random.lognormvariate(mu, values[1])
+    raise ValueError(f"unknown latency distribution: {spec}")
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: 'FakeOpenAIServer'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if self.path.rstrip('/') not in ('/v1/chat/completions', '/chat/completions'):
+            self.send_json(404, {'error': {'message': f"no route {self.path}", 'type': 'invalid_request_error'}})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self.send_json(400, {'error': {'message': "invalid JSON", 'type': 'invalid_request_error'}})
+            return
+
+        config = self.server.config
+        model = body.get('model', 'gpt-4')
+        self.server.count('requests')
+
+        roll = random.random()
+        if roll < config.error_rate:
+            self.server.count('errors')
+            self.send_json(500, {'error': {'message': "fake upstream error", 'type': 'server_error'}})
+            return
+        if roll < config.error_rate + config.rate_limit_rate:
+            self.server.count('rate_limited')
+            self.send_json(429, {'error': {'message': "fake rate limit", 'type': 'rate_limit_error'}},
+                           headers={'Retry-After': '1'})
+            return
+        if roll < config.error_rate + config.rate_limit_rate + config.hang_rate:
+            self.server.count('hung')
+            time.sleep(config.hang_seconds)
+
+        # Time to first token (or to the whole reply when not streaming)
+        time.sleep(self.server.latency_for(model))
+
+        reply = random.choice(REPLIES)
+        words = reply.split(' ')[:max(1, int(body.get('max_tokens') or 150))]
+        prompt_tokens = sum(len(m.get('content') or '') for m in body.get('messages', [])) // 4
+        usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': len(words),
+                 'total_tokens': prompt_tokens + len(words)}
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+
+        if body.get('stream'):
+            self.stream_reply(completion_id, model, words, usage, body)
+        else:
+            self.send_json(200, {
+                'id': completion_id, 'object': 'chat.completion', 'created': int(time.time()), 'model': model,
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': ' '.join(words)}}],
+                'usage': usage
+            })
+
+    def send_json(self, status: int, payload: Dict, headers: Dict[str, str] = None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def stream_reply(self, completion_id: str, model: str, words, usage: Dict, body: Dict):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def event(choices, **extra):
+            chunk = {'id': completion_id, 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                     'model': model, 'choices': choices, **extra}
+            self.write_chunk(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+
+        def delta(content: Dict, finish_reason=None):
+            event([{'index': 0, 'delta': content, 'finish_reason': finish_reason}])
+
+        try:
+            delta({'role': 'assistant', 'content': ''})
+            for i, word in enumerate(words):
+                if i:
+                    time.sleep(self.server.config.token_ms / 1000)
+                delta({'content': word if i == 0 else ' ' + word})
+            delta({}, finish_reason='stop')
+            if (body.get('stream_options') or {}).get('include_usage'):
+                event([], usage=usage)
+            self.write_chunk(b"data: [DONE]\n\n")
+            self.write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            self.server.count('client_disconnects')
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, config):
+        super().__init__(address, FakeOpenAIHandler)
+        self.config = config
+        self.default_latency = parse_latency(config.latency)
+        self.model_latency = {}
+        for spec in config.model_latency:
+            name, distribution = spec.split('=', 1)
+            self.model_latency[name] = parse_latency(distribution)
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = {}
+
+    def latency_for(self, model: str) -> float:
+        return self.model_latency.get(model, self.default_latency)()
+
+    def count(self, name: str):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible chat completions server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency', default='lognormal:800:0.5',
+                        help="fixed:MS | uniform:MIN_MS:MAX_MS | lognormal:MEDIAN_MS:SIGMA")
+    parser.add_argument('--model-latency', action='append', default=[], metavar='MODEL=DIST',
+                        help="Per-model latency, e.g. gpt-4o-mini=lognormal:250:0.4")
+    parser.add_argument('--token-ms', type=float, default=20, help="Delay between streamed tokens")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered 500")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="Fraction answered 429")
+    parser.add_argument('--hang-rate', type=float, default=0.0, help="Fraction stalled for --hang-seconds")
+    parser.add_argument('--hang-seconds', type=float, default=60)
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer((args.host, args.port), args)
+    print(f"🤖 Fake OpenAI server on http://{args.host}:{args.port}/v1 (latency {args.latency})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"📊 {server.counters}")
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
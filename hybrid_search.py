@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Hybrid Search - Helpers for combining SQLite FTS5 (BM25) and vector retrieval
+Romanised Telugu slang ("devudaaa", "sare le") is matched exactly by the lexical
+index where the embedding model is weak; the two rankings are merged with
+reciprocal-rank fusion
+"""
+
+import unicodedata
+from typing import Callable, Dict, List, Sequence
+
+# Letters, numbers, private-use and combining marks are token characters, so Telugu
+# vowel signs and viramas stay inside their words instead of splitting them
+FTS_TOKENIZER = "unicode61 remove_diacritics 2 categories 'L* N* Co M*'"
+
+# English function words carry no topic: a memory sharing only "you" or "the" with the
+# message is not relevant, so they are never searched for. Romanised Telugu particles
+# ("le", "ra") are left in, since the lexical index exists to match exactly that slang
+STOPWORDS = frozenset("""
+    a about am an and any are as at be been but by can could did do does for from had has
+    have he her him his how i if in into is it its me my no not of on or our she so than
+    that the their them then there these they this to too u ur us was we were what when
+    where which who why will with would you your yours
+""".split())
+
+# Standard RRF damping constant; larger values flatten the advantage of top ranks
+RRF_K = 60
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text the way FTS_TOKENIZER does: runs of letter, number, Co and mark characters"""
+    tokens, current = [], []
+    for char in text:
+        category = unicodedata.category(char)
+        if category[0] in 'LNM' or category == 'Co':
+            current.append(char)
+        elif current:
+            tokens.append(''.join(current))
+            current = []
+    if current:
+        tokens.append(''.join(current))
+    return tokens
+
+
+def build_match_query(text: str, require_all: bool = False) -> str:
+    """FTS5 MATCH expression for free text: quoted terms joined by OR (or AND).
+
+    Stopwords are dropped, so a message made only of them has no lexical query.
+    """
+    terms = list(dict.fromkeys(token.lower() for token in tokenize(text)))
+    terms = [term for term in terms if term not in STOPWORDS]
+    if not terms:
+        return ""
+    joiner = ' AND ' if require_all else ' OR '
+    return joiner.join(f'"{term}"' for term in terms)
+
+
+def reciprocal_rank_fusion(rankings: Sequence[List[Dict]], key: Callable[[Dict], str],
+                           k: int = RRF_K) -> List[Dict]:
+    """Merge ranked result lists, scoring each item by the sum of 1 / (k + rank).
+
+    Items found by several rankings are merged; the first ranking's copy is kept,
+    with a 'sources' list recording where it was found.
+    """
+    scores: Dict[str, float] = {}
+    items: Dict[str, Dict] = {}
+
+    for source, ranking in enumerate(rankings):
+        for rank, item in enumerate(ranking, start=1):
+            item_key = key(item)
+            scores[item_key] = scores.get(item_key, 0.0) + 1.0 / (k + rank)
+            if item_key not in items:
+                items[item_key] = dict(item, sources=[])
+            items[item_key]['sources'].append(item.get('source', source))
+
+    fused = sorted(items, key=lambda item_key: scores[item_key], reverse=True)
+    return [dict(items[item_key], rrf_score=scores[item_key]) for item_key in fused]
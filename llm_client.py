@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""
+LLM Client - Chat completions with bounded tail latency
+One pooled HTTP client per process, a deadline on every call, jittered
+exponential retries on transient errors, optional hedged requests once a call
+runs past the recent p95, and a circuit breaker so callers stop waiting on an
+upstream that is down and serve a degraded reply instead
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+import httpx
+import openai
+
+# SDK errors worth another attempt; anything else (bad request, auth) fails at once.
+# TimeoutError is a hedged attempt outliving its timeout while both requests wait
+RETRYABLE_ERRORS = (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError,
+                    openai.InternalServerError, TimeoutError)
+
+
+class CircuitOpenError(Exception):
+    """The upstream has failed repeatedly; calls are refused until the cool-down passes"""
+
+
+class DeadlineExceeded(Exception):
+    """A call ran out of time across all its attempts"""
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    return False
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failed attempts.
+
+    While open, allow() is False for `reset_timeout` seconds; then a single
+    probe is let through (half-open) and its outcome closes or re-opens it.
+    A probe that never reports back (cancelled caller) expires after another
+    `reset_timeout`, so the breaker can't wedge half-open.
+
+    Only upstream failures (see is_retryable) are recorded; a rejected request
+    shows the upstream is answering, and just releases the probe.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._probe_started = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def _probe_free(self) -> bool:
+        return not self._probing or time.monotonic() - self._probe_started >= self.reset_timeout
+
+    def healthy(self) -> bool:
+        """Whether a call would be let through right now (without claiming the probe)"""
+        with self._lock:
+            state = self._state()
+            return state == 'closed' or (state == 'half-open' and self._probe_free())
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half-open' and self._probe_free():
+                self._probing = True
+                self._probe_started = time.monotonic()
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self.times_opened += 1
+            self._probing = False
+
+    def release(self):
+        """An attempt that says nothing about upstream health: free the probe, keep the count"""
+        with self._lock:
+            self._probing = False
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'state': self._state(),
+                'consecutive_failures': self._failures,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected
+            }
+
+
+class LatencyWindow:
+    """Recent successful call latencies, for the hedge delay and metrics"""
+
+    def __init__(self, size: int = 200):
+        self._latencies = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def percentile(self, q: float, min_samples: int = 20) -> Optional[float]:
+        with self._lock:
+            if len(self._latencies) < min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def parse_model_map(spec: str) -> Dict[str, str]:
+    """'gpt-4=llama3.1:70b,gpt-4o-mini=llama3.1:8b' -> {'gpt-4': 'llama3.1:70b', ...}"""
+    mapping = {}
+    for pair in spec.split(','):
+        if '=' in pair:
+            name, target = pair.split('=', 1)
+            mapping[name.strip()] = target.strip()
+    return mapping
+
+
+class LLMPolicy:
+    """Endpoint, timeouts, retries, hedging and breaker settings, read from the environment"""
+
+    def __init__(self):
+        # Any OpenAI-compatible server (a local model, a gateway, fake_openai_server.py);
+        # the model map renames the models the app asks for to ones that server has
+        self.base_url = os.getenv('AI_TWIN_LLM_BASE_URL') or None
+        self.model_map = parse_model_map(os.getenv('AI_TWIN_MODEL_MAP', ''))
+        self.deadline = float(os.getenv('AI_TWIN_LLM_DEADLINE', '20'))
+        self.attempt_timeout = float(os.getenv('AI_TWIN_LLM_ATTEMPT_TIMEOUT', '10'))
+        self.connect_timeout = float(os.getenv('AI_TWIN_LLM_CONNECT_TIMEOUT', '3'))
+        self.max_attempts = int(os.getenv('AI_TWIN_LLM_MAX_ATTEMPTS', '3'))
+        self.backoff_base = float(os.getenv('AI_TWIN_LLM_BACKOFF_BASE', '0.25'))
+        self.backoff_max = float(os.getenv('AI_TWIN_LLM_BACKOFF_MAX', '4'))
+        self.hedge = os.getenv('AI_TWIN_LLM_HEDGE', '0') == '1'
+        # Until enough latencies are seen to estimate p95, hedge after this long
+        self.hedge_delay = float(os.getenv('AI_TWIN_LLM_HEDGE_DELAY', '3'))
+        self.max_connections = int(os.getenv('AI_TWIN_LLM_MAX_CONNECTIONS', '100'))
+        self.max_keepalive = int(os.getenv('AI_TWIN_LLM_MAX_KEEPALIVE', '20'))
+        self.breaker_threshold = int(os.getenv('AI_TWIN_LLM_BREAKER_THRESHOLD', '5'))
+        self.breaker_reset = float(os.getenv('AI_TWIN_LLM_BREAKER_RESET', '30'))
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.max_connections,
+                            max_keepalive_connections=self.max_keepalive, keepalive_expiry=30)
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.attempt_timeout, connect=self.connect_timeout)
+
+    def model_for(self, model: str) -> str:
+        return self.model_map.get(model, model)
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: uniform in [0, min(cap, base * 2^attempt)]"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+
+class LLMClientBase:
+    """State shared by the sync and async clients: policy, breaker, latencies, counters"""
+
+    def __init__(self, policy: Optional[LLMPolicy] = None, breaker: Optional[CircuitBreaker] = None,
+                 latencies: Optional[LatencyWindow] = None):
+        self.policy = policy or LLMPolicy()
+        self.breaker = breaker or CircuitBreaker(self.policy.breaker_threshold, self.policy.breaker_reset)
+        self.latencies = latencies or LatencyWindow()
+        self._stats_lock = threading.Lock()
+        self._counters = {'calls': 0, 'attempts': 0, 'retries': 0, 'hedges': 0, 'hedge_wins': 0,
+                          'failures': 0, 'deadline_exceeded': 0}
+
+    def _count(self, name: str, n: int = 1):
+        with self._stats_lock:
+            self._counters[name] += n
+
+    def healthy(self) -> bool:
+        return self.breaker.healthy()
+
+    def hedge_after(self) -> float:
+        p95 = self.latencies.percentile(95)
+        return p95 if p95 is not None else self.policy.hedge_delay
+
+    def _before_attempt(self, attempt: int, deadline: float) -> float:
+        """Check breaker and deadline; returns this attempt's timeout"""
+        if not self.breaker.allow():
+            raise CircuitOpenError("LLM upstream unavailable, circuit open")
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self._count('deadline_exceeded')
+            raise DeadlineExceeded(f"LLM call exceeded {self.policy.deadline:.0f}s deadline")
+        self._count('attempts')
+        if attempt:
+            self._count('retries')
+        return min(self.policy.attempt_timeout, remaining)
+
+    def _record_failure(self, error: Exception):
+        """Count timeouts, connection errors, 429s and 5xx against the breaker, nothing else"""
+        if is_retryable(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+
+    def _after_failure(self, error: Exception, attempt: int, deadline: float) -> float:
+        """Record a failed attempt; returns the backoff, or re-raises if it isn't worth retrying"""
+        self._record_failure(error)
+        delay = self.policy.backoff(attempt)
+        if (not is_retryable(error) or attempt + 1 >= self.policy.max_attempts
+                or time.monotonic() + delay >= deadline):
+            self._count('failures')
+            raise error
+        return delay
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self._counters)
+        p50, p95 = self.latencies.percentile(50, 1), self.latencies.percentile(95, 1)
+        stats.update({
+            'breaker': self.breaker.stats(),
+            'p50_ms': round(p50 * 1000, 1) if p50 is not None else None,
+            'p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+            'hedging': self.policy.hedge
+        })
+        return stats
+
+
+class LLMClient(LLMClientBase):
+    """Blocking chat completions over a pooled openai.OpenAI client"""
+
+    def __init__(self, api_key: str, policy: Optional[LLMPolicy] = None, **shared):
+        super().__init__(policy, **shared)
+        self.client = openai.OpenAI(
+            api_key=api_key,
+            base_url=self.policy.base_url,
+            max_retries=0,  # retries are ours, jittered and bounded by the deadline
+            http_client=openai.DefaultHttpxClient(limits=self.policy.limits(), timeout=self.policy.timeout())
+        )
+        self._hedge_pool = ThreadPoolExecutor(max_workers=self.policy.max_connections,
+                                              thread_name_prefix="llm-hedge") if self.policy.hedge else None
+
+    def _create(self, timeout: float, **kwargs):
+        start = time.perf_counter()
+        response = self.client.chat.completions.create(timeout=timeout, **kwargs)
+        self.latencies.add(time.perf_counter() - start)
+        return response
+
+    def _create_hedged(self, timeout: float, **kwargs):
+        """Send a second identical request if the first is slower than the recent p95.
+
+        Both requests share the attempt's `timeout`: the backup gets what is left of it.
+        """
+        attempt_deadline = time.monotonic() + timeout
+        primary = self._hedge_pool.submit(self._create, timeout, **kwargs)
+        done, _ = wait([primary], timeout=min(self.hedge_after(), timeout))
+        if done:
+            return primary.result()
+
+        remaining = attempt_deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"LLM attempt exceeded {timeout:.1f}s")
+        self._count('hedges')
+        backup = self._hedge_pool.submit(self._create, remaining, **kwargs)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(0.0, attempt_deadline - time.monotonic()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                # Read timeouts are per chunk, so a trickling response can outlive the attempt
+                raise TimeoutError(f"LLM attempt exceeded {timeout:.1f}s")
+            for future in done:
+                if future.exception() is None:
+                    # The loser finishes in the background; blocking calls can't be cancelled
+                    if future is backup:
+                        self._count('hedge_wins')
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def complete(self, messages: List[Dict[str, str]], model: str = "gpt-4", **kwargs) -> str:
+        """Reply text, retrying transient failures within the call deadline"""
+        self._count('calls')
+        model = self.policy.model_for(model)
+        deadline = time.monotonic() + self.policy.deadline
+        attempt = 0
+        while True:
+            timeout = self._before_attempt(attempt, deadline)
+            try:
+                if self._hedge_pool:
+                    response = self._create_hedged(timeout, model=model, messages=messages, **kwargs)
+                else:
+                    response = self._create(timeout, model=model, messages=messages, **kwargs)
+                self.breaker.record_success()
+                return response.choices[0].message.content.strip()
+            except Exception as e:
+                time.sleep(self._after_failure(e, attempt, deadline))
+            attempt += 1
+
+    def stream(self, messages: List[Dict[str, str]], model: str = "gpt-4", **kwargs) -> Iterator[str]:
+        """Yield reply text as it arrives; only failures before the first token are retried"""
+        self._count('calls')
+        model = self.policy.model_for(model)
+        deadline = time.monotonic() + self.policy.deadline
+        attempt = 0
+        while True:
+            timeout = self._before_attempt(attempt, deadline)
+            started = False
+            try:
+                start = time.perf_counter()
+                stream = self.client.chat.completions.create(
+                    model=model, messages=messages, stream=True, timeout=timeout, **kwargs
+                )
+                for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        if not started:
+                            self.latencies.add(time.perf_counter() - start)
+                            started = True
+                        yield delta
+                    if time.monotonic() > deadline:
+                        stream.close()
+                        self._count('deadline_exceeded')
+                        raise DeadlineExceeded(f"LLM stream exceeded {self.policy.deadline:.0f}s deadline")
+                self.breaker.record_success()
+                return
+            except GeneratorExit:
+                # The caller stopped reading; the upstream itself was answering
+                self.breaker.record_success()
+                raise
+            except DeadlineExceeded:
+                self.breaker.record_failure()
+                raise
+            except Exception as e:
+                if started:
+                    self._record_failure(e)
+                    self._count('failures')
+                    raise
+                time.sleep(self._after_failure(e, attempt, deadline))
+            attempt += 1
+
+    def close(self):
+        self.client.close()
+        if self._hedge_pool:
+            self._hedge_pool.shutdown(wait=False)
+
+
+class AsyncLLMClient(LLMClientBase):
+    """Awaitable chat completions over a pooled openai.AsyncOpenAI client.
+
+    Pass the sync client's breaker and latencies to share upstream health
+    between the Flask and ASGI paths of one process.
+    """
+
+    def __init__(self, api_key: str, policy: Optional[LLMPolicy] = None, **shared):
+        super().__init__(policy, **shared)
+        self.client = openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=self.policy.base_url,
+            max_retries=0,
+            http_client=openai.DefaultAsyncHttpxClient(limits=self.policy.limits(), timeout=self.policy.timeout())
+        )
+
+    async def _create(self, timeout: float, **kwargs):
+        start = time.perf_counter()
+        response = await self.client.chat.completions.create(timeout=timeout, **kwargs)
+        self.latencies.add(time.perf_counter() - start)
+        return response
+
+    async def _create_hedged(self, timeout: float, **kwargs):
+        attempt_deadline = time.monotonic() + timeout
+        primary = asyncio.ensure_future(self._create(timeout, **kwargs))
+        done, _ = await asyncio.wait({primary}, timeout=min(self.hedge_after(), timeout))
+        if done:
+            return primary.result()
+
+        pending = {primary}
+        error = None
+        try:
+            remaining = attempt_deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"LLM attempt exceeded {timeout:.1f}s")
+            self._count('hedges')
+            backup = asyncio.ensure_future(self._create(remaining, **kwargs))
+            pending.add(backup)
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=max(0.0, attempt_deadline - time.monotonic()),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise TimeoutError(f"LLM attempt exceeded {timeout:.1f}s")
+                for task in done:
+                    if task.exception() is None:
+                        if task is backup:
+                            self._count('hedge_wins')
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def complete(self, messages: List[Dict[str, str]], model: str = "gpt-4", **kwargs) -> str:
+        self._count('calls')
+        model = self.policy.model_for(model)
+        deadline = time.monotonic() + self.policy.deadline
+        attempt = 0
+        while True:
+            timeout = self._before_attempt(attempt, deadline)
+            try:
+                if self.policy.hedge:
+                    response = await self._create_hedged(timeout, model=model, messages=messages, **kwargs)
+                else:
+                    response = await self._create(timeout, model=model, messages=messages, **kwargs)
+                self.breaker.record_success()
+                return response.choices[0].message.content.strip()
+            except Exception as e:
+                await asyncio.sleep(self._after_failure(e, attempt, deadline))
+            attempt += 1
+
+    async def stream(self, messages: List[Dict[str, str]], model: str = "gpt-4", **kwargs) -> AsyncIterator[str]:
+        self._count('calls')
+        model = self.policy.model_for(model)
+        deadline = time.monotonic() + self.policy.deadline
+        attempt = 0
+        while True:
+            timeout = self._before_attempt(attempt, deadline)
+            started = False
+            try:
+                start = time.perf_counter()
+                stream = await self.client.chat.completions.create(
+                    model=model, messages=messages, stream=True, timeout=timeout, **kwargs
+                )
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        if not started:
+                            self.latencies.add(time.perf_counter() - start)
+                            started = True
+                        yield delta
+                    if time.monotonic() > deadline:
+                        await stream.close()
+                        self._count('deadline_exceeded')
+                        raise DeadlineExceeded(f"LLM stream exceeded {self.policy.deadline:.0f}s deadline")
+                self.breaker.record_success()
+                return
+            except GeneratorExit:
+                # The caller stopped reading; the upstream itself was answering
+                self.breaker.record_success()
+                raise
+            except DeadlineExceeded:
+                self.breaker.record_failure()
+                raise
+            except Exception as e:
+                if started:
+                    self._record_failure(e)
+                    self._count('failures')
+                    raise
+                await asyncio.sleep(self._after_failure(e, attempt, deadline))
+            attempt += 1
+
+    async def close(self):
+        await self.client.close()
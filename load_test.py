@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Load Test - Drive /api/chat at a fixed request rate and report per-stage latency
+Requests are sent open-loop: each is due at start + i / rps whether or not
+earlier ones have answered, and latency is measured from when it was due, so a
+backed-up server shows up as latency instead of a silently lower rate. Stage
+timings come from each reply's Server-Timing header
+
+Usage: python fake_openai_server.py --port 8900 &
+       AI_TWIN_LLM_BASE_URL=http://localhost:8900/v1 OPENAI_API_KEY=fake uvicorn asgi:app --port 8347 &
+       python load_test.py --url http://localhost:8347 --rps 50 --duration 60
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+
+from stage_timer import parse_server_timing
+
+# A mix of pings, small talk and substantive messages, so every route gets traffic
+DEFAULT_MESSAGES = [
+    "..", "where", "ok", "hi", "Hlo", "ok ok",
+    "hi how are you", "what are you doing", "good morning ra", "lunch ayyinda?",
+    "I am really upset today, my exam went so badly and nobody even called me",
+    "remember when we talked about that movie last week? I finally watched it",
+    "enti ala silent ga unnav, did I say something wrong yesterday?",
+    "I got the internship!! Can you believe it, I'm so happy right now 😊",
+]
+
+STAGE_ORDER = ['cache', 'retrieval', 'style', 'prompt', 'llm', 'persist']
+
+
+class LoadResults:
+    """Thread-safe collection of per-request outcomes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: List[float] = []
+        self.stages: Dict[str, List[float]] = {}
+        self.status_counts: Dict[str, int] = {}
+        self.degraded = 0
+
+    def add(self, status: str, latency_ms: float, timings: Dict[str, float], degraded: bool):
+        with self._lock:
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            self.latencies.append(latency_ms)
+            self.degraded += degraded
+            for stage, ms in timings.items():
+                self.stages.setdefault(stage, []).append(ms)
+
+
+def send_chat(url: str, message: str, due: float, timeout: float, results: LoadResults):
+    request = urllib.request.Request(f"{url}/api/chat", data=json.dumps({'message': message}).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'}, method='POST')
+    status, timings, degraded = 'error', {}, False
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            body = json.loads(response.read() or b'{}')
+            status = str(response.status)
+            timings = parse_server_timing(response.headers.get('Server-Timing', ''))
+            degraded = bool(body.get('degraded'))
+    except urllib.error.HTTPError as e:
+        status = str(e.code)
+    except Exception as e:
+        status = type(e).__name__
+    results.add(status, 1000 * (time.perf_counter() - due), timings, degraded)
+
+
+def row(name: str, values: List[float]) -> str:
+    if not values:
+        # e.g. every request failed, or a stage no request reached
+        return f"{name:<12}{0:>8}{'n/a':>10}{'n/a':>10}{'n/a':>10}"
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return f"{name:<12}{len(values):>8}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop load test for the AI Twin chat endpoint")
+    parser.add_argument('--url', default='http://localhost:8347')
+    parser.add_argument('--rps', type=float, default=20)
+    parser.add_argument('--duration', type=float, default=30, help="Seconds of load")
+    parser.add_argument('--concurrency', type=int, default=512, help="Max requests in flight")
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--messages', default=None, help="File with one message per line")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    messages = DEFAULT_MESSAGES
+    if args.messages:
+        with open(args.messages, 'r', encoding='utf-8') as f:
+            messages = [line.strip() for line in f if line.strip()]
+    rng = random.Random(args.seed)
+
+    total = int(args.rps * args.duration)
+    results = LoadResults()
+    print(f"🚀 {total} requests at {args.rps:g} rps against {args.url}/api/chat")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for i in range(total):
+            due = start + i / args.rps
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send_chat, args.url, rng.choice(messages), due, args.timeout, results)
+    elapsed = time.perf_counter() - start
+
+    ok = results.status_counts.get('200', 0)
+    print()
+    print(f"📊 {ok}/{total} ok in {elapsed:.1f}s → {ok / elapsed:.1f} replies/s "
+          f"(target {args.rps:g}), {results.degraded} degraded")
+    print(f"   status: {dict(sorted(results.status_counts.items()))}")
+    print()
+    print(f"{'stage':<12}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    print(row('end-to-end', results.latencies))
+    stages = sorted(results.stages, key=lambda s: (STAGE_ORDER.index(s) if s in STAGE_ORDER else len(STAGE_ORDER), s))
+    for stage in stages:
+        print(row(stage, results.stages[stage]))
+
+
+if __name__ == "__main__":
+    main()
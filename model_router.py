@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Model Router - Pick the model tier for a reply from cheap message features
+Pings like ".." or "ok" go to a fast, cheap model; messages that are long,
+emotional or tied to remembered conversations get GPT-4. Routes are tried in
+order and the first whose conditions all hold wins
+"""
+
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import yaml
+
+# Used when no routes file is configured; the last route has no conditions
+DEFAULT_ROUTES = [
+    {'name': 'ping', 'model': 'gpt-4o-mini', 'max_tokens': 60,
+     'moods': ['waiting/reminder'], 'memory_hit': False},
+    {'name': 'small-talk', 'model': 'gpt-4o-mini', 'max_tokens': 100,
+     'moods': ['neutral', 'happy'], 'max_chars': 40, 'memory_hit': False},
+    {'name': 'default', 'model': 'gpt-4', 'max_tokens': 150}
+]
+
+
+class RouteFeatures:
+    """What routing looks at; all of it is already computed for the prompt"""
+
+    def __init__(self, mood: str, chars: int, language: str, memory_hit: bool):
+        self.mood = mood
+        self.chars = chars
+        self.language = language
+        self.memory_hit = memory_hit
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'mood': self.mood, 'chars': self.chars, 'language': self.language,
+                'memory_hit': self.memory_hit}
+
+
+class Route:
+    """A model tier and the conditions a message must meet to use it; unset conditions always hold"""
+
+    def __init__(self, name: str, model: str, max_tokens: int = 150, temperature: float = 0.8,
+                 moods: Optional[List[str]] = None, languages: Optional[List[str]] = None,
+                 min_chars: Optional[int] = None, max_chars: Optional[int] = None,
+                 memory_hit: Optional[bool] = None):
+        self.name = name
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.moods = set(moods) if moods else None
+        self.languages = set(languages) if languages else None
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.memory_hit = memory_hit
+
+    def matches(self, features: RouteFeatures) -> bool:
+        if self.moods is not None and features.mood not in self.moods:
+            return False
+        if self.languages is not None and features.language not in self.languages:
+            return False
+        if self.min_chars is not None and features.chars < self.min_chars:
+            return False
+        if self.max_chars is not None and features.chars > self.max_chars:
+            return False
+        if self.memory_hit is not None and features.memory_hit != self.memory_hit:
+            return False
+        return True
+
+
+class RouteStats:
+    """Counts, recent latencies and token totals for one route"""
+
+    def __init__(self, window: int = 500):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latencies = deque(maxlen=window)
+
+    def summary(self) -> Dict[str, Any]:
+        latencies = np.array(self.latencies) * 1000 if self.latencies else None
+        return {
+            'requests': self.requests,
+            'p50_ms': round(float(np.percentile(latencies, 50)), 1) if latencies is not None else None,
+            'p95_ms': round(float(np.percentile(latencies, 95)), 1) if latencies is not None else None,
+            'avg_prompt_tokens': self.prompt_tokens / self.requests if self.requests else 0.0,
+            'avg_completion_tokens': self.completion_tokens / self.requests if self.requests else 0.0
+        }
+
+
+class ModelRouter:
+    """Ordered routing table with per-route latency and token stats"""
+
+    def __init__(self, routes: List[Dict[str, Any]], log: bool = True):
+        self.routes = [Route(**route) for route in routes]
+        if not self.routes:
+            raise ValueError("routing table is empty")
+        self.log = log
+        self._lock = threading.Lock()
+        self._stats = {route.name: RouteStats() for route in self.routes}
+
+    @classmethod
+    def from_file(cls, routes_file: Optional[str], log: bool = True) -> 'ModelRouter':
+        """Routes from a YAML file's `routes:` list, or the defaults if no file is given"""
+        if not routes_file:
+            return cls(DEFAULT_ROUTES, log=log)
+        try:
+            with open(routes_file, 'r', encoding='utf-8') as f:
+                routes = yaml.safe_load(f)['routes']
+            router = cls(routes, log=log)
+            print(f"✅ Loaded {len(routes)} model routes from {routes_file}")
+            return router
+        except Exception as e:
+            print(f"❌ Error loading model routes from {routes_file}: {e}, using defaults")
+            return cls(DEFAULT_ROUTES, log=log)
+
+    def route(self, features: RouteFeatures) -> Route:
+        """First matching route; the last route is the fallback even if its conditions fail"""
+        for route in self.routes:
+            if route.matches(features):
+                return route
+        return self.routes[-1]
+
+    def record(self, route: Route, seconds: float, prompt_tokens: int, completion_tokens: int):
+        with self._lock:
+            stats = self._stats[route.name]
+            stats.requests += 1
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.latencies.append(seconds)
+
+        if self.log:
+            print(f"🧭 Route {route.name} → {route.model}: {seconds * 1000:.0f}ms, "
+                  f"{prompt_tokens} prompt + {completion_tokens} completion tokens")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {route.name: dict(self._stats[route.name].summary(), model=route.model)
+                    for route in self.routes}
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Parallel Chat Ingestion - Process pool for parsing and embedding WhatsApp exports
+Workers parse (and optionally embed) chat files and stream batches back to the
+calling process, which stays the single writer for SQLite and ChromaDB
+"""
+
+import multiprocessing
+import os
+import queue
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from chat_parser import find_resume_point, iter_checkpointed_batches
+
+# Per-worker state, set up once by _init_worker
+_event_queue = None
+_embedding_model = None
+
+
+def _init_worker(event_queue, embedder_spec: Optional[str], torch_threads: int):
+    """Initialize a worker process, loading its own embedder if workers embed"""
+    global _event_queue, _embedding_model
+    _event_queue = event_queue
+
+    if embedder_spec:
+        try:
+            import torch
+            # Keep workers from oversubscribing cores with intra-op threads
+            torch.set_num_threads(torch_threads)
+        except ImportError:
+            pass
+        from embedders import create_embedder
+        _embedding_model = create_embedder(embedder_spec)
+
+
+def _ingest_file(file_path: str, checkpoint: Optional[Dict], batch_size: int) -> int:
+    """Parse one chat file from its checkpoint and stream batches to the writer.
+
+    Events put on the queue:
+    ('batch', file_name, messages, embeddings or None, checkpoint)
+    ('done', file_name, message_count, error or None, up_to_date)
+    """
+    path = Path(file_path)
+    produced = 0
+
+    try:
+        start_offset, hasher = find_resume_point(path, checkpoint)
+        if start_offset is None:
+            _event_queue.put(('done', path.name, 0, None, True))
+            return 0
+
+        base_count = checkpoint['message_count'] if checkpoint and start_offset else 0
+        for messages, batch_checkpoint in iter_checkpointed_batches(
+                path, start_offset, hasher, batch_size, base_count):
+            embeddings = None
+            if _embedding_model is not None:
+                embeddings = _embedding_model.encode(
+                    [msg['message'] for msg in messages], show_progress_bar=False
+                )
+            _event_queue.put(('batch', path.name, messages, embeddings, batch_checkpoint))
+            produced += len(messages)
+
+        _event_queue.put(('done', path.name, produced, None, False))
+    except Exception as e:
+        _event_queue.put(('done', path.name, produced, str(e), False))
+
+    return produced
+
+
+class ParallelIngestor:
+    """Fans chat files out to a process pool and yields their batches in arrival order"""
+
+    def __init__(self, workers: int, batch_size: int, embedder_spec: Optional[str] = None,
+                 queue_size: Optional[int] = None):
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.embedder_spec = embedder_spec
+        # Bounded so workers block instead of piling parsed batches up in memory
+        self.queue_size = queue_size or self.workers * 4
+
+    def run(self, jobs: List[Tuple[Path, Optional[Dict]]]) -> Iterator[Tuple]:
+        """Ingest (file_path, checkpoint) jobs, yielding worker events until every file is done"""
+        if not jobs:
+            return
+
+        # Spawn rather than fork: the parent holds a SQLite connection and possibly torch threads
+        ctx = multiprocessing.get_context('spawn')
+        event_queue = ctx.Queue(maxsize=self.queue_size)
+        torch_threads = max(1, (os.cpu_count() or 1) // self.workers)
+
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx,
+                                 initializer=_init_worker,
+                                 initargs=(event_queue, self.embedder_spec, torch_threads)) as pool:
+            futures = {
+                pool.submit(_ingest_file, str(path), checkpoint, self.batch_size): path.name
+                for path, checkpoint in jobs
+            }
+            pending = set(futures.values())
+
+            while pending:
+                try:
+                    event = event_queue.get(timeout=1.0)
+                except queue.Empty:
+                    # A worker that died (e.g. OOM-killed) never reports 'done'
+                    for future, file_name in futures.items():
+                        if file_name in pending and future.done() and future.exception():
+                            pending.discard(file_name)
+                            yield ('done', file_name, 0, str(future.exception()), False)
+                    continue
+
+                if event[0] == 'done':
+                    pending.discard(event[1])
+                yield event
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Phrase Scanner - Aho-Corasick multi-phrase matcher for chat pattern extraction
+Scans each message once for every phrase in every group and counts occurrences
+"""
+
+from collections import Counter, deque
+from typing import Dict, Iterable, Iterator, List
+
+
+class PhraseScanner:
+    """Case-insensitive Aho-Corasick automaton over named groups of phrases.
+
+    The automaton is built once; scanning a message costs one pass over its
+    characters plus the number of matches, however many phrases there are.
+    Matches are substring matches, so overlapping phrases are all counted.
+    """
+
+    def __init__(self, phrase_groups: Dict[str, Iterable[str]]):
+        self.groups = list(phrase_groups)
+        # Per pattern: (group, phrase as written in the list)
+        self.patterns = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        seen = set()
+        for group, phrases in phrase_groups.items():
+            for phrase in phrases:
+                key = (group, phrase.lower())
+                if not phrase or key in seen:
+                    continue
+                seen.add(key)
+                self._add(phrase.lower(), len(self.patterns))
+                self.patterns.append((group, phrase))
+
+        self._build_failure_links()
+
+    def _add(self, phrase: str, pattern_id: int):
+        """Insert a lowercased phrase into the trie"""
+        node = 0
+        for ch in phrase:
+            next_node = self._goto[node].get(ch)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][ch] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append(pattern_id)
+
+    def _build_failure_links(self):
+        """Breadth-first pass setting failure links and merging outputs along them"""
+        pending = deque(self._goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for ch, child in self._goto[node].items():
+                pending.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                # Every phrase ending at the fallback state also ends here
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def iter_matches(self, text: str) -> Iterator[int]:
+        """Yield the pattern ID of every phrase occurrence in text"""
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+        for ch in text.lower():
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if output[node]:
+                yield from output[node]
+
+    def count(self, messages: Iterable[str]) -> Dict[str, Counter]:
+        """Count phrase occurrences across messages, per group"""
+        pattern_counts = Counter()
+        for msg in messages:
+            pattern_counts.update(self.iter_matches(msg))
+
+        counts = {group: Counter() for group in self.groups}
+        for pattern_id, occurrences in pattern_counts.items():
+            group, phrase = self.patterns[pattern_id]
+            counts[group][phrase] = occurrences
+        return counts
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Prompt Builder - Token-budgeted prompt assembly
+Memories, style exemplars and history are kept most-relevant-first until the
+token budget is spent; the system message is only ever the frozen personality
+prompt, so its bytes (and a provider-side prefix cache) stay identical across
+requests. Token counts use tiktoken when it is installed, else an estimate
+"""
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Relevance-scored lines of a trimmable section, in display order
+RankedItems = List[Tuple[float, str]]
+
+
+class TokenCounter:
+    """tiktoken encoding for the model, or ~4 UTF-8 bytes per token without it"""
+
+    def __init__(self, model: str = "gpt-4"):
+        self.encoding = None
+        try:
+            import tiktoken
+            self.encoding = tiktoken.encoding_for_model(model)
+        except (ImportError, KeyError):
+            pass
+        self.exact = self.encoding is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is not None:
+            return len(self.encoding.encode(text))
+        # Telugu script is 3 bytes a character and tokenizes densely, so bytes beat characters
+        return (len(text.encode('utf-8')) + 3) // 4
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut text to at most max_tokens, marking the cut"""
+        if self.count(text) <= max_tokens:
+            return text
+        if self.encoding is not None:
+            return self.encoding.decode(self.encoding.encode(text)[:max_tokens]).rstrip() + "…"
+        data = text.encode('utf-8')[:max_tokens * 4]
+        return data.decode('utf-8', errors='ignore').rstrip() + "…"
+
+
+class PromptBuilder:
+    """Renders a user-message template under a total token budget and logs section sizes.
+
+    Fixed sections (context, input) are always included, the input cut to
+    max_input_tokens. Ranked sections are filled in the order given, each
+    taking its highest-relevance lines that still fit.
+    """
+
+    def __init__(self, budget: int = 2000, max_input_tokens: int = 400, model: str = "gpt-4",
+                 log: bool = True):
+        self.budget = budget
+        self.max_input_tokens = max_input_tokens
+        self.counter = TokenCounter(model)
+        self.log = log
+        self._system_tokens: Optional[Tuple[str, int]] = None
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._over_budget = 0
+        self._section_totals: Dict[str, int] = {}
+        self._trimmed_totals: Dict[str, int] = {}
+
+    def _count_system(self, system_prompt: str) -> int:
+        # The system prompt is identical every request; count it once
+        cached = self._system_tokens
+        if cached is None or cached[0] is not system_prompt:
+            cached = (system_prompt, self.counter.count(system_prompt))
+            self._system_tokens = cached
+        return cached[1]
+
+    def count_messages(self, messages: List[Dict[str, str]]) -> int:
+        """Prompt tokens of built messages, reusing the system prompt's count"""
+        return sum(self._count_system(m['content']) if m['role'] == 'system' else self.counter.count(m['content'])
+                   for m in messages)
+
+    def _fit(self, header: str, items: RankedItems, available: int) -> Tuple[str, int, int]:
+        """Render the most relevant items that fit; returns (text, tokens, items trimmed)"""
+        kept = set()
+        used = self.counter.count(header)
+        for index in sorted(range(len(items)), key=lambda i: -items[i][0]):
+            cost = self.counter.count(items[index][1] + "\n")
+            if used + cost <= available:
+                kept.add(index)
+                used += cost
+        if not kept:
+            return "", 0, len(items)
+        lines = [text for index, (_, text) in enumerate(items) if index in kept]
+        return header + "\n".join(lines) + "\n", used, len(items) - len(kept)
+
+    def build(self, system_prompt: str, template: str, fixed: Dict[str, str],
+              ranked: List[Tuple[str, str, RankedItems]]) -> List[Dict[str, str]]:
+        """Chat messages for the template; `fixed` must include an 'input' section"""
+        fixed = dict(fixed)
+        fixed['input'] = self.counter.truncate(fixed['input'], self.max_input_tokens)
+
+        sections = {'system': self._count_system(system_prompt)}
+        for name, text in fixed.items():
+            sections[name] = self.counter.count(text)
+        skeleton = self.counter.count(template.format(**fixed, **{name: "" for name, _, _ in ranked}))
+        available = self.budget - sections['system'] - skeleton
+
+        rendered = {}
+        trimmed = {}
+        for name, header, items in ranked:
+            rendered[name], sections[name], trimmed[name] = self._fit(header, items, max(0, available))
+            available -= sections[name]
+
+        user_prompt = template.format(**fixed, **rendered)
+        sections['template'] = max(0, skeleton - sum(sections[name] for name in fixed))
+        total = sections['system'] + skeleton + sum(sections[name] for name, _, _ in ranked)
+        self._record(sections, trimmed, total)
+
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    def _record(self, sections: Dict[str, int], trimmed: Dict[str, int], total: int):
+        with self._stats_lock:
+            self._requests += 1
+            self._over_budget += total > self.budget
+            for name, tokens in sections.items():
+                self._section_totals[name] = self._section_totals.get(name, 0) + tokens
+            for name, count in trimmed.items():
+                self._trimmed_totals[name] = self._trimmed_totals.get(name, 0) + count
+
+        if self.log:
+            parts = []
+            for name, tokens in sections.items():
+                part = f"{name}={tokens}"
+                if trimmed.get(name):
+                    part += f" ({trimmed[name]} trimmed)"
+                parts.append(part)
+            estimate = "" if self.counter.exact else " (estimated)"
+            print(f"🧮 Prompt tokens: {' '.join(parts)} total={total}/{self.budget}{estimate}")
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            requests = self._requests
+            return {
+                'requests': requests,
+                'budget': self.budget,
+                'over_budget': self._over_budget,
+                'exact_counts': self.counter.exact,
+                'avg_tokens': {name: total / requests for name, total in self._section_totals.items()},
+                'trimmed_items': dict(self._trimmed_totals)
+            }
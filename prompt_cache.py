@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Prompt Cache - On-disk cache for the built personality prompt
+Keyed by a hash of the personality file plus a fingerprint of the chat files,
+so a restart with unchanged inputs skips chat parsing and pattern scanning
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+# Bump when the cached payload or prompt layout changes
+CACHE_VERSION = 1
+
+
+class PromptCache:
+    """Stores one JSON payload per cache key under cache_dir"""
+
+    def __init__(self, cache_dir: str = ".ai_twin_cache"):
+        self.cache_dir = Path(cache_dir)
+
+    def make_key(self, personality_file: str, chat_files: Iterable[Path], extra: Any = None) -> str:
+        """Hash the personality file contents and the chat files' names, sizes and mtimes.
+
+        `extra` covers inputs that live in code, such as the phrase lists.
+        """
+        hasher = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+
+        try:
+            with open(personality_file, 'rb') as f:
+                hasher.update(f.read())
+        except OSError:
+            hasher.update(b'<no personality file>')
+
+        for file_path in sorted(chat_files):
+            stat = file_path.stat()
+            hasher.update(f"\0{file_path.name}\0{stat.st_size}\0{stat.st_mtime_ns}".encode())
+
+        if extra is not None:
+            hasher.update(json.dumps(extra, sort_keys=True).encode())
+
+        return hasher.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"prompt_{key}.json"
+
+    def load(self, key: str) -> Optional[Dict]:
+        """Return the cached payload for key, or None on a miss"""
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable prompt cache: {e}")
+            return None
+
+    def save(self, key: str, payload: Dict):
+        """Atomically write the payload for key and drop entries for older keys"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self._path(key)
+            tmp_path = path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+            for old_path in self.cache_dir.glob("prompt_*.json"):
+                if old_path != path:
+                    old_path.unlink()
+        except Exception as e:
+            print(f"⚠️ Could not write prompt cache: {e}")
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Query Cache - Bounded LRU cache for query embeddings and semantic search results
+Repeated messages ("hi", "..", "ok ok") skip the encode and, within a short TTL,
+the vector query too
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+def normalize_query(text: str) -> str:
+    """Case- and whitespace-insensitive cache key for a query"""
+    return ' '.join(text.lower().split())
+
+
+class LRUCache:
+    """Thread-safe LRU map with an optional per-entry TTL"""
+
+    def __init__(self, max_entries: int, ttl: Optional[float] = None):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if self.ttl is None or time.monotonic() - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+
+
+class QueryCache:
+    """Query embeddings (LRU) plus top-k result sets (LRU with a short TTL).
+
+    Result sets are invalidated whenever new vectors are stored. A generation
+    counter keeps a search that raced with a store from caching stale results.
+    """
+
+    def __init__(self, max_entries: int = 1024, result_ttl: float = 30.0):
+        self.embeddings = LRUCache(max_entries)
+        self.results = LRUCache(max_entries, ttl=result_ttl)
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get_embedding(self, query: str):
+        return self.embeddings.get(normalize_query(query))
+
+    def put_embedding(self, query: str, embedding):
+        self.embeddings.put(normalize_query(query), embedding)
+
+    def get_results(self, query: str, *params):
+        results = self.results.get((normalize_query(query),) + params)
+        return list(results) if results is not None else None
+
+    def put_results(self, query: str, params: tuple, results: list, generation: int):
+        """Cache results computed while `generation` was current"""
+        with self._lock:
+            if generation == self._generation:
+                self.results.put((normalize_query(query),) + params, list(results))
+
+    def invalidate_results(self):
+        """Drop cached result sets after new vectors were added"""
+        with self._lock:
+            self._generation += 1
+            self.results.clear()
+
+    def stats(self) -> Dict:
+        return {
+            'embeddings': self.embeddings.stats(),
+            'results': self.results.stats()
+        }
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Response Cache - Reuse GPT replies for repeated and near-identical messages
+An exact tier matches normalised text; a semantic tier matches any cached
+message in the same mood whose embedding is within max_distance. Each entry
+collects a few distinct replies before it starts serving them, so a repeated
+"hi" doesn't always get the same answer
+"""
+
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from query_cache import normalize_query
+
+
+class CachedReplies:
+    """Replies generated for one message, plus what the semantic tier matches on"""
+
+    def __init__(self, mood: str, embedding: Optional[np.ndarray]):
+        self.mood = mood
+        self.embedding = embedding
+        self.replies: List[str] = []
+        self.last_served: Optional[str] = None
+        self.stored_at = time.monotonic()
+
+
+class ResponseCache:
+    """Thread-safe LRU of CachedReplies with a TTL, keyed by (prompt hash, normalised text).
+
+    Distances are 2 - 2 * cosine between normalised embeddings, the same scale
+    as the memory distance threshold. An entry only serves hits once it holds
+    `variants` replies; until then lookups are misses whose replies are added to it.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 3600.0, max_distance: float = 0.1,
+                 variants: int = 3):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.variants = max(1, variants)
+        self._entries: "OrderedDict[Tuple[str, str], CachedReplies]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.variety_fills = 0
+        self.misses = 0
+
+    def _expired(self, entry: CachedReplies, now: float) -> bool:
+        return self.ttl is not None and now - entry.stored_at > self.ttl
+
+    def _find(self, prompt_hash: str, text: str, mood: str,
+              embed: Callable[[], np.ndarray]) -> Tuple[Optional[Tuple[str, str]], bool]:
+        """Key of the matching entry and whether it matched exactly; embeds only on an exact miss"""
+        now = time.monotonic()
+        key = (prompt_hash, normalize_query(text))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                return key, True
+            candidates = [(k, e) for k, e in self._entries.items()
+                          if k[0] == prompt_hash and e.mood == mood and e.embedding is not None
+                          and not self._expired(e, now)]
+        if not candidates:
+            return None, False
+
+        # Encode outside the lock; the caller usually has the embedding cached already
+        query = np.asarray(embed(), dtype=np.float32)
+        distances = 2.0 - 2.0 * (np.stack([e.embedding for _, e in candidates]) @ query)
+        best = int(np.argmin(distances))
+        if distances[best] > self.max_distance:
+            return None, False
+        return candidates[best][0], False
+
+    def get(self, prompt_hash: str, text: str, mood: str, embed: Callable[[], np.ndarray]) -> Optional[str]:
+        """A cached reply for this message, or None if one should be generated"""
+        key, exact = self._find(prompt_hash, text, mood, embed)
+        with self._lock:
+            entry = self._entries.get(key) if key else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if len(entry.replies) < self.variants:
+                self.variety_fills += 1
+                return None
+
+            if exact:
+                self.exact_hits += 1
+            else:
+                self.semantic_hits += 1
+            choices = [r for r in entry.replies if r != entry.last_served] or entry.replies
+            entry.last_served = random.choice(choices)
+            return entry.last_served
+
+    def put(self, prompt_hash: str, text: str, mood: str, embed: Callable[[], np.ndarray], reply: str):
+        """Add a freshly generated reply to the matching entry, or start a new one"""
+        key, _ = self._find(prompt_hash, text, mood, embed)
+        # A new entry needs the message's embedding; encode before taking the lock, as _find does
+        embedding = np.asarray(embed(), dtype=np.float32) if key is None else None
+        with self._lock:
+            entry = self._entries.get(key) if key else None
+            if entry is None:
+                if embedding is None:
+                    # The matched entry was evicted meanwhile; caching is best effort
+                    return
+                key = (prompt_hash, normalize_query(text))
+                entry = CachedReplies(mood, embedding)
+                self._entries[key] = entry
+            if reply not in entry.replies and len(entry.replies) < self.variants:
+                entry.replies.append(reply)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            lookups = hits + self.variety_fills + self.misses
+            return {
+                'entries': len(self._entries),
+                'exact_hits': self.exact_hits,
+                'semantic_hits': self.semantic_hits,
+                'variety_fills': self.variety_fills,
+                'misses': self.misses,
+                'hit_rate': hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+SQLite Pool - Per-thread connections to the twin's database
+Each thread (request handlers, retrieval workers, the write-behind flusher)
+gets its own connection, so reads run concurrently. WAL journal mode means
+readers never wait for the writer. In-process writes are serialised by one
+lock, so they queue here instead of failing with "database is locked"
+"""
+
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class SQLitePool:
+    """Lazily opened per-thread connections with shared pragmas and a writer lock"""
+
+    def __init__(self, path: str, cache_size_mb: int = 16, mmap_size_mb: int = 256,
+                 synchronous: str = 'NORMAL', busy_timeout: float = 5.0, cached_statements: int = 256,
+                 journal_mode: Optional[str] = 'WAL'):
+        self.path = path
+        # None leaves the database file's current journal mode alone
+        self.requested_journal_mode = journal_mode
+        self.cache_size_mb = cache_size_mb
+        self.mmap_size_mb = mmap_size_mb
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+        # Prepared statements kept per connection, keyed by SQL text
+        self.cached_statements = cached_statements
+        self.journal_mode = None
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._connections: List[Tuple[threading.Thread, sqlite3.Connection]] = []
+        self._opened = 0
+        self._writes = 0
+        self._write_wait = 0.0
+        self._closed = False
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection, opened on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+        return conn
+
+    def _open(self) -> sqlite3.Connection:
+        if self._closed:
+            raise sqlite3.ProgrammingError("SQLite pool is closed")
+        # check_same_thread is off only so close() can close every thread's connection;
+        # each connection is otherwise used by the thread that opened it
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        if self.requested_journal_mode:
+            mode = conn.execute(f"PRAGMA journal_mode = {self.requested_journal_mode}").fetchone()[0]
+        else:
+            mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        conn.execute(f"PRAGMA cache_size = {-1024 * self.cache_size_mb}")
+        conn.execute(f"PRAGMA mmap_size = {1024 * 1024 * self.mmap_size_mb}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        # INSERT OR REPLACE only fires the FTS delete triggers with recursive triggers on
+        conn.execute("PRAGMA recursive_triggers = ON")
+
+        with self._lock:
+            if self.journal_mode is None:
+                self.journal_mode = mode
+                if self.requested_journal_mode and mode != self.requested_journal_mode.lower():
+                    print(f"⚠️ SQLite {self.requested_journal_mode} mode unavailable for {self.path}, using {mode}")
+            # Threads that have exited (e.g. per-request server threads) don't need theirs
+            alive = []
+            for thread, old in self._connections:
+                if thread.is_alive():
+                    alive.append((thread, old))
+                else:
+                    old.close()
+            alive.append((threading.current_thread(), conn))
+            self._connections = alive
+            self._opened += 1
+        return conn
+
+    def execute(self, sql: str, params: Any = ()) -> sqlite3.Cursor:
+        """Run a read on this thread's connection"""
+        return self.connection().execute(sql, params)
+
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        """This thread's connection inside one transaction, holding the writer lock"""
+        start = time.perf_counter()
+        with self._write_lock:
+            waited = time.perf_counter() - start
+            conn = self.connection()
+            with conn:
+                yield conn
+            with self._lock:
+                self._writes += 1
+                self._write_wait += waited
+
+    def close(self):
+        """Close every thread's connection"""
+        with self._lock:
+            self._closed = True
+            connections, self._connections = self._connections, []
+        for _, conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'journal_mode': self.journal_mode,
+                'connections': len(self._connections),
+                'opened': self._opened,
+                'writes': self._writes,
+                'avg_write_wait_ms': round(1000 * self._write_wait / self._writes, 2) if self._writes else 0.0
+            }
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Stage Timer - Per-stage latency of the reply pipeline
+Every stage duration goes into a rolling window for percentiles, and into the
+current request's timings when one was begun, so a web route can return them
+as a Server-Timing header. The request's timings live in a context variable,
+which follows the request across threads that run it via contextvars
+"""
+
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import numpy as np
+
+_request_timings: contextvars.ContextVar = contextvars.ContextVar('ai_twin_request_timings', default=None)
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    """Format stage durations (seconds) as a Server-Timing header value"""
+    return ', '.join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """Stage durations in milliseconds from a Server-Timing header value"""
+    timings = {}
+    for metric in header.split(','):
+        name, _, params = metric.strip().partition(';')
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if name and key == 'dur':
+                timings[name] = float(value)
+    return timings
+
+
+class StageTimer:
+    """Rolling per-stage duration windows plus the current request's timings"""
+
+    def __init__(self, window: int = 2000):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def begin_request(self) -> Dict[str, float]:
+        """Start collecting timings for the request running in this context"""
+        timings = {}
+        _request_timings.set(timings)
+        return timings
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            if stage not in self._samples:
+                self._samples[stage] = deque(maxlen=self.window)
+                self._counts[stage] = 0
+            self._samples[stage].append(seconds)
+            self._counts[stage] += 1
+        timings: Optional[Dict[str, float]] = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def measure(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            samples = {stage: np.array(values) * 1000 for stage, values in self._samples.items() if values}
+            counts = dict(self._counts)
+        return {
+            stage: {
+                'count': counts[stage],
+                'p50_ms': round(float(np.percentile(values, 50)), 1),
+                'p95_ms': round(float(np.percentile(values, 95)), 1),
+                'p99_ms': round(float(np.percentile(values, 99)), 1)
+            }
+            for stage, values in samples.items()
+        }
@@ -112,8 +112,8 @@ async function sendMessage() {
     sendButton.disabled = true;
     
     try {
-        // Send message to API
-        const response = await fetch('/api/chat', {
+        // Stream the reply token by token
+        const response = await fetch('/api/chat/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -121,13 +121,11 @@ async function sendMessage() {
             body: JSON.stringify({ message: message })
         });
         
-        const data = await response.json();
-        
-        if (data.error) {
-            addMessage(`Error: ${data.error}`, 'ai', true);
+        if (response.ok && response.body) {
+            await renderStream(response);
         } else {
-            // Add AI response with typing effect
-            addMessage(data.response, 'ai');
+            // Fall back to the single-response endpoint
+            await sendMessageBlocking(message);
         }
     } catch (error) {
         console.error('Error sending message:', error);
@@ -139,6 +137,85 @@ async function sendMessage() {
     }
 }
 
+// Send message and wait for the whole reply
+async function sendMessageBlocking(message) {
+    const response = await fetch('/api/chat', {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ message: message })
+    });
+    
+    const data = await response.json();
+    
+    if (data.error) {
+        addMessage(`Error: ${data.error}`, 'ai', true);
+    } else {
+        // Add AI response with typing effect
+        addMessage(data.response, 'ai');
+    }
+}
+
+// Render Server-Sent Events from /api/chat/stream as tokens arrive
+async function renderStream(response) {
+    const chatMessages = document.getElementById('chatMessages');
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let text = '';
+    let textElement = null;
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split('\n\n');
+        buffer = events.pop();
+        
+        for (const rawEvent of events) {
+            const event = parseSSEEvent(rawEvent);
+            
+            if (event.type === 'error') {
+                addMessage(`Error: ${event.data.error}`, 'ai', true);
+                return;
+            }
+            
+            if (event.type === 'done') {
+                text = event.data.response || text;
+            } else if (event.data.token) {
+                text += event.data.token;
+            } else {
+                continue;
+            }
+            
+            // First token creates the message bubble; later ones extend it
+            if (!textElement) {
+                textElement = addMessage('', 'ai').querySelector('.message-content p');
+            }
+            textElement.textContent = text;
+            chatMessages.scrollTop = chatMessages.scrollHeight;
+        }
+    }
+}
+
+// Parse one "event: ...\ndata: ..." block
+function parseSSEEvent(rawEvent) {
+    let type = 'message';
+    let data = '';
+    
+    rawEvent.split('\n').forEach(line => {
+        if (line.startsWith('event:')) {
+            type = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+            data += line.slice(5).trim();
+        }
+    });
+    
+    return { type, data: data ? JSON.parse(data) : {} };
+}
+
 // Add message to chat
 function addMessage(content, sender, isError = false) {
     const chatMessages = document.getElementById('chatMessages');
@@ -174,6 +251,8 @@ function addMessage(content, sender, isError = false) {
         messageDiv.style.opacity = '1';
         messageDiv.style.transform = 'translateY(0)';
     });
+    
+    return messageDiv;
 }
 
 // Send suggestion message
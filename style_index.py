@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Style Index - Precomputed few-shot exemplars from Yaswanth's own messages
+Messages are clustered per detected mood with mini-batch k-means offline and the
+message nearest each centroid is kept. At request time exemplars come from this
+small index instead of a search over the full chat history
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def cluster_exemplars(embeddings: np.ndarray, clusters: int, seed: int = 0) -> List[Dict]:
+    """Cluster normalised embeddings; return each cluster's most central member and size"""
+    # Offline only, so the request path doesn't pay for importing scikit-learn
+    from sklearn.cluster import MiniBatchKMeans
+
+    clusters = min(clusters, len(embeddings))
+    if clusters < 2:
+        return [{'index': 0, 'cluster_size': len(embeddings)}] if len(embeddings) else []
+
+    kmeans = MiniBatchKMeans(n_clusters=clusters, batch_size=1024, n_init=3, random_state=seed)
+    labels = kmeans.fit_predict(embeddings)
+    centroids = kmeans.cluster_centers_
+    centroids = centroids / np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+    exemplars = []
+    for cluster in range(clusters):
+        members = np.flatnonzero(labels == cluster)
+        if len(members) == 0:
+            continue
+        central = members[np.argmax(embeddings[members] @ centroids[cluster])]
+        exemplars.append({'index': int(central), 'cluster_size': len(members)})
+
+    # Biggest clusters first: the most typical ways of texting
+    exemplars.sort(key=lambda exemplar: exemplar['cluster_size'], reverse=True)
+    return exemplars
+
+
+class StyleIndex:
+    """In-memory exemplar vectors, bucketed by mood, for nearest-exemplar lookup"""
+
+    def __init__(self, exemplars: List[Dict]):
+        self.buckets: Dict[str, tuple] = {}
+        by_mood: Dict[str, List[Dict]] = {}
+        for exemplar in exemplars:
+            by_mood.setdefault(exemplar['mood'], []).append(exemplar)
+        for mood, items in by_mood.items():
+            self.buckets[mood] = (items, np.stack([item['embedding'] for item in items]))
+
+        self.all_items = exemplars
+        self.all_matrix = np.stack([e['embedding'] for e in exemplars]) if exemplars else None
+
+    def __len__(self) -> int:
+        return len(self.all_items)
+
+    def nearest(self, query_embedding, mood: Optional[str], n: int) -> List[Dict]:
+        """The n exemplars closest to the query, from the mood's bucket when it has enough.
+
+        Without a query embedding, the bucket's n biggest clusters are returned.
+        """
+        if not self.all_items or n <= 0:
+            return []
+
+        items, matrix = self.buckets.get(mood, ([], None))
+        if len(items) < n:
+            items, matrix = self.all_items, self.all_matrix
+        if query_embedding is None:
+            return items[:n]
+
+        scores = matrix @ np.asarray(query_embedding, dtype=np.float32)
+        n = min(n, len(items))
+        top = np.argpartition(-scores, n - 1)[:n]
+        return [items[i] for i in top[np.argsort(-scores[top])]]
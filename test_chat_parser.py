@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for checkpointed, resumable chat ingestion: batches streamed from a byte
+offset must add up to what the plain line parser reads from the whole file
+"""
+
+import pytest
+
+from chat_parser import find_resume_point, iter_checkpointed_batches, iter_whatsapp_messages
+
+MESSAGES = [
+    "[01/02/24, 9:15:02 AM] Indu: Good morning ra",
+    "[01/02/24, 9:16:40 AM] Yaswanth: Morning! Tiffin ayyinda?",
+    "[01/02/24, 9:17:05 AM] Indu: Ledu inka",
+    "chala busy ga undi",
+    "[01/02/24, 9:20:11 AM] Prosessor: Sare le, tinu first 😊",
+    "[01/02/24, 9:21:00 AM] Mustang: ok ok",
+    "",
+    "meeting lo unna",
+    "[01/02/24, 9:30:45 AM] Yaswanth: 👍",
+]
+
+APPENDED = [
+    "[01/02/24, 1:02:03 PM] Indu: lunch ayyinda?",
+    "[01/02/24, 1:05:09 PM] Yaswanth: Haa, ippude",
+]
+
+VARIANTS = {
+    'lf': ('\n', True),
+    'crlf': ('\r\n', True),
+    'no-trailing-newline': ('\n', False),
+    'crlf-no-trailing-newline': ('\r\n', False),
+}
+
+
+def write_chat(path, lines, newline='\n', trailing=True):
+    text = newline.join(lines) + (newline if trailing else '')
+    path.write_bytes(text.encode('utf-8'))
+
+
+def baseline(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return list(iter_whatsapp_messages(f))
+
+
+def ingest(path, checkpoint=None, batch_size=2, stop_after=None):
+    """Messages and the last checkpoint from one (possibly interrupted) ingestion run"""
+    offset, hasher = find_resume_point(path, checkpoint)
+    if offset is None:
+        return [], checkpoint
+    messages = []
+    for i, (batch, checkpoint) in enumerate(iter_checkpointed_batches(
+            path, offset, hasher, batch_size, checkpoint['message_count'] if offset else 0)):
+        messages.extend(batch)
+        if stop_after is not None and i + 1 == stop_after:
+            break
+    return messages, checkpoint
+
+
+@pytest.mark.parametrize('variant', VARIANTS)
+@pytest.mark.parametrize('batch_size', [1, 2, 3, 100])
+def test_batches_match_baseline_parser(tmp_path, variant, batch_size):
+    path = tmp_path / 'chat.txt'
+    write_chat(path, MESSAGES, *VARIANTS[variant])
+
+    messages, checkpoint = ingest(path, batch_size=batch_size)
+
+    assert messages == baseline(path)
+    assert checkpoint['byte_offset'] == path.stat().st_size
+    assert checkpoint['message_count'] == len(messages)
+
+
+@pytest.mark.parametrize('variant', VARIANTS)
+def test_resume_after_interruption(tmp_path, variant):
+    path = tmp_path / 'chat.txt'
+    write_chat(path, MESSAGES, *VARIANTS[variant])
+
+    first, checkpoint = ingest(path, stop_after=1)
+    rest, _ = ingest(path, checkpoint)
+
+    assert first + rest == baseline(path)
+
+
+@pytest.mark.parametrize('variant', VARIANTS)
+def test_resume_after_append(tmp_path, variant):
+    path = tmp_path / 'chat.txt'
+    newline, trailing = VARIANTS[variant]
+    write_chat(path, MESSAGES, newline, trailing)
+    first, checkpoint = ingest(path)
+
+    with open(path, 'ab') as f:
+        f.write(((newline if not trailing else '') + newline.join(APPENDED) + newline).encode('utf-8'))
+    added, checkpoint = ingest(path, checkpoint)
+
+    assert first + added == baseline(path)
+    assert [m['message'] for m in added] == ["lunch ayyinda?", "Haa, ippude"]
+    assert checkpoint['message_count'] == len(first) + len(added)
+
+
+def test_edited_prefix_is_reingested_from_start(tmp_path):
+    path = tmp_path / 'chat.txt'
+    write_chat(path, MESSAGES)
+    _, checkpoint = ingest(path)
+
+    # Same length, different bytes before the checkpoint
+    edited = [MESSAGES[0].replace('Good morning', 'Good evening')] + MESSAGES[1:] + APPENDED
+    write_chat(path, edited)
+    offset, hasher = find_resume_point(path, checkpoint)
+    assert offset == 0
+
+    messages, _ = ingest(path, checkpoint)
+    assert messages == baseline(path)
+    assert messages[0]['message'] == "Good evening ra"
+
+
+def test_batch_boundary_at_eof_leaves_nothing_to_resume(tmp_path):
+    path = tmp_path / 'chat.txt'
+    write_chat(path, MESSAGES)
+    # 6 messages in batches of 3: the last batch ends exactly at EOF
+    messages, checkpoint = ingest(path, batch_size=3)
+
+    assert len(messages) == 6
+    assert checkpoint['byte_offset'] == path.stat().st_size
+    assert find_resume_point(path, checkpoint) == (None, None)
+    assert ingest(path, checkpoint) == ([], checkpoint)
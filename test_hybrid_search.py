@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Tests for the lexical side of hybrid retrieval
+"""
+
+import sqlite3
+
+from hybrid_search import FTS_TOKENIZER, build_match_query, tokenize
+
+MESSAGES = ["నేను వస్తా", "నాకు తెలుసు", "నువ్వు ఎక్కడ ఉన్నావు", "sare le, café lo kaluddam"]
+
+
+def make_index():
+    conn = sqlite3.connect(':memory:')
+    conn.execute(f'CREATE VIRTUAL TABLE messages_fts USING fts5(message, tokenize="{FTS_TOKENIZER}")')
+    conn.executemany("INSERT INTO messages_fts (message) VALUES (?)", [(m,) for m in MESSAGES])
+    return conn
+
+
+def search(conn, text: str, require_all: bool = False):
+    return [row[0] for row in conn.execute(
+        "SELECT message FROM messages_fts WHERE messages_fts MATCH ?", (build_match_query(text, require_all),)
+    )]
+
+
+def test_telugu_words_keep_their_vowel_signs():
+    assert tokenize("నేను ఇంటికి వెళ్తున్నా") == ["నేను", "ఇంటికి", "వెళ్తున్నా"]
+    assert build_match_query("నేను") == '"నేను"'
+
+
+def test_telugu_query_does_not_match_on_a_single_consonant():
+    conn = make_index()
+    assert search(conn, "నేను", require_all=True) == ["నేను వస్తా"]
+    assert search(conn, "న") == []
+
+
+def test_romanised_and_accented_terms_still_match():
+    conn = make_index()
+    assert search(conn, "Sare LE", require_all=True) == ["sare le, café lo kaluddam"]
+    assert search(conn, "cafe") == ["sare le, café lo kaluddam"]
+
+
+def test_stopwords_are_not_searched_for():
+    assert build_match_query("where are you going for the wedding") == '"going" OR "wedding"'
+    assert build_match_query("how are you", require_all=True) == ""
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Text Annotator - Batch language-mix and mood classification
+Classifies whole columns of messages at once: language by counting codepoint
+ranges over one array, mood with a single Aho-Corasick pass per message
+"""
+
+from typing import List
+
+import numpy as np
+
+from phrase_scanner import PhraseScanner
+
+# Telugu letters and digits, అ (U+0C05) to ౯ (U+0C6F)
+TELUGU_FIRST = 0x0C05
+TELUGU_LAST = 0x0C6F
+
+HAPPY_WORDS = ['happy', 'good', 'great', 'awesome', 'nice', '😊', '😄', '😍']
+NEGATIVE_WORDS = ['sad', 'upset', 'angry', 'frustrated', 'bad', '😢', '😠']
+WAITING_MESSAGES = {'..', '.', '...', 'waiting', 'where'}
+
+MOOD_SCANNER = PhraseScanner({
+    'happy': HAPPY_WORDS,
+    'negative': NEGATIVE_WORDS
+})
+
+
+def annotate_languages(texts: List[str]) -> List[str]:
+    """Detect the language mix of every text in one vectorised pass"""
+    if not texts:
+        return []
+
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+    codepoints = np.frombuffer(''.join(texts).encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+
+    telugu = (codepoints >= TELUGU_FIRST) & (codepoints <= TELUGU_LAST)
+    # OR-ing 0x20 folds A-Z onto a-z
+    folded = codepoints | 0x20
+    english = (folded >= ord('a')) & (folded <= ord('z'))
+
+    # Per-text counts as differences of running totals at text boundaries
+    bounds = np.concatenate(([0], np.cumsum(lengths)))
+    telugu_counts = np.diff(np.concatenate(([0], np.cumsum(telugu)))[bounds])
+    english_counts = np.diff(np.concatenate(([0], np.cumsum(english)))[bounds])
+
+    return [
+        "Telugu-dominant" if t > e else "English-dominant" if e > t else "Mixed"
+        for t, e in zip(telugu_counts.tolist(), english_counts.tolist())
+    ]
+
+
+def detect_mood(text: str) -> str:
+    """Simple mood detection"""
+    groups = {MOOD_SCANNER.patterns[pattern_id][0] for pattern_id in MOOD_SCANNER.iter_matches(text)}
+
+    if 'happy' in groups:
+        return "happy"
+    elif 'negative' in groups:
+        return "negative"
+    elif text.strip() in WAITING_MESSAGES:
+        return "waiting/reminder"
+    else:
+        return "neutral"
+
+
+def annotate_moods(texts: List[str]) -> List[str]:
+    """Detect the mood of every text"""
+    return [detect_mood(text) for text in texts]
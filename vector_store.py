@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+NumPy Vector Store - Memory-mapped alternative to ChromaDB collections
+Normalised embeddings live in a growable memory-mapped file, the embedding_id to
+row mapping in a SQLite table, and documents/metadata in the existing
+conversations and chat_history tables. Top-k is one matrix-vector product per
+chunk of rows plus argpartition
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from ann_index import IVFIndex
+from sqlite_pool import SQLitePool
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory file locks (Windows); single-process use is then up to the deployment
+    fcntl = None
+
+# How each collection's documents and metadata map onto the twin's SQLite tables
+COLLECTION_SCHEMAS = {
+    'conversations': {
+        'table': 'conversations',
+        'document': "'User: ' || user_input || ' | AI: ' || ai_response",
+        'metadata': {
+            'timestamp': 'timestamp',
+            'date': 'date',
+            'ts_epoch': 'ts_epoch',
+            'mood': 'mood',
+            'language': 'language_detected',
+            'context': 'context'
+        },
+        'casts': {}
+    },
+    'chat_history': {
+        'table': 'chat_history',
+        'document': 'message',
+        'metadata': {
+            'file_name': 'file_name',
+            'timestamp': 'timestamp',
+            'sender': 'sender',
+            'is_yaswanth': 'is_yaswanth'
+        },
+        'casts': {'is_yaswanth': bool}
+    }
+}
+
+WHERE_OPERATORS = {'$eq': '=', '$ne': '!=', '$gt': '>', '$gte': '>=', '$lt': '<', '$lte': '<='}
+
+# Rows scored per matrix-vector product, bounding float32 temporaries for float16 stores
+QUERY_CHUNK_ROWS = 65536
+
+# Below this many rows an exact scan is fast enough that an ANN index isn't built
+ANN_MIN_ROWS = 50000
+
+# Filtered queries with at most this many candidate rows are scored exactly
+ANN_EXACT_CANDIDATES = 20000
+
+
+def normalize_embeddings(embeddings) -> np.ndarray:
+    """L2-normalise a vector or batch of vectors, so squared L2 distance is 2 - 2 * cosine"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if embeddings.ndim == 1:
+        embeddings = embeddings[None, :]
+    return embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+
+
+class NumpyVectorStore:
+    """Chroma-compatible upsert/add/query/get/delete/count over a memory-mapped matrix.
+
+    New IDs are appended; re-upserting an existing ID overwrites its row in
+    place. Deleted rows are tombstoned and skipped by queries. Distances are
+    squared L2 between normalised vectors (2 - 2 * cosine).
+
+    With ann='ivf', an IVF index is built once the store reaches ann_min_rows
+    and new rows are added to it incrementally. Training runs outside the lock,
+    so queries and writes carry on (exactly) while it builds.
+
+    SQL runs on the calling thread's pool connection; the lock only guards the
+    in-memory row mapping and the matrix.
+
+    The row mapping lives in process memory, so a store is single-process: a
+    second process opening the same files gets an error, and a forked worker
+    (e.g. gunicorn --preload) may not write to its parent's store.
+    """
+
+    def __init__(self, directory: str, name: str, schema: Dict, db: SQLitePool, dtype: str = 'float32',
+                 ann: Optional[str] = None, nprobe: int = 32, ann_min_rows: int = ANN_MIN_ROWS):
+        self.name = name
+        self.schema = schema
+        self.db = db
+        self.lock = threading.RLock()
+        self.dtype = np.dtype(dtype)
+        self.path = Path(directory) / f"{name}.{self.dtype.name}.mmap"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock_file = None
+        self._acquire_process_lock()
+
+        with self.db.write() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS vector_index (
+                    collection TEXT NOT NULL,
+                    embedding_id TEXT NOT NULL,
+                    row INTEGER NOT NULL,
+                    PRIMARY KEY (collection, embedding_id)
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS vector_collections (
+                    name TEXT PRIMARY KEY,
+                    dimension INTEGER,
+                    rows INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            row = conn.execute(
+                "SELECT dimension, rows FROM vector_collections WHERE name = ?", (self._key,)
+            ).fetchone()
+
+        self.dimension = row[0] if row else None
+        self.rows = row[1] if row else 0
+        self._matrix = None
+        self._capacity = 0
+
+        self.id_to_row: Dict[str, int] = {}
+        self.row_ids: List[Optional[str]] = [None] * self.rows
+        for embedding_id, row_number in self.db.execute(
+                "SELECT embedding_id, row FROM vector_index WHERE collection = ?", (self._key,)):
+            self.id_to_row[embedding_id] = row_number
+            self.row_ids[row_number] = embedding_id
+        self.live = np.array([rid is not None for rid in self.row_ids], dtype=bool)
+
+        if self.dimension:
+            self._map(max(self.rows, 1))
+
+        self.ann = None
+        self.ann_min_rows = ann_min_rows
+        # Row numbers written while an index is being trained; None when no build is running
+        self._ann_backlog: Optional[List[np.ndarray]] = None
+        if ann == 'ivf':
+            self.ann = IVFIndex(self.path.with_suffix(''), nprobe=nprobe)
+            if self.ann.load():
+                # Rows written after the assignments were last persisted
+                covered = len(self.ann.assignments)
+                if covered < self.rows:
+                    self.ann.add(np.arange(covered, self.rows), self._matrix[covered:self.rows])
+            elif self.rows >= ann_min_rows:
+                self.ann.build(self._matrix, self.rows)
+        elif ann:
+            raise ValueError(f"Unknown ANN index type: {ann}")
+
+    def _acquire_process_lock(self):
+        """Hold an exclusive lock on the store for as long as it is open in this process"""
+        self._owner_pid = os.getpid()
+        if fcntl is None:
+            return
+        self._lock_file = open(self.path.with_suffix('.lock'), 'w')
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_file.close()
+            self._lock_file = None
+            raise RuntimeError(f"NumPy vector store {self.path} is already open in another process; "
+                               f"it supports a single process (use one worker, or ChromaDB)")
+
+    def _check_owner(self):
+        """Writes from a forked child would reuse row slots its parent also assigns"""
+        if os.getpid() != self._owner_pid:
+            raise RuntimeError(f"NumPy vector store {self.path} was opened by process {self._owner_pid}; "
+                               f"open it after forking, in one worker only")
+
+    def close(self):
+        """Flush vectors and release the process lock"""
+        with self.lock:
+            if self._matrix is not None:
+                self._matrix.flush()
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    @property
+    def _key(self) -> str:
+        return f"{self.name}:{self.dtype.name}"
+
+    def _map(self, capacity: int):
+        """(Re)map the backing file with room for at least `capacity` rows"""
+        row_bytes = self.dimension * self.dtype.itemsize
+        current = self.path.stat().st_size // row_bytes if self.path.exists() else 0
+        if current < capacity:
+            with open(self.path, 'ab') as f:
+                f.truncate(capacity * row_bytes)
+            current = capacity
+        self._matrix = np.memmap(self.path, dtype=self.dtype, mode='r+', shape=(current, self.dimension))
+        self._capacity = current
+
+    def _ensure_capacity(self, rows: int):
+        if rows > self._capacity:
+            if self._matrix is not None:
+                self._matrix.flush()
+            self._map(max(rows, self._capacity * 2, 1024))
+
+    def upsert(self, ids: List[str], embeddings, documents=None, metadatas=None):
+        """Store vectors; documents and metadata are read from the SQLite tables instead"""
+        vectors = normalize_embeddings(embeddings)
+        self._check_owner()
+        with self.lock:
+            if self.dimension is None:
+                self.dimension = vectors.shape[1]
+                self._map(1024)
+            elif vectors.shape[1] != self.dimension:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match collection "
+                                 f"dimension {self.dimension}")
+
+            new_ids = [eid for eid in dict.fromkeys(ids) if eid not in self.id_to_row]
+            self._ensure_capacity(self.rows + len(new_ids))
+
+            index_rows = []
+            for eid in new_ids:
+                self.id_to_row[eid] = self.rows
+                self.row_ids.append(eid)
+                index_rows.append((self._key, eid, self.rows))
+                self.rows += 1
+            if len(self.live) < self.rows:
+                self.live = np.concatenate([self.live, np.zeros(self.rows - len(self.live), dtype=bool)])
+
+            row_numbers = np.array([self.id_to_row[eid] for eid in ids])
+            self._matrix[row_numbers] = vectors.astype(self.dtype)
+            self.live[row_numbers] = True
+            self._matrix.flush()
+
+            build_ann = False
+            if self.ann is not None:
+                if self._ann_backlog is not None:
+                    self._ann_backlog.append(row_numbers)
+                if self.ann.trained:
+                    self.ann.add(row_numbers, vectors)
+                elif self._ann_backlog is None and self.rows >= self.ann_min_rows:
+                    build_ann = True
+
+            with self.db.write() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO vector_index (collection, embedding_id, row) VALUES (?, ?, ?)",
+                    index_rows
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO vector_collections (name, dimension, rows) VALUES (?, ?, ?)",
+                    (self._key, self.dimension, self.rows)
+                )
+
+        if build_ann:
+            self._build_ann()
+
+    add = upsert
+
+    def delete(self, ids: List[str] = None, where: Dict = None):
+        """Tombstone vectors by ID and/or where filter (both must match when both are given)"""
+        if ids is None and not where:
+            return
+        self._check_owner()
+        allowed = set(self._candidate_rows(where).tolist()) if where else None
+        with self.lock:
+            candidates = ids if ids is not None else list(self.id_to_row)
+            doomed = [eid for eid in dict.fromkeys(candidates) if eid in self.id_to_row and
+                      (allowed is None or self.id_to_row[eid] in allowed)]
+            for eid in doomed:
+                row_number = self.id_to_row.pop(eid)
+                self.row_ids[row_number] = None
+                self.live[row_number] = False
+            with self.db.write() as conn:
+                conn.executemany(
+                    "DELETE FROM vector_index WHERE collection = ? AND embedding_id = ?",
+                    [(self._key, eid) for eid in doomed]
+                )
+
+    def count(self) -> int:
+        return len(self.id_to_row)
+
+    def build_ann_index(self, n_lists: Optional[int] = None):
+        """(Re)build and save the IVF index from the stored vectors"""
+        if self.ann is None:
+            raise ValueError("Store was opened without an ANN index")
+        self._build_ann(n_lists)
+
+    def _build_ann(self, n_lists: Optional[int] = None):
+        """Train a new index without holding the lock, then swap it in with the rows written meanwhile"""
+        with self.lock:
+            if self._ann_backlog is not None or not self.rows:
+                return
+            self._ann_backlog = []
+            # The backing file only grows, so this mapping stays valid if upserts remap it
+            matrix, rows = self._matrix, self.rows
+
+        index = IVFIndex(self.path.with_suffix(''), nprobe=self.ann.nprobe)
+        try:
+            index.build(matrix, rows, n_lists=n_lists, save=False)
+        finally:
+            with self.lock:
+                backlog, self._ann_backlog = self._ann_backlog, None
+                if index.trained:
+                    index.save()
+                    if backlog:
+                        row_numbers = np.unique(np.concatenate(backlog))
+                        index.add(row_numbers, np.asarray(self._matrix[row_numbers], dtype=np.float32))
+                    self.ann = index
+
+    def _where_sql(self, where: Dict, params: List[Any]) -> str:
+        """Translate a Chroma-style where filter into SQL over the collection's table"""
+        clauses = []
+        for key, condition in where.items():
+            if key in ('$and', '$or'):
+                joiner = ' AND ' if key == '$and' else ' OR '
+                clauses.append('(' + joiner.join(self._where_sql(sub, params) for sub in condition) + ')')
+                continue
+
+            column = self.schema['metadata'][key]
+            if not isinstance(condition, dict):
+                condition = {'$eq': condition}
+            for op, value in condition.items():
+                if op in ('$in', '$nin'):
+                    placeholders = ', '.join('?' for _ in value)
+                    clauses.append(f"t.{column} {'IN' if op == '$in' else 'NOT IN'} ({placeholders})")
+                    params.extend(value)
+                else:
+                    clauses.append(f"t.{column} {WHERE_OPERATORS[op]} ?")
+                    params.append(value)
+        return ' AND '.join(clauses) or '1'
+
+    def _candidate_rows(self, where: Optional[Dict]) -> Optional[np.ndarray]:
+        """Rows passing the where filter, or None for all live rows"""
+        if not where:
+            return None
+        params: List[Any] = [self._key]
+        sql = f'''
+            SELECT vi.row FROM vector_index vi
+            JOIN {self.schema['table']} t ON t.embedding_id = vi.embedding_id
+            WHERE vi.collection = ? AND {self._where_sql(where, params)}
+        '''
+        rows = [r[0] for r in self.db.execute(sql, params)]
+        return np.array(rows, dtype=np.int64)
+
+    def _fetch(self, ids: List[str]) -> Dict[str, tuple]:
+        """Documents and metadata for embedding IDs from the collection's table"""
+        if not ids:
+            return {}
+        columns = self.schema['metadata']
+        select = ', '.join([self.schema['document']] + [f"t.{col}" for col in columns.values()])
+        placeholders = ', '.join('?' for _ in ids)
+        sql = f"SELECT t.embedding_id, {select} FROM {self.schema['table']} t WHERE t.embedding_id IN ({placeholders})"
+
+        casts = self.schema['casts']
+        found = {}
+        for row in self.db.execute(sql, ids):
+            metadata = {}
+            for key, value in zip(columns, row[2:]):
+                metadata[key] = casts[key](value) if key in casts and value is not None else value
+            found[row[0]] = (row[1], metadata)
+        return found
+
+    def query(self, query_embeddings, n_results: int = 10, where: Dict = None,
+              include: List[str] = None) -> Dict[str, List]:
+        """Top-k nearest stored vectors per query, in Chroma's result layout"""
+        queries = normalize_embeddings(query_embeddings)
+        results = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+
+        with self.lock:
+            rows = self.rows
+            matrix = self._matrix
+            live = self.live[:rows].copy()
+        candidates = self._candidate_rows(where)
+
+        for query in queries:
+            best_rows, best_scores = self._top_k(matrix, rows, live, candidates, query, n_results)
+            ids = [self.row_ids[r] for r in best_rows]
+            found = self._fetch(ids)
+            # Skip vectors whose SQLite row has not been committed yet (or was removed)
+            keep = [i for i, eid in enumerate(ids) if eid in found]
+            results['ids'].append([ids[i] for i in keep])
+            results['documents'].append([found[ids[i]][0] for i in keep])
+            results['metadatas'].append([found[ids[i]][1] for i in keep])
+            results['distances'].append([float(2 - 2 * best_scores[i]) for i in keep])
+
+        return results
+
+    def _top_k(self, matrix, rows: int, live: np.ndarray, candidates: Optional[np.ndarray],
+               query: np.ndarray, k: int):
+        """Score rows chunk by chunk, keeping the running best k"""
+        if matrix is None or rows == 0 or k <= 0:
+            return [], []
+
+        if self.ann is not None and self.ann.trained and \
+                (candidates is None or len(candidates) > ANN_EXACT_CANDIDATES):
+            best_rows, best_scores = self.ann.search(matrix, live, query, k, candidates)
+            return best_rows.tolist(), best_scores.tolist()
+
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+
+        if candidates is not None:
+            candidates = candidates[(candidates < rows)]
+            candidates = candidates[live[candidates]]
+
+        for start in range(0, rows if candidates is None else len(candidates), QUERY_CHUNK_ROWS):
+            if candidates is None:
+                end = min(start + QUERY_CHUNK_ROWS, rows)
+                mask = live[start:end]
+                chunk_rows = np.arange(start, end)[mask]
+                scores = (matrix[start:end].astype(np.float32, copy=False) @ query)[mask]
+            else:
+                chunk_rows = candidates[start:start + QUERY_CHUNK_ROWS]
+                scores = matrix[chunk_rows].astype(np.float32, copy=False) @ query
+
+            rows_all = np.concatenate([best_rows, chunk_rows])
+            scores_all = np.concatenate([best_scores, scores])
+            if len(scores_all) > k:
+                top = np.argpartition(-scores_all, k - 1)[:k]
+                rows_all, scores_all = rows_all[top], scores_all[top]
+            best_rows, best_scores = rows_all, scores_all
+
+        order = np.argsort(-best_scores)
+        return best_rows[order].tolist(), best_scores[order].tolist()
+
+    def get(self, ids: List[str] = None, where: Dict = None, include: List[str] = None,
+            limit: int = None, offset: int = None) -> Dict[str, List]:
+        """Fetch stored items by ID and/or where filter, with their embeddings"""
+        with self.lock:
+            if ids is not None:
+                rows = [self.id_to_row[eid] for eid in ids if eid in self.id_to_row]
+            else:
+                rows = np.flatnonzero(self.live[:self.rows]).tolist()
+        if where:
+            allowed = set(self._candidate_rows(where).tolist())
+            rows = [r for r in rows if r in allowed]
+        rows = rows[offset or 0:]
+        if limit is not None:
+            rows = rows[:limit]
+
+        found_ids = [self.row_ids[r] for r in rows]
+        found = self._fetch(found_ids)
+        return {
+            'ids': found_ids,
+            'embeddings': [np.asarray(self._matrix[r], dtype=np.float32) for r in rows],
+            'documents': [found.get(eid, (None, None))[0] for eid in found_ids],
+            'metadatas': [found.get(eid, (None, None))[1] for eid in found_ids]
+        }
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Write-Behind Queue - Background batching of conversation persistence
+Acknowledged turns are queued and flushed in batches on an interval, when the
+queue reaches a size limit, and at shutdown. The queue is bounded: when the
+writer falls behind, callers block instead of turns being dropped
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class WriteBehindQueue:
+    """Bounded queue drained by one background thread that calls flush_fn(batch).
+
+    A failed flush is retried with backoff and nothing else is drained
+    meanwhile, so a slow or failing disk fills the queue and turns into
+    backpressure on submit() rather than silently lost turns.
+    """
+
+    def __init__(self, flush_fn: Callable[[List[Any]], None], max_pending: int = 1000,
+                 flush_batch_size: int = 32, flush_interval: float = 1.0,
+                 max_retry_delay: float = 30.0):
+        self.flush_fn = flush_fn
+        self.flush_batch_size = max(1, flush_batch_size)
+        self.flush_interval = flush_interval
+        self.max_retry_delay = max_retry_delay
+
+        self._queue = queue.Queue(maxsize=max(1, max_pending))
+        self._accepting = True
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self._submitted = 0
+        self._flushed = 0
+        self._batches = 0
+        self._failures = 0
+        self._last_error: Optional[str] = None
+
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any, timeout: Optional[float] = None):
+        """Queue an item for persistence, blocking while the queue is full.
+
+        Raises queue.Full if the item could not be queued within timeout, so
+        the caller knows the turn was not accepted.
+        """
+        if not self._accepting:
+            raise RuntimeError("write-behind queue is closed")
+        self._queue.put(item, timeout=timeout)
+        with self._stats_lock:
+            self._submitted += 1
+
+    def _run(self):
+        """Gather up to flush_batch_size items or flush_interval seconds' worth, then flush"""
+        while True:
+            first = self._queue.get()
+            if first is None:
+                self._queue.task_done()
+                return
+
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            stopping = False
+            while len(batch) < self.flush_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._flush_with_retry(batch)
+            for _ in batch:
+                self._queue.task_done()
+            if stopping:
+                self._queue.task_done()
+                return
+
+    def _flush_with_retry(self, batch: List[Any]):
+        """Flush a batch, retrying with exponential backoff until it succeeds or the queue closes"""
+        delay = 0.5
+        while True:
+            try:
+                self.flush_fn(batch)
+                with self._stats_lock:
+                    self._flushed += len(batch)
+                    self._batches += 1
+                return
+            except Exception as e:
+                with self._stats_lock:
+                    self._failures += 1
+                    self._last_error = str(e)
+                print(f"❌ Write-behind flush of {len(batch)} items failed, retrying in {delay:.1f}s: {e}")
+                if self._closed:
+                    print(f"❌ Dropping {len(batch)} unpersisted items at shutdown")
+                    return
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+
+    def flush(self):
+        """Block until every item submitted so far has been persisted"""
+        self._queue.join()
+
+    def close(self, timeout: float = 10.0):
+        """Flush pending items and stop the background thread"""
+        if not self._accepting:
+            return
+        self._accepting = False
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+        self._closed = True
+        pending = self._queue.qsize()
+        if self._thread.is_alive() or pending:
+            print(f"⚠️ Write-behind queue closed with {pending} items still pending")
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return {
+                'pending': self._queue.qsize(),
+                'submitted': self._submitted,
+                'flushed': self._flushed,
+                'batches': self._batches,
+                'failures': self._failures,
+                'last_error': self._last_error
+            }